@@ -0,0 +1,128 @@
+"""asyncio front end over ReplayDatabase for scripts and services.
+
+Nothing here imports Qt, so it can be used outside the GUI, e.g. from
+automation around the recording setup.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from core.constants import ASYNC_DB_MAX_PENDING, REPLAY_PAGE_SIZE
+from core.database import ReplayDatabase, ReplayQuery
+
+
+class AsyncReplayDatabase:
+    """Runs ReplayDatabase operations on one dedicated thread for asyncio callers.
+
+    Every public ReplayDatabase method is available as a coroutine of the
+    same name (``await adb.search_ufcs("ken")``) and the page streams as
+    async iterators. At most ``max_pending`` operations are queued for the
+    thread at once; further callers wait without blocking the event loop.
+    Cancelling a caller drops its operation if it has not started yet. One
+    already running finishes and its result is discarded, and a page stream
+    stops before its next page.
+
+    Open with ``await AsyncReplayDatabase.open(path)``, ideally as
+    ``async with``, so opening and migrating also run off the event loop.
+    """
+    
+    # Streamed page by page instead of returning a generator
+    PAGE_STREAMS = {'iter_replays', 'iter_query'}
+    
+    def __init__(self, db_path: str, max_pending: int = ASYNC_DB_MAX_PENDING,
+                 in_memory: bool = False, compress_descriptions: bool = False):
+        self.db_path = db_path
+        self.in_memory = in_memory
+        self.compress_descriptions = compress_descriptions
+        self.database: Optional[ReplayDatabase] = None
+        # A single thread keeps operations in submission order and lets a
+        # page stream be closed safely after its last page request
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="replay-db")
+        self._slots = asyncio.Semaphore(max_pending)
+    
+    @classmethod
+    async def open(cls, db_path: str, **kwargs) -> 'AsyncReplayDatabase':
+        """Open (and if needed migrate) a database without blocking the event loop."""
+        adb = cls(db_path, **kwargs)
+        try:
+            adb.database = await adb._submit(
+                ReplayDatabase, db_path, in_memory=adb.in_memory,
+                compress_descriptions=adb.compress_descriptions
+            )
+        except BaseException:
+            adb._executor.shutdown(wait=False)
+            raise
+        return adb
+    
+    async def close(self):
+        """Close the database once the operations already queued have run."""
+        database, self.database = self.database, None
+        if database is not None:
+            await self._submit(database.close)
+        self._executor.shutdown(wait=False)
+    
+    async def __aenter__(self) -> 'AsyncReplayDatabase':
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.close()
+    
+    async def call(self, method: str, *args, **kwargs) -> Any:
+        """Run ``ReplayDatabase.<method>`` on the database thread and return its result."""
+        return await self._submit(self._method(method), *args, **kwargs)
+    
+    def __getattr__(self, name: str) -> Callable:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        method = self._method(name)
+        
+        @functools.wraps(method)
+        async def run(*args, **kwargs):
+            return await self._submit(method, *args, **kwargs)
+        return run
+    
+    def iter_replays(self, after_id: Optional[int] = None, limit: int = REPLAY_PAGE_SIZE,
+                     order: str = 'asc', preview: bool = False) -> AsyncIterator[List[Dict]]:
+        """Stream replays as pages of at most ``limit`` rows (see ReplayDatabase.iter_replays)."""
+        return self._pages(self._opened().iter_replays(after_id, limit, order, preview))
+    
+    def iter_query(self, query: ReplayQuery, limit: int = REPLAY_PAGE_SIZE,
+                   preview: bool = False) -> AsyncIterator[List[Dict]]:
+        """Stream the replays matching ``query`` in its sort order, a page at a time."""
+        return self._pages(self._opened().iter_query(query, limit, preview))
+    
+    def _method(self, name: str) -> Callable:
+        if name.startswith('_') or name in self.PAGE_STREAMS \
+                or not callable(getattr(ReplayDatabase, name, None)):
+            raise AttributeError(f"ReplayDatabase has no awaitable method '{name}'")
+        return getattr(self._opened(), name)
+    
+    def _opened(self) -> ReplayDatabase:
+        if self.database is None:
+            raise RuntimeError("Database is not open")
+        return self.database
+    
+    async def _submit(self, func: Callable, *args, **kwargs) -> Any:
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            # Cancelling the awaiting task cancels the job if it has not started
+            return await loop.run_in_executor(
+                self._executor, functools.partial(func, *args, **kwargs)
+            )
+    
+    async def _pages(self, pages: Iterator[List[Dict]]) -> AsyncIterator[List[Dict]]:
+        """Pull one page at a time from a ReplayDatabase page stream."""
+        try:
+            while True:
+                page = await self._submit(next, pages, None)
+                if page is None:
+                    return
+                yield page
+        finally:
+            # Queued behind any page still being read, so the generator is
+            # never closed while it runs
+            try:
+                self._executor.submit(pages.close)
+            except RuntimeError:
+                pass    # already shut down; nothing left to read from
@@ -0,0 +1,130 @@
+"""Consistent online backups of replay databases, with rotation."""
+import os
+import re
+import sqlite3
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from core.constants import (
+    BACKUP_KEEP_DAILY, BACKUP_KEEP_HOURLY, BACKUP_PAGES_PER_STEP, DB_BUSY_TIMEOUT_MS
+)
+
+# Called as progress(pages_done, pages_total) after each backup step
+BackupProgress = Callable[[int, int], None]
+
+BACKUP_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+
+def backup_file_name(db_path: str, when: Optional[datetime] = None) -> str:
+    """Get the backup file name for a database at a point in time."""
+    base_name = os.path.splitext(os.path.basename(db_path))[0]
+    stamp = (when or datetime.now()).strftime(BACKUP_TIMESTAMP_FORMAT)
+    return f"{base_name}_{stamp}.db"
+
+
+def backup_database(db_path: str, dest_path: str,
+                    progress: Optional[BackupProgress] = None,
+                    pages_per_step: int = BACKUP_PAGES_PER_STEP) -> str:
+    """Copy a live database with the SQLite online backup API.
+
+    Pages are copied a step at a time through a separate read connection, so
+    writers are only paused between steps and the copy is always a
+    consistent snapshot. The result is verified with ``quick_check`` before
+    it replaces ``dest_path``.
+    """
+    folder = os.path.dirname(dest_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    temp_path = dest_path + ".partial"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    
+    def on_step(status: int, remaining: int, total: int):
+        if progress:
+            progress(total - remaining, total)
+    
+    source = sqlite3.connect(db_path, timeout=DB_BUSY_TIMEOUT_MS / 1000)
+    try:
+        target = sqlite3.connect(temp_path)
+        try:
+            source.backup(target, pages=pages_per_step, progress=on_step)
+            result = target.execute("PRAGMA quick_check").fetchone()[0]
+            if result != 'ok':
+                raise sqlite3.DatabaseError(f"Backup failed integrity check: {result}")
+        finally:
+            target.close()
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        source.close()
+    
+    os.replace(temp_path, dest_path)
+    return dest_path
+
+
+def list_backups(folder: str, db_path: str) -> List[Tuple[datetime, str]]:
+    """Get (taken_at, path) for every backup of a database, newest first."""
+    base_name = os.path.splitext(os.path.basename(db_path))[0]
+    pattern = re.compile(rf'^{re.escape(base_name)}_(\d{{8}}_\d{{6}})\.db$')
+    
+    backups = []
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return []
+    
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            taken_at = datetime.strptime(match.group(1), BACKUP_TIMESTAMP_FORMAT)
+            backups.append((taken_at, os.path.join(folder, name)))
+    
+    backups.sort(reverse=True)
+    return backups
+
+
+def expired_backups(backups: List[Tuple[datetime, str]],
+                    keep_hourly: int = BACKUP_KEEP_HOURLY,
+                    keep_daily: int = BACKUP_KEEP_DAILY) -> List[Tuple[datetime, str]]:
+    """Get the backups (newest-first input) that fall outside the retention policy.
+
+    The newest backup in each of the latest ``keep_hourly`` hours and each
+    of the latest ``keep_daily`` days is kept.
+    """
+    seen_hours = set()
+    seen_days = set()
+    expired = []
+    
+    for taken_at, path in backups:
+        hour = taken_at.strftime("%Y%m%d%H")
+        day = taken_at.strftime("%Y%m%d")
+        keep = False
+        
+        if hour not in seen_hours and len(seen_hours) < keep_hourly:
+            seen_hours.add(hour)
+            keep = True
+        if day not in seen_days and len(seen_days) < keep_daily:
+            seen_days.add(day)
+            keep = True
+        
+        if not keep:
+            expired.append((taken_at, path))
+    
+    return expired
+
+
+def prune_backups(folder: str, db_path: str,
+                  keep_hourly: int = BACKUP_KEEP_HOURLY,
+                  keep_daily: int = BACKUP_KEEP_DAILY) -> List[str]:
+    """Delete full-copy backups outside the retention policy and return their paths."""
+    removed = []
+    for _, path in expired_backups(list_backups(folder, db_path), keep_hourly, keep_daily):
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError as e:
+            print(f"⚠️ Could not remove old backup {path}: {e}")
+    
+    return removed
@@ -0,0 +1,331 @@
+"""Content-addressed, deduplicated store of database snapshots."""
+import hashlib
+import json
+import os
+import sqlite3
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set
+
+try:
+    import msvcrt
+except ImportError:     # Not Windows
+    import fcntl
+    msvcrt = None
+
+from core.backup import (
+    BACKUP_TIMESTAMP_FORMAT, BackupProgress, backup_database, backup_file_name, expired_backups
+)
+from core.constants import (
+    BACKUP_CHUNK_PAGES, BACKUP_KEEP_DAILY, BACKUP_KEEP_HOURLY, BACKUP_STORE_FOLDER
+)
+
+MANIFEST_VERSION = 1
+
+
+class BackupStore:
+    """Snapshots stored as manifests of content-hashed chunks.
+
+    A snapshot is cut into fixed runs of database pages; each chunk is kept
+    once, zlib-compressed, under its SHA-256. A manifest lists the chunk
+    hashes in file order, so a snapshot that shares most pages with an
+    earlier one only adds the chunks that changed.
+    
+    Finding those chunks still means copying and hashing the whole file, as
+    SQLite does not say which pages changed. That cost is skipped entirely
+    when the file and its write-ahead log are untouched since the previous
+    snapshot, which is the common case for idle-time backups.
+    """
+    
+    def __init__(self, root: str = BACKUP_STORE_FOLDER):
+        self.root = root
+        self.chunk_dir = os.path.join(root, "chunks")
+        self.manifest_dir = os.path.join(root, "manifests")
+        self.temp_dir = os.path.join(root, "tmp")
+        self.lock_path = os.path.join(root, "store.lock")
+    
+    # ==================== Snapshots ====================
+    
+    def snapshot(self, db_path: str, progress: Optional[BackupProgress] = None) -> str:
+        """Store a consistent snapshot of a live database and return its manifest path.
+
+        If the database has not been written since its last snapshot, the
+        new manifest reuses that snapshot's chunks without reading the file.
+        """
+        for folder in (self.chunk_dir, self.manifest_dir, self.temp_dir):
+            os.makedirs(folder, exist_ok=True)
+        
+        # Chunks written or found present belong to no manifest until the
+        # snapshot ends, so garbage collection must not run in between
+        with self._locked():
+            return self._snapshot(db_path, progress)
+    
+    def _snapshot(self, db_path: str, progress: Optional[BackupProgress]) -> str:
+        taken_at = datetime.now()
+        name = os.path.splitext(backup_file_name(db_path, taken_at))[0]
+        
+        # Taken before copying, so a write during the copy makes the next
+        # snapshot look again
+        state = self._source_state(db_path)
+        snapshots = self.list_snapshots(db_path)
+        if snapshots and snapshots[0].get('source_state') == state:
+            manifest = {key: value for key, value in snapshots[0].items() if key != 'path'}
+            manifest['taken_at'] = taken_at.strftime(BACKUP_TIMESTAMP_FORMAT)
+            manifest['new_chunks'] = 0
+            if progress:
+                progress(1, 1)
+            return self._store_manifest(name, manifest)
+        
+        temp_path = os.path.join(self.temp_dir, f"{name}.db")
+        
+        # Freeze a consistent copy first; the live file may change underneath us
+        backup_database(db_path, temp_path, progress)
+        try:
+            page_size = self._read_page_size(temp_path)
+            chunk_size = page_size * BACKUP_CHUNK_PAGES
+            file_size = os.path.getsize(temp_path)
+            total_chunks = max(1, -(-file_size // chunk_size))
+            
+            chunks = []
+            new_chunks = 0
+            file_hash = hashlib.sha256()
+            with open(temp_path, 'rb') as f:
+                while True:
+                    data = f.read(chunk_size)
+                    if not data:
+                        break
+                    digest = hashlib.sha256(data).hexdigest()
+                    file_hash.update(data)
+                    if self._put_chunk(digest, data):
+                        new_chunks += 1
+                    chunks.append(digest)
+                    if progress:
+                        progress(len(chunks), total_chunks)
+        finally:
+            os.remove(temp_path)
+        
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'source': os.path.basename(db_path),
+            'taken_at': taken_at.strftime(BACKUP_TIMESTAMP_FORMAT),
+            'page_size': page_size,
+            'chunk_size': chunk_size,
+            'size': file_size,
+            'sha256': file_hash.hexdigest(),
+            'new_chunks': new_chunks,
+            'source_state': state,
+            'chunks': chunks
+        }
+        return self._store_manifest(name, manifest)
+    
+    def _store_manifest(self, name: str, manifest: Dict) -> str:
+        # Written last, so an interrupted snapshot leaves only orphan chunks
+        manifest_path = os.path.join(self.manifest_dir, f"{name}.json")
+        counter = 1
+        while os.path.exists(manifest_path):
+            manifest_path = os.path.join(self.manifest_dir, f"{name}_{counter}.json")
+            counter += 1
+        self._write_atomic(manifest_path, json.dumps(manifest).encode('utf-8'))
+        return manifest_path
+    
+    def list_snapshots(self, db_path: Optional[str] = None) -> List[Dict]:
+        """Get manifests (optionally for one database), newest first.
+
+        Each manifest dict also carries its ``path``.
+        """
+        source = os.path.basename(db_path) if db_path else None
+        snapshots = []
+        
+        try:
+            names = os.listdir(self.manifest_dir)
+        except OSError:
+            return []
+        
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.manifest_dir, name)
+            try:
+                manifest = self._read_manifest(path)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Skipping unreadable backup manifest {name}: {e}")
+                continue
+            if source is None or manifest['source'] == source:
+                manifest['path'] = path
+                snapshots.append(manifest)
+        
+        snapshots.sort(key=lambda m: (m['taken_at'], m['path']), reverse=True)
+        return snapshots
+    
+    def restore(self, manifest_path: str, dest_path: str,
+                progress: Optional[BackupProgress] = None) -> str:
+        """Rebuild a snapshot into ``dest_path``; the database there must be closed."""
+        manifest = self._read_manifest(manifest_path)
+        folder = os.path.dirname(dest_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        temp_path = dest_path + ".partial"
+        
+        try:
+            file_hash = hashlib.sha256()
+            chunks = manifest['chunks']
+            # Pruning could otherwise take the chunks away mid-read
+            with self._locked(), open(temp_path, 'wb') as f:
+                for done, digest in enumerate(chunks, start=1):
+                    data = self._get_chunk(digest)
+                    file_hash.update(data)
+                    f.write(data)
+                    if progress:
+                        progress(done, len(chunks))
+            
+            if file_hash.hexdigest() != manifest['sha256']:
+                raise ValueError("Restored file does not match the snapshot checksum")
+            
+            conn = sqlite3.connect(temp_path)
+            try:
+                result = conn.execute("PRAGMA quick_check").fetchone()[0]
+            finally:
+                conn.close()
+            if result != 'ok':
+                raise sqlite3.DatabaseError(f"Restored database failed integrity check: {result}")
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        
+        # A WAL left by the old file would be replayed over the restored one
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(dest_path + suffix):
+                os.remove(dest_path + suffix)
+        os.replace(temp_path, dest_path)
+        return dest_path
+    
+    # ==================== Retention ====================
+    
+    def prune(self, db_path: str, keep_hourly: int = BACKUP_KEEP_HOURLY,
+              keep_daily: int = BACKUP_KEEP_DAILY) -> int:
+        """Drop a database's snapshots outside the retention policy, then unused chunks.
+
+        Returns the number of snapshots removed.
+        """
+        snapshots = [
+            (datetime.strptime(m['taken_at'], BACKUP_TIMESTAMP_FORMAT), m['path'])
+            for m in self.list_snapshots(db_path)
+        ]
+        expired = expired_backups(snapshots, keep_hourly, keep_daily)
+        with self._locked():
+            for _, path in expired:
+                os.remove(path)
+            
+            if expired:
+                self._collect_garbage()
+        return len(expired)
+    
+    def collect_garbage(self) -> int:
+        """Delete chunks no manifest refers to and return how many were removed.
+
+        Waits for snapshots in progress, whose chunks are not listed yet.
+        """
+        with self._locked():
+            return self._collect_garbage()
+    
+    def _collect_garbage(self) -> int:
+        referenced: Set[str] = set()
+        for manifest in self.list_snapshots():
+            referenced.update(manifest['chunks'])
+        
+        removed = 0
+        for prefix in os.listdir(self.chunk_dir) if os.path.isdir(self.chunk_dir) else []:
+            prefix_dir = os.path.join(self.chunk_dir, prefix)
+            for name in os.listdir(prefix_dir):
+                if name not in referenced:
+                    os.remove(os.path.join(prefix_dir, name))
+                    removed += 1
+        
+        return removed
+    
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the store's lock file, shared by every thread and process using the store."""
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.lock_path, 'a+b') as f:
+            f.seek(0)
+            if msvcrt:
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue    # LK_LOCK gives up after ten tries a second apart
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                if msvcrt:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    
+    # ==================== Chunk Storage ====================
+    
+    def _chunk_path(self, digest: str) -> str:
+        return os.path.join(self.chunk_dir, digest[:2], digest)
+    
+    def _put_chunk(self, digest: str, data: bytes) -> bool:
+        """Store a chunk unless it is already present; True if it was new."""
+        path = self._chunk_path(digest)
+        if os.path.exists(path):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._write_atomic(path, zlib.compress(data, 1))
+        return True
+    
+    def _get_chunk(self, digest: str) -> bytes:
+        """Load and verify a chunk."""
+        with open(self._chunk_path(digest), 'rb') as f:
+            data = zlib.decompress(f.read())
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Backup chunk {digest} is corrupt")
+        return data
+    
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    
+    @staticmethod
+    def _read_manifest(path: str) -> Dict:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported manifest version {manifest.get('version')}")
+        return manifest
+    
+    @staticmethod
+    def _source_state(db_path: str) -> List[Optional[int]]:
+        """Get the size and modification time of a database file and of its write-ahead log.
+
+        Every commit changes one of them: in WAL mode it appends to the log,
+        otherwise it rewrites the file.
+        """
+        state = []
+        for path in (db_path, db_path + "-wal"):
+            try:
+                info = os.stat(path)
+                state += [info.st_size, info.st_mtime_ns]
+            except OSError:
+                state += [None, None]
+        return state
+    
+    @staticmethod
+    def _read_page_size(db_path: str) -> int:
+        """Read the page size from the database file header."""
+        with open(db_path, 'rb') as f:
+            header = f.read(100)
+        page_size = int.from_bytes(header[16:18], 'big')
+        return 65536 if page_size == 1 else page_size
@@ -0,0 +1,60 @@
+"""Transparent compression for long replay descriptions.
+
+A compressed description is stored as a BLOB: a short tag followed by the
+zlib stream of its UTF-8 text. Plain TEXT stays valid alongside it, so
+older databases need no rewrite and compression can be switched on or off
+at any time. Statements that need the text (search index triggers, LIKE
+searches, sorting, previews) read it through the SQL functions that
+``register_functions`` adds to a connection.
+"""
+import sqlite3
+import zlib
+from typing import Optional, Union
+
+from core.constants import DESCRIPTION_COMPRESS_LEVEL, DESCRIPTION_COMPRESS_MIN_CHARS
+
+# Marks a compressed description; the digit leaves room for other codecs
+COMPRESSED_TAG = b'RKZ1'
+
+
+def compress_text(text: Optional[str]) -> Union[str, bytes, None]:
+    """Get the value to store for a description, compressed if it is long and it pays off."""
+    if not text or len(text) < DESCRIPTION_COMPRESS_MIN_CHARS:
+        return text
+    raw = text.encode('utf-8')
+    packed = COMPRESSED_TAG + zlib.compress(raw, DESCRIPTION_COMPRESS_LEVEL)
+    return packed if len(packed) < len(raw) else text
+
+
+def decompress_text(value: Union[str, bytes, None]) -> Optional[str]:
+    """Get the text of a stored description, whether compressed or not."""
+    if isinstance(value, bytes):
+        if value.startswith(COMPRESSED_TAG):
+            return zlib.decompress(value[len(COMPRESSED_TAG):]).decode('utf-8')
+        return value.decode('utf-8', errors='replace')
+    return value
+
+
+def text_prefix(value: Union[str, bytes, None], chars: int) -> Optional[str]:
+    """Get the first ``chars`` characters of a stored description.
+
+    Only as much of a compressed description is inflated as the prefix can
+    need (UTF-8 takes at most four bytes a character).
+    """
+    if not isinstance(value, bytes) or not value.startswith(COMPRESSED_TAG):
+        text = decompress_text(value)
+        return text[:chars] if text is not None else None
+    
+    raw = zlib.decompressobj().decompress(value[len(COMPRESSED_TAG):], chars * 4)
+    # A character cut in half at the end is dropped
+    return raw.decode('utf-8', errors='ignore')[:chars]
+
+
+def register_functions(conn: sqlite3.Connection):
+    """Add desc_text(value) and desc_prefix(value, chars) to a connection.
+
+    The app's connections need them: the search index triggers that
+    ``install_search_triggers`` adds call desc_text.
+    """
+    conn.create_function('desc_text', 1, decompress_text, deterministic=True)
+    conn.create_function('desc_prefix', 2, text_prefix, deterministic=True)
@@ -0,0 +1,286 @@
+"""Shared, tuned SQLite connections for replay databases."""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+from core.constants import (
+    DB_BUSY_TIMEOUT_MS, DB_CACHE_SIZE_KB, DB_MMAP_SIZE, DB_STATEMENT_CACHE_SIZE,
+    WORKING_COPY_FLUSH_INTERVAL, WORKING_COPY_FLUSH_PAGES, WORKING_COPY_JOURNAL_MAX_BYTES
+)
+from core.compression import register_functions
+from core.instrumentation import InstrumentedConnection
+from core.migrations import install_search_triggers
+from core.working_copy import ChangeJournal
+
+
+class ManagedConnection:
+    """A single long-lived connection to one database file.
+
+    The connection runs in autocommit mode; writes are grouped with
+    ``transaction()`` and serialized through one lock so the connection can
+    be shared between the GUI and worker threads. A file database also gets
+    a second, read-only connection for ``read()``: with WAL, reads then run
+    alongside a long write instead of waiting for it.
+    
+    With ``in_memory`` the whole database is loaded into RAM and works as a
+    working copy: it is written back to the file by ``flush()`` (on close,
+    periodically, and when the app is idle) and each commit in between is
+    recorded in a crash journal.
+    """
+    
+    def __init__(self, db_path: str, in_memory: bool = False):
+        self.db_path = db_path
+        self.in_memory = in_memory
+        self._lock = threading.RLock()
+        self._depth = 0
+        # Thread currently holding the write connection, whose reads must
+        # see its uncommitted changes
+        self._owner: Optional[int] = None
+        self._read_lock = threading.RLock()
+        self._journal = ChangeJournal(db_path) if in_memory else None
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self._conn = self._open_working_copy() if in_memory else self._open()
+        # A working copy lives in this one connection's memory, so it has no reader
+        self._reader = None if in_memory else self._open_reader()
+    
+    @staticmethod
+    def _connect(target: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            target,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=DB_STATEMENT_CACHE_SIZE,
+            factory=InstrumentedConnection
+        )
+        register_functions(conn)
+        return conn
+    
+    def _open(self) -> sqlite3.Connection:
+        """Open the connection and apply the tuning pragmas."""
+        folder = os.path.dirname(self.db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        
+        conn = self._connect(self.db_path)
+        
+        # Only takes effect on new files (or after a VACUUM); lets idle
+        # maintenance return free pages a step at a time
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA foreign_keys = ON")
+        install_search_triggers(conn.cursor())
+        return conn
+    
+    def _open_reader(self) -> sqlite3.Connection:
+        """Open the read connection; the write connection has already set up WAL."""
+        conn = self._connect(self.db_path)
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+    
+    def _open_working_copy(self) -> sqlite3.Connection:
+        """Load the file into memory, replaying the journal of a crashed session."""
+        disk = self._open()
+        try:
+            conn = self._connect(":memory:")
+            disk.backup(conn)
+        finally:
+            disk.close()
+        
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA foreign_keys = ON")
+        install_search_triggers(conn.cursor())
+        
+        try:
+            recovered = self._journal.replay(conn)
+        except Exception:
+            conn.close()
+            raise
+        if recovered:
+            print(f"⚠️ Recovered {recovered} unsaved change(s) from the working-copy journal")
+            self._dirty = True
+            self._write_back(conn)
+        return conn
+    
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection for read-only work.
+
+        A file database is read through the read connection, inside one read
+        transaction per outermost block, so the block sees a single committed
+        snapshot and never waits for a writer. A thread that holds the write
+        connection reads through it, uncommitted changes included.
+        """
+        if self._reader is None or self._owner == threading.get_ident():
+            with self._held():
+                yield self._conn
+            return
+        
+        with self._read_lock:
+            if self._reader.in_transaction:
+                yield self._reader      # nested in a read block on this thread
+                return
+            self._reader.execute("BEGIN")
+            try:
+                yield self._reader
+            finally:
+                self._reader.execute("COMMIT")
+    
+    @contextmanager
+    def exclusive(self) -> Iterator[sqlite3.Connection]:
+        """Borrow the write connection outside a transaction, e.g. to ATTACH for one.
+
+        Other threads are kept off it until the block ends.
+        """
+        with self._held():
+            yield self._conn
+    
+    @contextmanager
+    def _held(self) -> Iterator[None]:
+        with self._lock:
+            owner, self._owner = self._owner, threading.get_ident()
+            try:
+                yield
+            finally:
+                self._owner = owner
+    
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Borrow the connection inside a write transaction.
+
+        Nested calls join the outermost transaction, which commits on success
+        and rolls back if any exception escapes.
+        """
+        with self._held():
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield self._conn
+                finally:
+                    self._depth -= 1
+                return
+            
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._depth = 1
+            if self._journal is not None:
+                since_seq = self._journal.max_seq(self._conn)
+                changes_before = self._conn.total_changes
+            try:
+                yield self._conn
+                if self._journal is not None:
+                    line = self._journal.capture(self._conn, since_seq, changes_before)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+            finally:
+                self._depth = 0
+            
+            if self._journal is not None:
+                self._dirty = self._dirty or self._conn.total_changes != changes_before
+                # Journaled only once committed, so replay never applies a
+                # transaction that failed to commit
+                journaled = line is not None and self._journal.append(line)
+                if (not journaled
+                        or self._journal.size > WORKING_COPY_JOURNAL_MAX_BYTES
+                        or time.monotonic() - self._last_flush > WORKING_COPY_FLUSH_INTERVAL):
+                    self.flush()
+    
+    def flush(self, progress: Optional[Callable[[int, int], None]] = None):
+        """Write an in-memory working copy back to its file.
+
+        ``progress(done, total)`` is called between batches of pages; if it
+        raises, the file is left as it was. Does nothing for file-backed
+        connections or when nothing changed.
+        """
+        if not self.in_memory:
+            return
+        with self._lock:
+            if self._depth:
+                raise RuntimeError("Cannot flush inside a transaction")
+            if self._dirty:
+                self._write_back(self._conn, progress)
+    
+    def _write_back(self, conn: sqlite3.Connection,
+                    progress: Optional[Callable[[int, int], None]] = None):
+        def on_step(status: int, remaining: int, total: int):
+            progress(total - remaining, total)
+        
+        disk = self._connect(self.db_path)
+        try:
+            # The backup commits on the file in one go, so a crash mid-way
+            # leaves the old contents and the journal intact
+            conn.backup(disk, pages=WORKING_COPY_FLUSH_PAGES,
+                        progress=on_step if progress else None)
+        finally:
+            disk.close()
+        
+        self._journal.clear()
+        self._dirty = False
+        self._last_flush = time.monotonic()
+    
+    def close(self):
+        """Close the underlying connection, flushing a working copy first."""
+        with self._lock:
+            try:
+                self.flush()
+            except Exception as e:
+                # The journal is kept, so the next open recovers the changes
+                print(f"⚠️ Failed to save working copy of {self.db_path}: {e}")
+            self._conn.close()
+        if self._reader is not None:
+            with self._read_lock:
+                self._reader.close()
+
+
+class ConnectionManager:
+    """Hands out one shared ManagedConnection per database file."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections: Dict[str, ManagedConnection] = {}
+        self._refcounts: Dict[str, int] = {}
+    
+    @staticmethod
+    def _key(db_path: str) -> str:
+        return os.path.normcase(os.path.abspath(db_path))
+    
+    def acquire(self, db_path: str, in_memory: bool = False) -> ManagedConnection:
+        """Get the shared connection for a database, opening it if needed.
+
+        ``in_memory`` only matters to the first caller; later ones share
+        whatever connection is already open.
+        """
+        key = self._key(db_path)
+        with self._lock:
+            if key not in self._connections:
+                self._connections[key] = ManagedConnection(db_path, in_memory)
+                self._refcounts[key] = 0
+            self._refcounts[key] += 1
+            return self._connections[key]
+    
+    def release(self, db_path: str):
+        """Drop one reference and close the connection when unused."""
+        key = self._key(db_path)
+        with self._lock:
+            if key not in self._connections:
+                return
+            self._refcounts[key] -= 1
+            if self._refcounts[key] <= 0:
+                self._connections.pop(key).close()
+                del self._refcounts[key]
+
+
+connection_manager = ConnectionManager()
@@ -30,5 +30,92 @@ MAX_ROW_HEIGHT = 200
 # Timers (in milliseconds)
 PORTRAIT_ROTATION_INTERVAL = 60000  # 60 seconds
 QUOTE_ROTATION_INTERVAL = 60000     # 60 seconds
-RECYCLE_BIN_CHECK_INTERVAL = 300000 # 5 minutes
-RECYCLE_BIN_AUTO_DELETE_DAYS = 30
\ No newline at end of file
+RECYCLE_BIN_AUTO_DELETE_DAYS = 30
+
+# SQLite connection tuning
+DB_BUSY_TIMEOUT_MS = 5000
+DB_CACHE_SIZE_KB = 16384               # 16 MB page cache per connection
+DB_MMAP_SIZE = 256 * 1024 * 1024       # 256 MB memory-mapped I/O
+DB_STATEMENT_CACHE_SIZE = 256
+
+# In-memory working copies: flush to the file after this long or once the
+# crash journal grows past this size; bigger transactions flush directly
+WORKING_COPY_FLUSH_INTERVAL = 300      # seconds
+WORKING_COPY_JOURNAL_MAX_BYTES = 4 * 1024 * 1024
+WORKING_COPY_JOURNAL_MAX_ROWS = 5000
+WORKING_COPY_FLUSH_PAGES = 1024        # pages copied per backup step
+
+# Rows fetched per page when streaming replays out of the database
+REPLAY_PAGE_SIZE = 500
+
+# Characters of each description the table loads; the rest is fetched on
+# demand through a cache of this many full descriptions
+DESCRIPTION_PREVIEW_CHARS = 200
+DESCRIPTION_CACHE_SIZE = 64
+
+# Characters of each description stored in replays.desc_key, which the
+# table sorts descriptions by; must not exceed DESCRIPTION_PREVIEW_CHARS
+DESCRIPTION_SORT_KEY_CHARS = 64
+
+# Descriptions at least this long are stored zlib-compressed when the
+# database has compression turned on
+DESCRIPTION_COMPRESS_MIN_CHARS = 1024
+DESCRIPTION_COMPRESS_LEVEL = 6
+
+# asyncio front end: operations allowed to wait for the database thread
+# before further callers are held back
+ASYNC_DB_MAX_PENDING = 64
+
+# Change log kept for incremental refreshes (entries retained, pruning cadence)
+CHANGE_LOG_RETENTION = 10000
+CHANGE_LOG_PRUNE_EVERY = 1000
+
+# Identifier codes: UFC = "UFC-" + hex (widened as the database fills),
+# UDC = fixed-width hex naming each database file
+UFC_PREFIX = "UFC-"
+UFC_MIN_WIDTH = 4
+UDC_WIDTH = 8
+CODE_SPACE_MAX_FILL = 1 / 16   # widen codes before 1 in 16 random draws collides
+
+# Online backups: pages copied per step, and how many hourly/daily snapshots to keep
+BACKUP_PAGES_PER_STEP = 1024
+BACKUP_KEEP_HOURLY = 24
+BACKUP_KEEP_DAILY = 14
+
+# Deduplicated backup store: snapshots are split into chunks of this many pages
+BACKUP_STORE_FOLDER = os.path.join(BACKUP_DB_FOLDER, "store")
+BACKUP_CHUNK_PAGES = 16
+
+# Cross-database search: most results returned per batch of attached databases
+FEDERATED_SEARCH_LIMIT = 500
+
+# Query instrumentation: statements slower than this get their plan logged
+SLOW_QUERY_THRESHOLD_MS = 50
+QUERY_LOG_FILE = os.path.join(ACTIVE_DB_FOLDER, "logs", "queries.log")
+QUERY_LOG_MAX_BYTES = 1024 * 1024
+QUERY_LOG_BACKUP_COUNT = 3
+
+# Idle-time maintenance: how long the user must be idle, how often to check,
+# and how long any one task may hold the database per idle period
+MAINTENANCE_IDLE_SECONDS = 60
+MAINTENANCE_CHECK_INTERVAL = 15000  # 15 seconds
+MAINTENANCE_TASK_BUDGET_SECONDS = 2.0
+MAINTENANCE_VACUUM_BUDGET_SECONDS = 10.0
+MAINTENANCE_PURGE_BATCH = 500
+MAINTENANCE_VACUUM_PAGES = 256
+MAINTENANCE_ANALYSIS_LIMIT = 1000
+MAINTENANCE_COMPRESS_BATCH = 200
+AUTO_BACKUP_INTERVAL_HOURS = 24
+
+# Integrity checks: replays examined per step, and how many problems of each
+# kind the report spells out
+INTEGRITY_CHUNK_ROWS = 2000
+INTEGRITY_REPORT_EXAMPLES = 5
+
+# Database info panel: when to suggest vacuuming (share of the file on the
+# free list), a checkpoint (WAL size) or starting a new database
+DB_INFO_VACUUM_FREE_RATIO = 0.2
+DB_INFO_WAL_WARN_BYTES = 64 * 1024 * 1024
+DB_INFO_SPLIT_BYTES = 2 * 1024 * 1024 * 1024
+DB_INFO_SPLIT_ROWS = 1_000_000
+DB_INFO_BACKUP_WARN_DAYS = 7
@@ -1,239 +1,1110 @@
 """Database operations for replay management with auto-migration."""
+import os
 import sqlite3
-import uuid
+import time
+from contextlib import closing, contextmanager
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-import os
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Set, Tuple
+from urllib.request import pathname2url
+
+from core import health, integrity, merge
+from core.compression import compress_text
+from core.connection import connection_manager
+from core.constants import (
+    DESCRIPTION_CACHE_SIZE, DESCRIPTION_COMPRESS_MIN_CHARS, DESCRIPTION_PREVIEW_CHARS,
+    DESCRIPTION_SORT_KEY_CHARS, REPLAY_PAGE_SIZE, UDC_WIDTH
+)
+from core.identifiers import database_code_from_path, new_ufc, random_hex, ufc_width_for
+from core.merge import UfcAllocator
+from core.migrations import (
+    ProgressCallback, get_schema_version, latest_version, migrate, rebuild_summary_tables,
+    sync_replay_tags_many
+)
+from utils.helpers import LRUCache, split_tags, format_timestamp, fts_prefix_query
+
+
+class ReplayQuery:
+    """Search, tag and recorded filters plus a sort order for listing replays.
+
+    Compiles to a single parameterized WHERE / ORDER BY that the replay
+    indexes answer, so only matching rows ever leave the database.
+    """
+    
+    # Sort keys (fields of the replay dicts) and the column each orders by
+    SORT_COLUMNS = {
+        'file_name': 'file_name',
+        'timestamp': 'timestamp',
+        'ufc': 'ufc',
+        'recorded': 'recorded',
+        'video_link': 'video_link',
+        'description': 'desc_key',
+        'added_at': 'added_at',
+        'tags': 'tags',
+        'id': 'id'
+    }
+    
+    def __init__(self, search_text: str = "", tags: Optional[List[str]] = None,
+                 match_all: bool = False, recorded: Optional[bool] = None,
+                 sort_by: str = 'id', descending: bool = False):
+        if sort_by not in self.SORT_COLUMNS:
+            raise ValueError(f"Invalid sort column: {sort_by}")
+        self.search_text = search_text
+        self.tags = tags or []
+        self.match_all = match_all
+        self.recorded = recorded
+        self.sort_by = sort_by
+        self.descending = descending
+    
+    @property
+    def sort_column(self) -> str:
+        return self.SORT_COLUMNS[self.sort_by]
+    
+    def where(self, has_fts: bool) -> Tuple[str, list]:
+        """Compile the filters into a WHERE condition over ``replays``."""
+        clauses = ["deleted_at IS NULL"]
+        params: list = []
+        
+        text = self.search_text.strip()
+        if text and has_fts:
+            match = fts_prefix_query(text)
+            if match:
+                clauses.append("id IN (SELECT rowid FROM replays_fts WHERE replays_fts MATCH ?)")
+                params.append(match)
+            else:
+                clauses.append("0")
+        elif text:
+            clauses.append("(file_name LIKE ? OR desc_text(extended_desc) LIKE ? OR tags LIKE ?)")
+            params.extend([f"%{text}%"] * 3)
+        
+        # Tag names are case-insensitive; a duplicate would make ALL unmatchable
+        names = list({name.lower(): name for name in split_tags(','.join(self.tags))}.values())
+        if names:
+            placeholders = ', '.join('?' for _ in names)
+            having = "GROUP BY rt.replay_id HAVING COUNT(*) = ?" if self.match_all else ""
+            clauses.append(f'''id IN (
+                SELECT rt.replay_id
+                FROM tags t JOIN replay_tags rt ON rt.tag_id = t.id
+                WHERE t.name IN ({placeholders})
+                {having}
+            )''')
+            params.extend(names + [len(names)] if self.match_all else names)
+        
+        if self.recorded is True:
+            clauses.append("recorded = 1")
+        elif self.recorded is False:
+            clauses.append("(recorded = 0 OR recorded IS NULL)")
+        
+        return ' AND '.join(clauses), params
+    
+    def passes(self) -> List[Optional[bool]]:
+        """Order in which to read rows whose sort value is NULL (True) or not (False).
+
+        SQLite sorts NULLs first, so an ascending listing reads them first.
+        Reading them in a pass of their own keeps every page a plain index
+        range scan. Sorting by id, which is never NULL, takes one pass.
+        """
+        if self.sort_by == 'id':
+            return [None]
+        return [False, True] if self.descending else [True, False]
+    
+    def keyset(self, nulls: Optional[bool], after: Optional[tuple]) -> Tuple[str, str, list]:
+        """Get the extra condition, ORDER BY and parameters for the next page of a pass.
+
+        ``after`` is the (sort value, id) of the last row the pass returned.
+        """
+        column = self.sort_column
+        direction = 'DESC' if self.descending else 'ASC'
+        comparison = '<' if self.descending else '>'
+        
+        if nulls is None:
+            condition = f"id {comparison} ?" if after else "1"
+            return condition, f"id {direction}", [after[1]] if after else []
+        if nulls:
+            condition = f"{column} IS NULL" + (f" AND id {comparison} ?" if after else "")
+            return condition, f"id {direction}", [after[1]] if after else []
+        
+        condition = f"{column} IS NOT NULL" + (
+            f" AND ({column}, id) {comparison} (?, ?)" if after else ""
+        )
+        return condition, f"{column} {direction}, id {direction}", list(after) if after else []
+    
+    def sort_key(self, replay: Dict) -> tuple:
+        """Python equivalent of the SQL order, ascending, for one replay dict."""
+        value = replay.get(self.sort_by)
+        if self.sort_by == 'description' and value is not None:
+            value = value[:DESCRIPTION_SORT_KEY_CHARS]
+        return (value is not None, value if value is not None else 0, replay.get('id') or 0)
 
 
 class ReplayDatabase:
     """Handles all database operations for replay management."""
     
-    def __init__(self, db_path: str):
+    # Select list matching _row_to_replay; descriptions may be stored compressed
+    REPLAY_COLUMNS = ('file_name, timestamp, ufc, recorded, video_link, '
+                      'desc_text(extended_desc), added_at, tags, id')
+    
+    # The same with descriptions cut short; one character past the preview
+    # length tells _row_to_replay whether anything was cut
+    PREVIEW_COLUMNS = REPLAY_COLUMNS.replace(
+        'desc_text(extended_desc)', f'desc_prefix(extended_desc, {DESCRIPTION_PREVIEW_CHARS + 1})'
+    )
+    
+    # Columns that find/replace is allowed to touch
+    REPLACEABLE_COLUMNS = ('file_name', 'timestamp', 'video_link', 'extended_desc', 'tags')
+    
+    def __init__(self, db_path: str, progress: Optional[ProgressCallback] = None,
+                 in_memory: bool = False, compress_descriptions: bool = False):
+        """Open (creating if needed) and upgrade a database.
+
+        With ``in_memory`` the database is worked on as an in-memory copy
+        that is flushed back to ``db_path`` periodically, when idle and on
+        close. With ``compress_descriptions`` long descriptions are written
+        compressed; either way both forms are read.
+        """
         self.db_path = db_path
-        self._initialize_db()
-        self._migrate_db()
+        self.compress_descriptions = compress_descriptions
+        self._db = connection_manager.acquire(db_path, in_memory)
+        self._has_fts: Optional[bool] = None
+        # UFCs handed out by allocate_ufcs but not yet inserted
+        self._reserved_ufcs: Set[str] = set()
+        # Full descriptions by UFC, for rows that were loaded as previews
+        self._descriptions = LRUCache(DESCRIPTION_CACHE_SIZE)
+        try:
+            self._migrate_db(progress or self._print_progress)
+            # Created now if missing, so reading it later never has to write
+            self.get_database_code()
+        except Exception:
+            self.close()
+            raise
+    
+    def close(self):
+        """Release this database's shared connection."""
+        if self._db is not None:
+            connection_manager.release(self.db_path)
+            self._db = None
+    
+    @property
+    def in_memory(self) -> bool:
+        """Whether this database is an in-memory working copy."""
+        return self._db.in_memory
+    
+    def flush(self, progress: Optional[Callable[[int, int], None]] = None):
+        """Write an in-memory working copy back to its file; a no-op otherwise."""
+        self._db.flush(progress)
     
-    def _initialize_db(self):
-        """Initialize database with required tables."""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+    def _migrate_db(self, progress: ProgressCallback):
+        """Bring the schema up to date; a current database costs one pragma read."""
+        with self._db.read() as conn:
+            if get_schema_version(conn) >= latest_version():
+                return
+        
+        with self._db.transaction() as conn:
+            migrate(conn, progress)
+        print("✅ Migration complete!")
+    
+    @staticmethod
+    def _print_progress(step: int, total: int, description: str):
+        """Default migration progress reporter."""
+        print(f"📦 Migrating database ({step}/{total}): {description}...")
+    
+    @property
+    def has_fts(self) -> bool:
+        """Whether the full-text search index exists in this database."""
+        if self._has_fts is None:
+            with self._db.read() as conn:
+                row = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'replays_fts'"
+                ).fetchone()
+            self._has_fts = row is not None
+        return self._has_fts
+    
+    def add_replay(self, file_name: str, timestamp: str = "", 
+                   video_link: str = "", description: str = "",
+                   tags: str = "", ufc: Optional[str] = None) -> str:
+        """Add a new replay entry."""
+        return self.add_replays([{
+            'file_name': file_name,
+            'timestamp': timestamp,
+            'video_link': video_link,
+            'description': description,
+            'tags': tags,
+            'ufc': ufc
+        }])[0]
+    
+    def add_replays(self, entries: List[Dict]) -> List[str]:
+        """Add many replay entries in one transaction and return their UFCs.
+
+        Each entry takes the same keys as ``add_replay``'s arguments.
+        """
+        if not entries:
+            return []
+        
+        # Callers may have reserved the UFCs they pass with allocate_ufcs
+        provided = [entry['ufc'] for entry in entries if entry.get('ufc')]
+        with self._allocating(provided) as allocate:
+            return self._insert_replays(entries, allocate)
+    
+    def _insert_replays(self, entries: List[Dict], allocate: UfcAllocator) -> List[str]:
+        added_at = int(time.time())
+        # Use provided UFCs or allocate new ones in a single batch
+        fresh_ufcs = iter(allocate(sum(1 for e in entries if not e.get('ufc'))))
+        rows = []
+        for entry in entries:
+            file_name = entry.get('file_name', "")
+            ufc = entry.get('ufc') or next(fresh_ufcs)
+            rows.append((
+                entry.get('video_link', ""), file_name, entry.get('timestamp', ""), ufc,
+                self._pack(entry.get('description', "")),
+                self._desc_key(entry.get('description', "")), 0, added_at, added_at,
+                entry.get('tags', "")
+            ))
+        ufc_list = [row[3] for row in rows]
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._db.transaction() as conn:
             c = conn.cursor()
+            c.executemany('''
+                INSERT INTO replays (video_link, file_name, timestamp, ufc, 
+                                   extended_desc, desc_key, recorded, added_at, updated_at, tags)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
             
-            # Main replays table
+            self._stage_ufcs(c, ufc_list)
             c.execute('''
-                CREATE TABLE IF NOT EXISTS replays (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    video_link TEXT,
-                    file_name TEXT,
-                    timestamp TEXT,
-                    ufc TEXT UNIQUE,
-                    extended_desc TEXT,
-                    recorded INTEGER,
-                    renamed_filename TEXT,
-                    date_added TEXT,
-                    tags TEXT
-                )
+                SELECT id, tags FROM replays
+                WHERE ufc IN (SELECT ufc FROM temp.staged_ufcs)
+                  AND tags IS NOT NULL AND tags != ''
             ''')
+            sync_replay_tags_many(c, c.fetchall())
+        
+        # A UFC may be reused after a permanent delete
+        self._descriptions.invalidate(ufc_list)
+        return ufc_list
+    
+    def allocate_ufcs(self, count: int = 1) -> List[str]:
+        """Reserve ``count`` UFCs that no replay (live or recycled) uses.
+
+        Codes are drawn at a width that keeps the code space sparse, so each
+        draw almost always succeeds; candidates are checked in one indexed
+        batch per round. Reserved codes are skipped by later calls until
+        ``add_replays`` settles them, whether it inserts them or fails, or
+        until they are given back with ``release_ufcs``.
+        """
+        if count <= 0:
+            return []
+        
+        with self._db.read() as conn:
+            c = conn.cursor()
+            c.execute("SELECT COUNT(*) FROM replays")
+            width = ufc_width_for(c.fetchone()[0] + len(self._reserved_ufcs) + count)
             
-            # Recycle bin table
+            codes: List[str] = []
+            while len(codes) < count:
+                candidates = {new_ufc(width) for _ in range(count - len(codes))}
+                candidates -= self._reserved_ufcs
+                candidates -= self._existing_ufcs(c, list(candidates))
+                codes.extend(candidates)
+                self._reserved_ufcs.update(candidates)
+        
+        return codes
+    
+    def release_ufcs(self, ufc_list: Iterable[str]):
+        """Give back reservations from ``allocate_ufcs``; a no-op for codes not reserved."""
+        self._reserved_ufcs.difference_update(ufc_list)
+    
+    @contextmanager
+    def _allocating(self, reserved: Iterable[str] = ()) -> Iterator[UfcAllocator]:
+        """Hand one write an allocator whose codes, and ``reserved``, are released when it ends.
+
+        Once the write has committed its codes are taken by rows, and if it
+        failed they are free again; either way they are no longer reserved.
+        """
+        allocated: List[str] = list(reserved)
+        
+        def allocate(count: int) -> List[str]:
+            codes = self.allocate_ufcs(count)
+            allocated.extend(codes)
+            return codes
+        
+        try:
+            yield allocate
+        finally:
+            self.release_ufcs(allocated)
+    
+    @staticmethod
+    def _existing_ufcs(c: sqlite3.Cursor, ufc_list: List[str]) -> Set[str]:
+        """Get which of the given UFCs are already used by a replay."""
+        found: Set[str] = set()
+        for start in range(0, len(ufc_list), 500):
+            chunk = ufc_list[start:start + 500]
+            placeholders = ', '.join('?' for _ in chunk)
+            c.execute(f"SELECT ufc FROM replays WHERE ufc IN ({placeholders})", chunk)
+            found.update(row[0] for row in c.fetchall())
+        return found
+    
+    @staticmethod
+    def _stage_ufcs(c: sqlite3.Cursor, ufc_list: List[str]):
+        """Load UFCs into a temp table so bulk statements can join against it."""
+        c.execute("CREATE TEMP TABLE IF NOT EXISTS staged_ufcs (ufc TEXT PRIMARY KEY)")
+        c.execute("DELETE FROM temp.staged_ufcs")
+        c.executemany(
+            "INSERT OR IGNORE INTO temp.staged_ufcs (ufc) VALUES (?)",
+            [(ufc,) for ufc in ufc_list]
+        )
+    
+    def get_all_replays(self, preview: bool = False) -> List[Dict]:
+        """Retrieve all replays from the database."""
+        return [replay for page in self.iter_replays(preview=preview) for replay in page]
+    
+    def get_replay_page(self, after_id: Optional[int] = None, limit: int = REPLAY_PAGE_SIZE,
+                        order: str = 'asc', preview: bool = False) -> List[Dict]:
+        """Get up to ``limit`` replays following ``after_id`` in id order.
+
+        Keyset pagination: each page is a single indexed range scan no matter
+        how deep into the table it starts. With ``preview``, descriptions are
+        cut short (see ``get_description``).
+        """
+        if order not in ('asc', 'desc'):
+            raise ValueError(f"Invalid order: {order}")
+        
+        comparison = '>' if order == 'asc' else '<'
+        where = f"AND id {comparison} ?" if after_id is not None else ""
+        params = (after_id, limit) if after_id is not None else (limit,)
+        
+        with self._db.read() as conn:
+            c = conn.cursor()
+            c.execute(f'''
+                SELECT {self._columns(preview)}
+                FROM replays
+                WHERE deleted_at IS NULL {where}
+                ORDER BY id {order.upper()}
+                LIMIT ?
+            ''', params)
+            rows = c.fetchall()
+        
+        return [self._row_to_replay(row, preview) for row in rows]
+    
+    def iter_replays(self, after_id: Optional[int] = None, limit: int = REPLAY_PAGE_SIZE,
+                     order: str = 'asc', preview: bool = False) -> Iterator[List[Dict]]:
+        """Stream replays as pages of at most ``limit`` rows.
+
+        The connection is only held while a page is being read, so writes can
+        run between pages.
+        """
+        while True:
+            page = self.get_replay_page(after_id, limit, order, preview)
+            if page:
+                yield page
+            if len(page) < limit:
+                return
+            after_id = page[-1]['id']
+    
+    def get_query_page(self, query: ReplayQuery, nulls: Optional[bool] = None,
+                       after: Optional[tuple] = None, limit: int = REPLAY_PAGE_SIZE,
+                       preview: bool = False) -> Tuple[List[Dict], Optional[tuple]]:
+        """Get up to ``limit`` replays matching ``query`` for one pass of ``iter_query``.
+
+        Returns the page and the (sort value, id) key to continue after.
+        """
+        where, params = query.where(self.has_fts)
+        condition, order, keyset_params = query.keyset(nulls, after)
+        
+        with self._db.read() as conn:
+            c = conn.cursor()
+            c.execute(f'''
+                SELECT {self._columns(preview)}, {query.sort_column}
+                FROM replays
+                WHERE {where} AND {condition}
+                ORDER BY {order}
+                LIMIT ?
+            ''', params + keyset_params + [limit])
+            rows = c.fetchall()
+        
+        last = (rows[-1][9], rows[-1][8]) if rows else None
+        return [self._row_to_replay(row, preview) for row in rows], last
+    
+    def iter_query(self, query: ReplayQuery, limit: int = REPLAY_PAGE_SIZE,
+                   preview: bool = False) -> Iterator[List[Dict]]:
+        """Stream the replays matching ``query`` in its sort order, a page at a time.
+
+        Each page is normally an index range scan that picks up after the
+        last one. A text search can only be answered for all matches at
+        once, so its matches are found and sorted once and then read back a
+        page at a time by id.
+        """
+        if query.search_text.strip():
+            yield from self._iter_ids(self._query_ids(query), limit, preview)
+            return
+        
+        for nulls in query.passes():
+            after = None
+            while True:
+                page, after = self.get_query_page(query, nulls, after, limit, preview)
+                if page:
+                    yield page
+                if len(page) < limit:
+                    break
+    
+    def _query_ids(self, query: ReplayQuery) -> List[int]:
+        """Get the ids of every replay matching ``query``, in its sort order."""
+        where, params = query.where(self.has_fts)
+        direction = 'DESC' if query.descending else 'ASC'
+        # NULLs sort first, as they do in the passes of get_query_page
+        order = f"{query.sort_column} {direction}, id {direction}"
+        with self._db.read() as conn:
+            rows = conn.execute(f"SELECT id FROM replays WHERE {where} ORDER BY {order}", params)
+            return [row[0] for row in rows]
+    
+    def _iter_ids(self, ids: List[int], limit: int, preview: bool) -> Iterator[List[Dict]]:
+        """Read replays by id a page at a time, keeping the order of ``ids``.
+
+        Replays deleted since the ids were collected are left out.
+        """
+        for start in range(0, len(ids), limit):
+            chunk = ids[start:start + limit]
+            placeholders = ', '.join('?' for _ in chunk)
+            with self._db.read() as conn:
+                rows = conn.execute(f'''
+                    SELECT {self._columns(preview)} FROM replays
+                    WHERE id IN ({placeholders}) AND deleted_at IS NULL
+                ''', chunk).fetchall()
+            by_id = {row[8]: row for row in rows}
+            page = [self._row_to_replay(by_id[i], preview) for i in chunk if i in by_id]
+            if page:
+                yield page
+    
+    def _columns(self, preview: bool) -> str:
+        return self.PREVIEW_COLUMNS if preview else self.REPLAY_COLUMNS
+    
+    @staticmethod
+    def _row_to_replay(row, preview: bool = False) -> Dict:
+        """Convert a replay row into the dict shape used by the UI.
+
+        Rows read with ``PREVIEW_COLUMNS`` also say whether their description
+        was cut short (``description_truncated``).
+        """
+        replay = {
+            'file_name': row[0] or "",
+            'timestamp': row[1] or "",
+            'ufc': row[2] or "",
+            'recorded': bool(row[3]),
+            'video_link': row[4] or "",
+            'description': row[5] or "",
+            'date_added': format_timestamp(row[6]),
+            'added_at': row[6],
+            'tags': row[7] or "",
+            'id': row[8]
+        }
+        if preview:
+            replay['description_truncated'] = len(replay['description']) > DESCRIPTION_PREVIEW_CHARS
+            replay['description'] = replay['description'][:DESCRIPTION_PREVIEW_CHARS]
+        return replay
+    
+    def get_description(self, ufc: str) -> str:
+        """Get a replay's full description, through a small LRU cache."""
+        description = self._descriptions.get(ufc)
+        if description is not None:
+            return description
+        
+        # Writers invalidate after they commit; text read before an edit
+        # committed is not cached once that invalidation has happened
+        generation = self._descriptions.generation
+        with self._db.read() as conn:
+            row = conn.execute(
+                "SELECT desc_text(extended_desc) FROM replays WHERE ufc = ?", (ufc,)
+            ).fetchone()
+        description = (row[0] or "") if row else ""
+        self._descriptions.put(ufc, description, generation)
+        return description
+    
+    def _pack(self, description: Optional[str]):
+        """Get the value to store for a description under this database's setting."""
+        return compress_text(description) if self.compress_descriptions else description
+    
+    @staticmethod
+    def _desc_key(description: Optional[str]) -> Optional[str]:
+        """Get the desc_key stored alongside a description, which sorts by it."""
+        return description[:DESCRIPTION_SORT_KEY_CHARS] if description is not None else None
+    
+    def compress_stored_descriptions(self, after_id: int = 0,
+                                     limit: int = REPLAY_PAGE_SIZE) -> Optional[int]:
+        """Compress long descriptions written before compression was turned on.
+
+        Looks at up to ``limit`` uncompressed long descriptions after replay
+        ``after_id`` in one transaction. Returns the last id looked at, to
+        continue from, or None when there are none left.
+        """
+        with self._db.transaction() as conn:
+            c = conn.cursor()
             c.execute('''
-                CREATE TABLE IF NOT EXISTS recycle_bin (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    video_link TEXT,
-                    file_name TEXT,
-                    timestamp TEXT,
-                    ufc TEXT UNIQUE,
-                    extended_desc TEXT,
-                    recorded INTEGER,
-                    renamed_filename TEXT,
-                    date_added TEXT,
-                    deleted_date TEXT,
-                    tags TEXT
+                SELECT id, extended_desc FROM replays
+                WHERE id > ? AND typeof(extended_desc) = 'text' AND length(extended_desc) >= ?
+                ORDER BY id
+                LIMIT ?
+            ''', (after_id, DESCRIPTION_COMPRESS_MIN_CHARS, limit))
+            rows = c.fetchall()
+            if not rows:
+                return None
+            
+            # The text is unchanged, so updated_at is left alone
+            packed = [(compress_text(text), replay_id) for replay_id, text in rows]
+            c.executemany(
+                "UPDATE replays SET extended_desc = ? WHERE id = ?",
+                [row for row in packed if isinstance(row[0], bytes)]
+            )
+        return rows[-1][0]
+    
+    UPDATABLE_FIELDS = ('file_name', 'timestamp', 'video_link',
+                        'extended_desc', 'recorded', 'tags', 'renamed_filename')
+    
+    def update_replay(self, ufc: str, **kwargs):
+        """Update a replay entry."""
+        self.update_replays({ufc: kwargs})
+    
+    def update_replays(self, changes: Dict[str, Dict]):
+        """Update many replays in one transaction, given {ufc: {field: value}}."""
+        updated_at = int(time.time())
+        # Group rows that set the same fields so each group is one executemany
+        groups: Dict[tuple, List[list]] = {}
+        for ufc, fields in changes.items():
+            fields = {k: v for k, v in fields.items() if k in self.UPDATABLE_FIELDS}
+            if 'extended_desc' in fields:
+                fields['desc_key'] = self._desc_key(fields['extended_desc'])
+                fields['extended_desc'] = self._pack(fields['extended_desc'])
+            if fields:
+                groups.setdefault(tuple(fields), []).append([*fields.values(), updated_at, ufc])
+        
+        if not groups:
+            return
+        
+        with self._db.transaction() as conn:
+            c = conn.cursor()
+            tagged_ufcs = []
+            
+            for field_names, rows in groups.items():
+                assignments = ', '.join(f"{field} = ?" for field in field_names)
+                c.executemany(
+                    f"UPDATE replays SET {assignments}, updated_at = ? "
+                    f"WHERE ufc = ? AND deleted_at IS NULL", rows
                 )
-            ''')
+                if 'tags' in field_names:
+                    tagged_ufcs.extend(row[-1] for row in rows)
             
-            # Database info table
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS db_info (
-                    unique_db_code TEXT UNIQUE
+            if tagged_ufcs:
+                self._stage_ufcs(c, tagged_ufcs)
+                c.execute(
+                    "SELECT id, tags FROM replays WHERE ufc IN (SELECT ufc FROM temp.staged_ufcs)"
                 )
-            ''')
+                sync_replay_tags_many(c, c.fetchall())
+        self._descriptions.invalidate(changes)
+    
+    def delete_replay(self, ufc: str, permanent: bool = False):
+        """Delete a replay (to recycle bin or permanently)."""
+        self.delete_replays([ufc], permanent)
+    
+    def delete_replays(self, ufc_list: List[str], permanent: bool = False):
+        """Delete many replays (to recycle bin or permanently) in one transaction."""
+        if not ufc_list:
+            return
+        
+        with self._db.transaction() as conn:
+            c = conn.cursor()
+            self._stage_ufcs(c, ufc_list)
             
-            conn.commit()
+            if permanent:
+                c.execute("DELETE FROM replays WHERE ufc IN (SELECT ufc FROM temp.staged_ufcs)")
+            else:
+                # Recycling only stamps the row; it stays where it is
+                c.execute('''
+                    UPDATE replays SET deleted_at = ?
+                    WHERE ufc IN (SELECT ufc FROM temp.staged_ufcs) AND deleted_at IS NULL
+                ''', (int(time.time()),))
+    
+    def get_all_tags(self) -> List[str]:
+        """Get all unique tags that are in use."""
+        return list(self.get_tag_counts())
     
-    def _migrate_db(self):
-        """Migrate old databases by adding missing columns."""
+    def get_tag_counts(self) -> Dict[str, int]:
+        """Get {tag: number of live replays} for every tag in use, by name."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.read() as conn:
                 c = conn.cursor()
-                
-                # Check and add 'tags' column to replays if missing
-                c.execute("PRAGMA table_info(replays)")
-                columns = [col[1] for col in c.fetchall()]
-                
-                if 'tags' not in columns:
-                    print(f"📦 Migrating database: Adding 'tags' column...")
-                    c.execute("ALTER TABLE replays ADD COLUMN tags TEXT")
-                    conn.commit()
-                    print("✅ Migration complete!")
-                
-                # Check and add 'tags' column to recycle_bin if missing
-                c.execute("PRAGMA table_info(recycle_bin)")
-                columns = [col[1] for col in c.fetchall()]
-                
-                if 'tags' not in columns:
-                    c.execute("ALTER TABLE recycle_bin ADD COLUMN tags TEXT")
-                    conn.commit()
-                
-        except Exception as e:
-            print(f"⚠️ Migration warning: {e}")
+                c.execute('''
+                    SELECT t.name, s.replay_count
+                    FROM tag_stats s JOIN tags t ON t.id = s.tag_id
+                    WHERE s.replay_count > 0
+                    ORDER BY t.name
+                ''')
+                return dict(c.fetchall())
+        except sqlite3.OperationalError as e:
+            # Tag tables might not exist if migration failed
+            print(f"⚠️ Warning: {e}")
+            return {}
     
-    def add_replay(self, file_name: str, timestamp: str = "", 
-                   video_link: str = "", description: str = "",
-                   tags: str = "", ufc: Optional[str] = None) -> str:
-        """Add a new replay entry."""
-        # Use provided UFC or generate new one
-        if not ufc:
-            ufc = self._generate_ufc(file_name)
+    def get_replay_stats(self) -> Dict[str, int]:
+        """Get live, recorded, unrecorded and recycled replay totals."""
+        with self._db.read() as conn:
+            row = conn.execute(
+                "SELECT live_count, recorded_count, deleted_count FROM replay_stats"
+            ).fetchone() or (0, 0, 0)
         
-        date_added = datetime.now().strftime("%m-%d-%Y %H:%M:%S")
+        return {
+            'total': row[0],
+            'recorded': row[1],
+            'unrecorded': row[0] - row[1],
+            'recycled': row[2]
+        }
+    
+    def get_daily_counts(self, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None) -> List[Tuple[str, int]]:
+        """Get (YYYY-MM-DD, replays added) per UTC day in [start, end), oldest first."""
+        clauses = ["replay_count > 0"]
+        params = []
+        if start:
+            clauses.append("day >= date(?, 'unixepoch')")
+            params.append(int(start.timestamp()))
+        if end:
+            clauses.append("day < date(?, 'unixepoch')")
+            params.append(int(end.timestamp()))
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._db.read() as conn:
             c = conn.cursor()
-            c.execute('''
-                INSERT INTO replays (video_link, file_name, timestamp, ufc, 
-                                   extended_desc, recorded, date_added, tags)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (video_link, file_name, timestamp, ufc, description, 0, date_added, tags))
-            conn.commit()
+            c.execute(f'''
+                SELECT day, replay_count FROM daily_counts
+                WHERE {' AND '.join(clauses)}
+                ORDER BY day
+            ''', params)
+            return c.fetchall()
+    
+    def rebuild_stats(self):
+        """Recount the trigger-maintained summary tables from the replays."""
+        with self._db.transaction() as conn:
+            rebuild_summary_tables(conn.cursor())
+    
+    def get_replays_added_between(self, start: datetime, end: datetime) -> List[Dict]:
+        """Get replays added in [start, end), oldest first."""
+        with self._db.read() as conn:
+            c = conn.cursor()
+            c.execute(f'''
+                SELECT {self.REPLAY_COLUMNS}
+                FROM replays
+                WHERE added_at >= ? AND added_at < ? AND deleted_at IS NULL
+                ORDER BY added_at
+            ''', (int(start.timestamp()), int(end.timestamp())))
+            rows = c.fetchall()
         
-        return ufc
+        return [self._row_to_replay(row) for row in rows]
     
-    def get_all_replays(self) -> List[Dict]:
-        """Retrieve all replays from the database."""
-        with sqlite3.connect(self.db_path) as conn:
+    def get_replays_by_tags(self, tags: List[str], match_all: bool = False) -> List[Dict]:
+        """Get replays having any (or, with match_all, every) of the given tags."""
+        names = split_tags(','.join(tags))
+        if not names:
+            return []
+        
+        placeholders = ', '.join('?' for _ in names)
+        having = "HAVING COUNT(*) = ?" if match_all else ""
+        params = names + [len(names)] if match_all else names
+        
+        with self._db.read() as conn:
             c = conn.cursor()
-            c.execute('''
-                SELECT file_name, timestamp, ufc, recorded, video_link, 
-                       extended_desc, date_added, tags
+            c.execute(f'''
+                SELECT {self.REPLAY_COLUMNS}
                 FROM replays
-            ''')
+                WHERE id IN (
+                    SELECT rt.replay_id
+                    FROM tags t JOIN replay_tags rt ON rt.tag_id = t.id
+                    WHERE t.name IN ({placeholders})
+                    GROUP BY rt.replay_id
+                    {having}
+                ) AND deleted_at IS NULL
+            ''', params)
             rows = c.fetchall()
         
+        return [self._row_to_replay(row) for row in rows]
+    
+    def get_replays_by_ufcs(self, ufc_list: List[str], query: Optional[ReplayQuery] = None,
+                            preview: bool = False) -> List[Dict]:
+        """Get the replays with the given UFCs (missing ones are skipped).
+
+        With ``query``, replays that do not match its filters are skipped too.
+        """
+        where, params = query.where(self.has_fts) if query else ("deleted_at IS NULL", [])
         replays = []
-        for row in rows:
-            replays.append({
-                'file_name': row[0] or "",
-                'timestamp': row[1] or "",
-                'ufc': row[2] or "",
-                'recorded': bool(row[3]),
-                'video_link': row[4] or "",
-                'description': row[5] or "",
-                'date_added': row[6] or "",
-                'tags': row[7] or ""
-            })
+        with self._db.read() as conn:
+            c = conn.cursor()
+            # Chunk to stay under SQLite's bound-parameter limit
+            for start in range(0, len(ufc_list), 500):
+                chunk = ufc_list[start:start + 500]
+                placeholders = ', '.join('?' for _ in chunk)
+                c.execute(
+                    f"SELECT {self._columns(preview)} FROM replays "
+                    f"WHERE ufc IN ({placeholders}) AND {where}",
+                    chunk + params
+                )
+                replays.extend(self._row_to_replay(row, preview) for row in c.fetchall())
         
         return replays
     
-    def update_replay(self, ufc: str, **kwargs):
-        """Update a replay entry."""
-        valid_fields = ['file_name', 'timestamp', 'video_link', 
-                       'extended_desc', 'recorded', 'tags', 'renamed_filename']
-        
-        updates = []
-        values = []
+    def search_ufcs(self, text: str, limit: Optional[int] = None) -> List[str]:
+        """Get UFCs of replays matching the search text, best matches first."""
+        text = text.strip()
+        if not text:
+            return []
         
-        for field, value in kwargs.items():
-            if field in valid_fields:
-                updates.append(f"{field} = ?")
-                values.append(value)
+        limit_sql = "LIMIT ?" if limit else ""
         
-        if not updates:
-            return
+        with self._db.read() as conn:
+            c = conn.cursor()
+            
+            if self.has_fts:
+                match = fts_prefix_query(text)
+                if not match:
+                    return []
+                # Weight file name and tag hits above description hits
+                c.execute(f'''
+                    SELECT r.ufc
+                    FROM replays_fts
+                    JOIN replays r ON r.id = replays_fts.rowid
+                    WHERE replays_fts MATCH ? AND r.deleted_at IS NULL
+                    ORDER BY bm25(replays_fts, 10.0, 1.0, 5.0)
+                    {limit_sql}
+                ''', (match, limit) if limit else (match,))
+            else:
+                pattern = f"%{text}%"
+                c.execute(f'''
+                    SELECT ufc FROM replays
+                    WHERE (file_name LIKE ? OR desc_text(extended_desc) LIKE ? OR tags LIKE ?)
+                      AND deleted_at IS NULL
+                    {limit_sql}
+                ''', (pattern, pattern, pattern, limit) if limit else (pattern,) * 3)
+            
+            return [row[0] for row in c.fetchall()]
+    
+    def get_database_code(self) -> str:
+        """Get the unique database code (UDC), creating one if missing."""
+        with self._db.read() as conn:
+            row = conn.execute("SELECT unique_db_code FROM db_info LIMIT 1").fetchone()
+        if row:
+            return row[0]
         
-        values.append(ufc)
-        query = f"UPDATE replays SET {', '.join(updates)} WHERE ufc = ?"
+        with self._db.transaction() as conn:
+            c = conn.cursor()
+            c.execute("SELECT unique_db_code FROM db_info LIMIT 1")
+            row = c.fetchone()
+            if row:
+                return row[0]
+            
+            # Match the code in the file name so the two never disagree
+            db_code = database_code_from_path(self.db_path) or random_hex(UDC_WIDTH)
+            c.execute("INSERT INTO db_info (unique_db_code) VALUES (?)", (db_code,))
+            return db_code
+    
+    def count_matches(self, column: str, find_text: str) -> int:
+        """Count replays whose column contains the given text."""
+        if column not in self.REPLACEABLE_COLUMNS:
+            raise ValueError(f"Invalid column: {column}")
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._db.read() as conn:
             c = conn.cursor()
-            c.execute(query, values)
-            conn.commit()
+            c.execute(
+                f"SELECT COUNT(*) FROM replays WHERE {self._text_of(column)} LIKE ? "
+                f"AND deleted_at IS NULL",
+                (f"%{find_text}%",)
+            )
+            return c.fetchone()[0]
     
-    def delete_replay(self, ufc: str, permanent: bool = False):
-        """Delete a replay (to recycle bin or permanently)."""
-        if permanent:
-            with sqlite3.connect(self.db_path) as conn:
-                c = conn.cursor()
-                c.execute("DELETE FROM replays WHERE ufc = ?", (ufc,))
-                conn.commit()
-        else:
-            # Move to recycle bin
-            self._move_to_recycle_bin(ufc)
+    @staticmethod
+    def _text_of(column: str) -> str:
+        """SQL for a column's text; descriptions may be stored compressed."""
+        return f"desc_text({column})" if column == 'extended_desc' else column
     
-    def _move_to_recycle_bin(self, ufc: str):
-        """Move a replay to the recycle bin."""
-        deleted_date = datetime.now().strftime("%m-%d-%Y %H:%M:%S")
+    def replace_text(self, column: str, find_text: str, replace_text: str):
+        """Replace text in a column across all matching replays."""
+        if column not in self.REPLACEABLE_COLUMNS:
+            raise ValueError(f"Invalid column: {column}")
+        
+        if column == 'extended_desc':
+            self._replace_in_descriptions(find_text, replace_text)
+            return
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._db.transaction() as conn:
             c = conn.cursor()
+            c.execute(
+                f"SELECT id, tags FROM replays WHERE {column} LIKE ? AND deleted_at IS NULL",
+                (f"%{find_text}%",)
+            )
+            matched = c.fetchall()
             
-            # Get replay data
-            c.execute('''
-                SELECT video_link, file_name, timestamp, ufc, extended_desc,
-                       recorded, renamed_filename, date_added, tags
-                FROM replays WHERE ufc = ?
-            ''', (ufc,))
+            c.execute(f'''
+                UPDATE replays SET {column} = REPLACE({column}, ?, ?), updated_at = ?
+                WHERE {column} LIKE ? AND deleted_at IS NULL
+            ''', (find_text, replace_text, int(time.time()), f"%{find_text}%"))
             
-            data = c.fetchone()
-            if not data:
-                return
+            if column == 'tags':
+                # REPLACE() is case-sensitive, exactly like str.replace
+                sync_replay_tags_many(c, [
+                    (replay_id, (tags or "").replace(find_text, replace_text))
+                    for replay_id, tags in matched
+                ])
+    
+    def _replace_in_descriptions(self, find_text: str, replace_text: str):
+        # REPLACE() cannot see into compressed text, so rows are rewritten here
+        with self._db.transaction() as conn:
+            c = conn.cursor()
+            c.execute(
+                "SELECT id, desc_text(extended_desc) FROM replays "
+                "WHERE desc_text(extended_desc) LIKE ? AND deleted_at IS NULL",
+                (f"%{find_text}%",)
+            )
+            updated_at = int(time.time())
+            replaced = [(replay_id, text.replace(find_text, replace_text))
+                        for replay_id, text in c.fetchall()]
+            c.executemany(
+                "UPDATE replays SET extended_desc = ?, desc_key = ?, updated_at = ? WHERE id = ?",
+                [(self._pack(text), self._desc_key(text), updated_at, replay_id)
+                 for replay_id, text in replaced]
+            )
+        self._descriptions.invalidate()
+    
+    # ==================== Merge ====================
+    
+    def diff_with(self, source_path: str) -> Dict:
+        """Compare another database's replays with this one's by UFC.
+
+        Returns ``{'summary': {action: count}, 'conflicts': [ufc, ...]}``
+        using the action names from core.merge; nothing is written.
+        """
+        with self._attached(source_path, 'merge_src') as conn:
+            c = conn.cursor()
+            columns = merge.source_columns(c, 'merge_src')
+            merge.build_plan(c, 'merge_src', columns)
+            result = {
+                'summary': merge.plan_summary(c),
+                'conflicts': merge.conflicting_ufcs(c)
+            }
+            c.execute("DROP TABLE temp.merge_plan")
+        return result
+    
+    def merge_from(self, source_path: str, policy: str = 'newest') -> Dict[str, int]:
+        """Merge another database's replays into this one in one transaction.
+
+        Conflicts (same UFC, different content) are settled by ``policy``, one
+        of core.merge.MERGE_POLICIES. Returns the count of replays per action.
+        """
+        with self._attached(source_path, 'merge_src'), self._allocating() as allocate:
+            with self._db.transaction() as conn:
+                c = conn.cursor()
+                columns = merge.source_columns(c, 'merge_src')
+                merge.build_plan(c, 'merge_src', columns)
+                merge.resolve_conflicts(c, 'merge_src', columns, policy)
+                merge.apply_plan(c, 'merge_src', columns, allocate)
+                summary = merge.plan_summary(c)
+                c.execute("DROP TABLE temp.merge_plan")
+        self._descriptions.invalidate()
+        return summary
+    
+    @contextmanager
+    def _attached(self, path: str, schema: str) -> Iterator[sqlite3.Connection]:
+        """Attach another database read-only for the duration of the block."""
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Database not found: {path}")
+        if os.path.abspath(path) == os.path.abspath(self.db_path):
+            raise ValueError("Cannot merge a database with itself")
+        
+        uri = f"file:{pathname2url(os.path.abspath(path))}?mode=ro"
+        # Holding the lock keeps other threads off the connection while attached
+        with self._db.exclusive() as conn:
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (uri,))
+            try:
+                yield conn
+            finally:
+                conn.execute(f"DETACH DATABASE {schema}")
+    
+    # ==================== Integrity ====================
+    
+    def check_integrity(self, check: Optional[integrity.IntegrityCheck] = None,
+                        progress: Optional[Callable[[int, int], None]] = None,
+                        should_stop: Optional[Callable[[], bool]] = None) -> integrity.IntegrityCheck:
+        """Run, or resume, a consistency check one short step at a time.
+
+        Stops between steps once ``should_stop()`` is true; pass the returned
+        check back in to carry on. Only one step at a time holds the shared
+        connection, and the page-level checks of a file read it through a
+        private read-only connection instead.
+        """
+        check = check or integrity.IntegrityCheck()
+        while not check.done:
+            if should_stop and should_stop():
+                break
+            if check.phase == integrity.QUICK_CHECK and not self.in_memory:
+                with closing(integrity.open_reader(self.db_path)) as conn:
+                    integrity.step(conn.cursor(), check, self.db_path)
+            else:
+                with self._db.read() as conn:
+                    integrity.step(conn.cursor(), check, self.db_path)
+            if progress:
+                progress(check.steps_done, check.steps_total)
+        return check
+    
+    def repair_integrity(self, problems: List[Dict]) -> Dict[str, int]:
+        """Fix the fixable problems from ``check_integrity`` in one transaction.
+
+        Returns the number of fixes per problem kind.
+        """
+        with self._allocating() as allocate, self._db.transaction() as conn:
+            c = conn.cursor()
+            fixed = integrity.repair(c, problems, self.db_path, allocate)
+        # Re-keyed replays take their cached descriptions with them
+        self._descriptions.invalidate()
+        return fixed
+    
+    # ==================== Health ====================
+    
+    def get_database_info(self) -> Dict:
+        """Gather size, fragmentation, table and index figures (see core.health).
+
+        The file is read through a private read-only connection, so the
+        shared one is only borrowed for an in-memory working copy. Also
+        carries when each maintenance task last ran, as epoch seconds.
+        """
+        if self.in_memory:
+            with self._db.read() as conn:
+                info = self._collect_info(conn)
+        else:
+            with closing(integrity.open_reader(self.db_path)) as conn:
+                info = self._collect_info(conn)
+        info.update(health.file_sizes(self.db_path))
+        info['in_memory'] = self.in_memory
+        return info
+    
+    @staticmethod
+    def _collect_info(conn: sqlite3.Connection) -> Dict:
+        info = health.collect(conn)
+        info['maintenance'] = dict(conn.execute("SELECT task, ran_at FROM maintenance_log"))
+        return info
+    
+    def record_maintenance(self, task: str):
+        """Note that an idle-time maintenance task has just finished."""
+        with self._db.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO maintenance_log (task, ran_at) VALUES (?, ?)",
+                (task, int(time.time()))
+            )
+    
+    # ==================== Change Feed ====================
+    
+    def get_change_seq(self) -> int:
+        """Get the sequence number of the latest logged change."""
+        with self._db.read() as conn:
+            return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+    
+    def changes_since(self, seq: int) -> Optional[List[Dict]]:
+        """Get changes logged after ``seq``, oldest first.
+
+        Returns None when the log has been pruned past ``seq``; the caller
+        must then reload from scratch.
+        """
+        with self._db.read() as conn:
+            c = conn.cursor()
+            c.execute("SELECT MIN(seq) FROM change_log")
+            oldest = c.fetchone()[0]
+            if oldest is not None and oldest > seq + 1:
+                return None
             
-            # Insert into recycle bin
             c.execute('''
-                INSERT INTO recycle_bin (video_link, file_name, timestamp, ufc,
-                                        extended_desc, recorded, renamed_filename,
-                                        date_added, deleted_date, tags)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (*data, deleted_date))
-            
-            # Delete from replays
-            c.execute("DELETE FROM replays WHERE ufc = ?", (ufc,))
-            conn.commit()
+                SELECT seq, op, tbl, ufc, row_id
+                FROM change_log
+                WHERE seq > ?
+                ORDER BY seq
+            ''', (seq,))
+            rows = c.fetchall()
+        
+        return [{
+            'seq': row[0],
+            'op': row[1],
+            'table': row[2],
+            'ufc': row[3],
+            'row_id': row[4]
+        } for row in rows]
     
-    def get_all_tags(self) -> List[str]:
-        """Get all unique tags from the database."""
-        tags = set()
+    # ==================== Recycle Bin ====================
+    
+    def get_recycled_replays(self) -> List[Dict]:
+        """Retrieve all replays in the recycle bin, newest deletions first."""
+        with self._db.read() as conn:
+            c = conn.cursor()
+            c.execute('''
+                SELECT file_name, ufc, deleted_at, video_link, tags, desc_text(extended_desc)
+                FROM replays
+                WHERE deleted_at IS NOT NULL
+                ORDER BY deleted_at DESC
+            ''')
+            rows = c.fetchall()
         
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                c = conn.cursor()
-                c.execute("SELECT tags FROM replays WHERE tags IS NOT NULL AND tags != ''")
-                rows = c.fetchall()
-            
-            for (tag_str,) in rows:
-                for tag in tag_str.split(','):
-                    tag = tag.strip()
-                    if tag:
-                        tags.add(tag)
-        except sqlite3.OperationalError as e:
-            # Column might not exist in old database
-            print(f"⚠️ Warning: {e}")
-            return []
+        return [{
+            'file_name': row[0] or "",
+            'ufc': row[1] or "",
+            'deleted_date': format_timestamp(row[2]),
+            'video_link': row[3] or "",
+            'tags': row[4] or "",
+            'description': row[5] or ""
+        } for row in rows]
+    
+    def count_recycled(self) -> int:
+        """Count replays in the recycle bin."""
+        with self._db.read() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM replays WHERE deleted_at IS NOT NULL"
+            ).fetchone()[0]
+    
+    def restore_replays(self, ufc_list: List[str]):
+        """Move replays from the recycle bin back into the main table in one statement."""
+        if not ufc_list:
+            return
         
-        return sorted(tags)
+        with self._db.transaction() as conn:
+            c = conn.cursor()
+            self._stage_ufcs(c, ufc_list)
+            c.execute('''
+                UPDATE replays SET deleted_at = NULL
+                WHERE ufc IN (SELECT ufc FROM temp.staged_ufcs) AND deleted_at IS NOT NULL
+            ''')
     
-    def auto_cleanup_recycle_bin(self, days: int = 30):
-        """Automatically delete old items from recycle bin."""
-        threshold = (datetime.now() - timedelta(days=days)).strftime("%m-%d-%Y %H:%M:%S")
+    def delete_from_recycle_bin(self, ufc_list: List[str]):
+        """Permanently delete replays from the recycle bin."""
+        if not ufc_list:
+            return
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._db.transaction() as conn:
             c = conn.cursor()
-            c.execute("DELETE FROM recycle_bin WHERE deleted_date < ?", (threshold,))
-            conn.commit()
+            self._stage_ufcs(c, ufc_list)
+            c.execute('''
+                DELETE FROM replays
+                WHERE ufc IN (SELECT ufc FROM temp.staged_ufcs) AND deleted_at IS NOT NULL
+            ''')
     
-    @staticmethod
-    def _generate_ufc(file_name: str) -> str:
-        """Generate a unique file code."""
-        return f"UFC-{str(uuid.uuid4())[:4].upper()}"
\ No newline at end of file
+    def empty_recycle_bin(self):
+        """Permanently delete everything in the recycle bin."""
+        with self._db.transaction() as conn:
+            conn.execute("DELETE FROM replays WHERE deleted_at IS NOT NULL")
+    
+    def auto_cleanup_recycle_bin(self, days: int = 30, limit: Optional[int] = None) -> int:
+        """Automatically delete old items from recycle bin.
+
+        With ``limit``, at most that many (oldest first) go per call, so the
+        purge can be spread over several short transactions. Returns the
+        number deleted.
+        """
+        threshold = int((datetime.now() - timedelta(days=days)).timestamp())
+        
+        with self._db.transaction() as conn:
+            c = conn.cursor()
+            if limit:
+                c.execute('''
+                    DELETE FROM replays WHERE id IN (
+                        SELECT id FROM replays WHERE deleted_at < ?
+                        ORDER BY deleted_at LIMIT ?
+                    )
+                ''', (threshold, limit))
+            else:
+                c.execute("DELETE FROM replays WHERE deleted_at < ?", (threshold,))
+            return c.rowcount
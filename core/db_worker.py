@@ -0,0 +1,179 @@
+"""Background threads for replay database writes and long-running jobs."""
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+
+from core.database import ReplayDatabase
+
+
+class DatabaseWriter(QThread):
+    """Runs ReplayDatabase writes one at a time on a dedicated thread.
+
+    Commands are queued with ``submit`` and run in order, each against the
+    database that was current when it was submitted. A command submitted
+    with a ``key`` replaces any queued, not-yet-started command with the same
+    key, so rapid repeated edits to one row collapse into a single write.
+    Outcomes come back on the GUI thread through Qt signals; nothing here
+    makes the GUI thread wait for the queue.
+    """
+    
+    command_finished = pyqtSignal(int, object)      # command id, result
+    command_failed = pyqtSignal(int, str, str)      # command id, label, error
+    queue_drained = pyqtSignal()                    # every queued command has run
+    
+    def __init__(self, database: Optional[ReplayDatabase] = None, parent=None):
+        super().__init__(parent)
+        self.database = database
+        self._cond = threading.Condition()
+        self._queue: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._busy = False
+        self._stopping = False
+        self._ids = itertools.count(1)
+        # Per-command completion callbacks; only touched on the GUI thread
+        self._callbacks: Dict[int, Callable[[Any], None]] = {}
+        # Called once the queue is empty; also GUI thread only
+        self._idle_callbacks: List[Callable[[], None]] = []
+        
+        self.command_finished.connect(self._run_callback)
+        self.queue_drained.connect(self._run_idle_callbacks)
+        self.command_failed.connect(lambda command_id, *_: self._callbacks.pop(command_id, None))
+    
+    def submit(self, label: str, method: str, *args,
+               key: Optional[Hashable] = None,
+               on_done: Optional[Callable[[Any], None]] = None, **kwargs) -> int:
+        """Queue a call to ``ReplayDatabase.<method>`` and return its command id.
+
+        ``label`` names the action in failure reports ("Failed to <label>");
+        ``on_done`` is called with the method's result on the GUI thread.
+        """
+        command_id = next(self._ids)
+        if on_done:
+            self._callbacks[command_id] = on_done
+        
+        with self._cond:
+            if key is None:
+                key = ('command', command_id)
+            elif key in self._queue:
+                # Superseded before it ran; the newer command goes to the back
+                replaced = self._queue.pop(key)
+                self._callbacks.pop(replaced[0], None)
+            self._queue[key] = (command_id, label, method, args, kwargs, self.database)
+            self._cond.notify_all()
+        
+        return command_id
+    
+    def wait_until_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued command has run; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self._busy, timeout)
+    
+    def when_idle(self, callback: Callable[[], None]):
+        """Call ``callback`` on the GUI thread once every queued command has run.
+
+        Runs it straight away if nothing is queued, so e.g. a dialog can show
+        the database as it will be once pending writes land without blocking
+        the window until they do.
+        """
+        if self.wait_until_idle(0):
+            callback()
+        else:
+            self._idle_callbacks.append(callback)
+    
+    def set_database(self, database: Optional[ReplayDatabase]):
+        """Run later commands against ``database``; queued ones keep their own."""
+        with self._cond:
+            self.database = database
+    
+    def stop(self):
+        """Run the remaining commands, then end the thread."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self.wait()
+    
+    def run(self):
+        """Worker loop: take the oldest command, run it, report the outcome."""
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                _, command = self._queue.popitem(last=False)
+                self._busy = True
+            
+            command_id, label, method, args, kwargs, database = command
+            try:
+                if database is None:
+                    raise RuntimeError("No database is open")
+                result = getattr(database, method)(*args, **kwargs)
+            except Exception as e:
+                self.command_failed.emit(command_id, label, str(e))
+            else:
+                self.command_finished.emit(command_id, result)
+            
+            with self._cond:
+                self._busy = False
+                drained = not self._queue
+                self._cond.notify_all()
+            if drained:
+                self.queue_drained.emit()
+    
+    def _run_callback(self, command_id: int, result: Any):
+        callback = self._callbacks.pop(command_id, None)
+        if callback:
+            callback(result)
+    
+    def _run_idle_callbacks(self):
+        # Commands submitted since the queue drained will drain it again
+        if not self.wait_until_idle(0):
+            return
+        callbacks, self._idle_callbacks = self._idle_callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+class BackgroundTask(QThread):
+    """Runs one long database job off the GUI thread.
+
+    The function is called with a ``progress`` keyword that emits
+    ``progress_changed``; its return value or error message comes back
+    through ``succeeded`` or ``failed``.
+    """
+    
+    progress_changed = pyqtSignal(int, int)     # done, total
+    succeeded = pyqtSignal(object)              # function result
+    failed = pyqtSignal(str)                    # error message
+    
+    def __init__(self, func: Callable[..., Any], *args, parent=None, **kwargs):
+        super().__init__(parent)
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+    
+    def run(self):
+        """Call the function and report how it ended."""
+        try:
+            result = self._func(*self._args, progress=self.progress_changed.emit, **self._kwargs)
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.succeeded.emit(result)
+    
+    def detach(self, parent: QObject):
+        """Stop reporting and leave the task to finish under ``parent``, deleting itself then.
+
+        For a dialog closing while its task still runs: waiting would freeze
+        the window, and destroying a running thread along with the dialog
+        would crash.
+        """
+        for signal in (self.progress_changed, self.succeeded, self.failed):
+            try:
+                signal.disconnect()
+            except TypeError:
+                pass    # Nothing was connected
+        self.setParent(parent)
+        self.finished.connect(self.deleteLater)
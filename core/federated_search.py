@@ -0,0 +1,146 @@
+"""Search every replay database in a folder without opening them one by one."""
+import os
+import sqlite3
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from urllib.request import pathname2url
+
+from core.compression import register_functions
+from core.constants import FEDERATED_SEARCH_LIMIT
+from core.identifiers import database_code_from_path
+from core.instrumentation import InstrumentedConnection
+from utils.helpers import format_timestamp, fts_prefix_query
+
+# Called as progress(databases_searched, databases_total) after each batch
+SearchProgress = Callable[[int, int], None]
+
+
+def find_databases(folder: str) -> List[str]:
+    """Get the paths of all database files in a folder."""
+    try:
+        names = sorted(os.listdir(folder))
+    except OSError:
+        return []
+    return [os.path.join(folder, name) for name in names if name.lower().endswith('.db')]
+
+
+def search_databases(db_paths: List[str], text: str, limit: int = FEDERATED_SEARCH_LIMIT,
+                     progress: Optional[SearchProgress] = None) -> List[Dict]:
+    """Search replays across many databases, best matches first.
+
+    Databases are ATTACHed read-only to one scratch connection, as many at a
+    time as SQLite's attach limit allows, and each batch is answered by a
+    single UNION ALL query. Each result names its source UDC and file.
+    """
+    text = text.strip()
+    if not text or not db_paths:
+        return []
+    
+    conn = sqlite3.connect("file::memory:", uri=True, factory=InstrumentedConnection)
+    register_functions(conn)
+    try:
+        batch_size = max(1, conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED))
+        results = []
+        for start in range(0, len(db_paths), batch_size):
+            batch = db_paths[start:start + batch_size]
+            results.extend(_search_batch(conn, batch, text, limit))
+            if progress:
+                progress(start + len(batch), len(db_paths))
+    finally:
+        conn.close()
+    
+    results.sort(key=lambda r: r['rank'])
+    return results[:limit]
+
+
+def _search_batch(conn: sqlite3.Connection, db_paths: List[str], text: str,
+                  limit: int) -> List[Dict]:
+    """Attach one batch of databases and run a single query over all of them."""
+    match = fts_prefix_query(text)
+    pattern = f"%{text}%"
+    attached = []
+    
+    try:
+        selects = []
+        params: list = []
+        
+        for path in db_paths:
+            schema = f"db{len(attached)}"
+            uri = f"file:{pathname2url(os.path.abspath(path))}?mode=ro"
+            try:
+                conn.execute(f"ATTACH DATABASE ? AS {schema}", (uri,))
+                attached.append(schema)
+                info = _describe(conn, schema, path)
+            except sqlite3.Error as e:
+                print(f"⚠️ Skipping {os.path.basename(path)}: {e}")
+                continue
+            if info is None:
+                continue
+            udc, has_fts, columns = info
+            added_at = "r.added_at" if 'added_at' in columns else "NULL"
+            live = "r.deleted_at IS NULL" if 'deleted_at' in columns else "1"
+            
+            if has_fts and match:
+                # Same ranking as ReplayDatabase.search_ufcs
+                selects.append(f'''
+                    SELECT ?, ?, r.ufc, r.file_name, r.timestamp, r.video_link,
+                           r.tags, {added_at}, f.rank
+                    FROM {schema}.replays_fts f
+                    JOIN {schema}.replays r ON r.id = f.rowid
+                    WHERE f.replays_fts MATCH ? AND f.rank MATCH 'bm25(10.0, 1.0, 5.0)'
+                      AND {live}
+                ''')
+                params += [udc, path, match]
+            else:
+                selects.append(f'''
+                    SELECT ?, ?, r.ufc, r.file_name, r.timestamp, r.video_link,
+                           r.tags, {added_at}, 0.0
+                    FROM {schema}.replays r
+                    WHERE (r.file_name LIKE ? OR desc_text(r.extended_desc) LIKE ? OR r.tags LIKE ?)
+                      AND {live}
+                ''')
+                params += [udc, path, pattern, pattern, pattern]
+        
+        if not selects:
+            return []
+        
+        query = " UNION ALL ".join(selects) + " ORDER BY 9 LIMIT ?"
+        rows = conn.execute(query, params + [limit]).fetchall()
+    finally:
+        for schema in attached:
+            conn.execute(f"DETACH DATABASE {schema}")
+    
+    return [{
+        'udc': row[0],
+        'db_path': row[1],
+        'ufc': row[2] or "",
+        'file_name': row[3] or "",
+        'timestamp': row[4] or "",
+        'video_link': row[5] or "",
+        'tags': row[6] or "",
+        'date_added': format_timestamp(row[7]),
+        'rank': row[8]
+    } for row in rows]
+
+
+def _describe(conn: sqlite3.Connection, schema: str,
+              path: str) -> Optional[Tuple[str, bool, Set[str]]]:
+    """Get (udc, has_fts, replay columns) for an attached database, or None if it has no replays."""
+    tables = {
+        row[0] for row in
+        conn.execute(f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table'")
+    }
+    if 'replays' not in tables:
+        return None
+    
+    columns = {row[1] for row in conn.execute(f"PRAGMA {schema}.table_info(replays)")}
+    
+    udc = ""
+    if 'db_info' in tables:
+        row = conn.execute(f"SELECT unique_db_code FROM {schema}.db_info LIMIT 1").fetchone()
+        udc = row[0] if row and row[0] else ""
+    
+    return (
+        udc or database_code_from_path(path) or os.path.basename(path),
+        'replays_fts' in tables,
+        columns
+    )
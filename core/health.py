@@ -0,0 +1,137 @@
+"""Size, fragmentation and upkeep figures for a replay database.
+
+Everything here comes from pragmas, sqlite_master and, when SQLite is built
+with it, the dbstat table; apart from one COUNT(*) per table nothing reads
+the rows themselves. ``advice`` turns the figures into hints such as
+"vacuum" or "start a new database" before the file gets slow.
+"""
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from core.backup import BACKUP_TIMESTAMP_FORMAT, list_backups
+from core.backup_store import BackupStore
+from core.constants import (
+    BACKUP_DB_FOLDER, DB_INFO_BACKUP_WARN_DAYS, DB_INFO_SPLIT_BYTES, DB_INFO_SPLIT_ROWS,
+    DB_INFO_VACUUM_FREE_RATIO, DB_INFO_WAL_WARN_BYTES
+)
+
+# PRAGMA auto_vacuum values
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
+
+def collect(conn: sqlite3.Connection) -> Dict:
+    """Read page, table and index figures from an open connection.
+
+    Sizes are None throughout when dbstat is not available.
+    """
+    def pragma(name: str):
+        return conn.execute(f"PRAGMA {name}").fetchone()[0]
+    
+    info = {
+        'page_size': pragma('page_size'),
+        'page_count': pragma('page_count'),
+        'freelist_count': pragma('freelist_count'),
+        'journal_mode': pragma('journal_mode'),
+        'auto_vacuum': AUTO_VACUUM_MODES.get(pragma('auto_vacuum'), "unknown"),
+        'schema_version': pragma('user_version'),
+    }
+    info['free_ratio'] = info['freelist_count'] / info['page_count'] if info['page_count'] else 0.0
+    
+    sizes = object_sizes(conn)
+    info['has_dbstat'] = sizes is not None
+    sizes = sizes or {}
+    
+    info['tables'] = []
+    info['indexes'] = []
+    objects = conn.execute(
+        "SELECT type, name, tbl_name, sql FROM sqlite_master "
+        "WHERE type IN ('table', 'index') ORDER BY name"
+    ).fetchall()
+    for kind, name, table, sql in objects:
+        if kind == 'index':
+            info['indexes'].append({'name': name, 'table': table, 'size': sizes.get(name)})
+            continue
+        # Virtual tables (the search index) have no rows of their own to
+        # count cheaply; their shadow tables are listed instead
+        virtual = (sql or "").upper().startswith('CREATE VIRTUAL')
+        rows = None if virtual else conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]
+        info['tables'].append({'name': name, 'rows': rows, 'size': sizes.get(name)})
+    
+    info['analyzed'] = any(table['name'] == 'sqlite_stat1' for table in info['tables'])
+    return info
+
+
+def object_sizes(conn: sqlite3.Connection) -> Optional[Dict[str, int]]:
+    """Get the bytes each table and index takes, or None without dbstat."""
+    try:
+        rows = conn.execute(
+            "SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return None     # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB
+    return dict(rows)
+
+
+def file_sizes(db_path: str) -> Dict[str, int]:
+    """Get the size of a database file and of its write-ahead log."""
+    def size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+    return {'file_size': size(db_path), 'wal_size': size(db_path + "-wal")}
+
+
+def last_backup(db_path: str) -> Optional[int]:
+    """Get when a database was last backed up (epoch seconds), from the store or old copies."""
+    times = []
+    snapshots = BackupStore().list_snapshots(db_path)
+    if snapshots:
+        times.append(datetime.strptime(snapshots[0]['taken_at'], BACKUP_TIMESTAMP_FORMAT))
+    backups = list_backups(BACKUP_DB_FOLDER, db_path)
+    if backups:
+        times.append(max(taken_at for taken_at, _ in backups))
+    return int(max(times).timestamp()) if times else None
+
+
+def _replay_count(info: Dict) -> int:
+    for table in info['tables']:
+        if table['name'] == 'replays':
+            return table['rows'] or 0
+    return 0
+
+
+def advice(info: Dict) -> List[str]:
+    """Suggest upkeep the figures call for, most pressing first."""
+    hints = []
+    if info['free_ratio'] >= DB_INFO_VACUUM_FREE_RATIO:
+        hints.append(f"{info['free_ratio']:.0%} of the file is unused pages; "
+                     f"vacuuming would give the space back")
+    if info['wal_size'] >= DB_INFO_WAL_WARN_BYTES:
+        hints.append(f"The write-ahead log has grown to {format_size(info['wal_size'])}; "
+                     f"it is folded back into the file when a checkpoint runs")
+    if info['file_size'] >= DB_INFO_SPLIT_BYTES or _replay_count(info) >= DB_INFO_SPLIT_ROWS:
+        hints.append("This database is getting large; consider starting a new one "
+                     "for new replays")
+    if not info['analyzed']:
+        hints.append("The query planner has no statistics yet (ANALYZE has not run)")
+    
+    backed_up = info.get('last_backup')
+    if backed_up is None:
+        hints.append("This database has never been backed up")
+    elif time.time() - backed_up > DB_INFO_BACKUP_WARN_DAYS * 24 * 60 * 60:
+        hints.append(f"The last backup is more than {DB_INFO_BACKUP_WARN_DAYS} days old")
+    return hints
+
+
+def format_size(size: Optional[int]) -> str:
+    """Format a byte count for display."""
+    if size is None:
+        return ""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
@@ -0,0 +1,58 @@
+"""Unique file code (UFC) and unique database code (UDC) generation."""
+import os
+import re
+import secrets
+from typing import Iterable, Set
+
+from core.constants import CODE_SPACE_MAX_FILL, UDC_WIDTH, UFC_MIN_WIDTH, UFC_PREFIX
+
+# Database files are named replays_UDC-<code>.db
+UDC_FILE_PATTERN = re.compile(r'UDC-([0-9A-F]+)\.db$', re.IGNORECASE)
+
+
+def random_hex(width: int) -> str:
+    """Get ``width`` random upper-case hex digits."""
+    return secrets.token_hex((width + 1) // 2)[:width].upper()
+
+
+def ufc_width_for(code_count: int) -> int:
+    """Get the narrowest UFC width whose code space stays sparse at this size.
+
+    Keeping the space at most CODE_SPACE_MAX_FILL full means a random draw
+    rarely hits a used code, so allocation never degrades into retry loops.
+    Older, narrower codes stay valid because every width shares the prefix.
+    """
+    width = UFC_MIN_WIDTH
+    while code_count > CODE_SPACE_MAX_FILL * 16 ** width:
+        width += 1
+    return width
+
+
+def new_ufc(width: int = UFC_MIN_WIDTH) -> str:
+    """Generate a random UFC candidate of the given width."""
+    return f"{UFC_PREFIX}{random_hex(width)}"
+
+
+def allocate_database_code(folders: Iterable[str]) -> str:
+    """Generate a UDC not used by any database file in the given folders."""
+    taken: Set[str] = set()
+    for folder in folders:
+        try:
+            names = os.listdir(folder)
+        except OSError:
+            continue
+        for name in names:
+            match = UDC_FILE_PATTERN.search(name)
+            if match:
+                taken.add(match.group(1).upper())
+    
+    while True:
+        code = random_hex(UDC_WIDTH)
+        if code not in taken:
+            return code
+
+
+def database_code_from_path(db_path: str) -> str:
+    """Get the UDC embedded in a database file name, or "" if it has none."""
+    match = UDC_FILE_PATTERN.search(os.path.basename(db_path))
+    return match.group(1).upper() if match else ""
@@ -0,0 +1,288 @@
+"""Per-statement timing for SQLite connections, with a slow-query log."""
+import bisect
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+
+from core.constants import (
+    QUERY_LOG_BACKUP_COUNT, QUERY_LOG_FILE, QUERY_LOG_MAX_BYTES, SLOW_QUERY_THRESHOLD_MS
+)
+
+# Upper bounds (ms) of the latency histogram buckets; one more bucket catches the rest
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# Statements worth asking the planner about
+_EXPLAINABLE = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|REPLACE|WITH)\b', re.IGNORECASE)
+# Runs of placeholders from chunked IN (...) lists collapse to one key
+_PLACEHOLDER_RUN = re.compile(r'\?(?:\s*,\s*\?)+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql: str) -> str:
+    """Reduce a statement to the key its timings are grouped under."""
+    return _PLACEHOLDER_RUN.sub('?, ...', _WHITESPACE.sub(' ', sql).strip())
+
+
+class StatementStats:
+    """Running totals and a latency histogram for one statement."""
+    
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.calls = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.last_plan: Optional[str] = None
+    
+    def add(self, elapsed_ms: float, rows: int):
+        self.calls += 1
+        self.rows += rows
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+    
+    def percentile(self, fraction: float) -> float:
+        """Estimate a latency percentile as the upper bound of its bucket."""
+        target = fraction * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+
+class QueryMonitor:
+    """Collects statement timings from every instrumented connection.
+
+    Statements slower than ``slow_threshold_ms`` are written, with their
+    ``EXPLAIN QUERY PLAN``, to a rotating log file.
+    """
+    
+    def __init__(self, slow_threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+                 log_path: str = QUERY_LOG_FILE):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._stats: Dict[str, StatementStats] = {}
+        self._logger: Optional[logging.Logger] = None
+    
+    def record(self, conn: Optional[sqlite3.Connection], sql: str, params,
+               elapsed_ms: float, rows: int, plan: Optional[str] = None):
+        """Add one statement execution; log it if it was slow.
+
+        ``plan`` is a query plan taken earlier; without one, a slow
+        statement is explained on ``conn`` unless that is None.
+        """
+        key = normalize_sql(sql)
+        slow = elapsed_ms >= self.slow_threshold_ms
+        if slow and plan is None and conn is not None:
+            plan = self._explain(conn, sql, params)
+        
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = StatementStats(key)
+            stats.add(elapsed_ms, rows)
+            if plan:
+                stats.last_plan = plan
+        
+        if slow:
+            self._log_slow(key, elapsed_ms, rows, plan)
+    
+    def snapshot(self) -> List[Dict]:
+        """Get a summary row per statement, slowest total time first."""
+        with self._lock:
+            rows = [{
+                'sql': s.sql,
+                'calls': s.calls,
+                'rows': s.rows,
+                'total_ms': s.total_ms,
+                'avg_ms': s.total_ms / s.calls,
+                'max_ms': s.max_ms,
+                'p50_ms': s.percentile(0.5),
+                'p95_ms': s.percentile(0.95),
+                'plan': s.last_plan or ""
+            } for s in self._stats.values()]
+        
+        rows.sort(key=lambda r: r['total_ms'], reverse=True)
+        return rows
+    
+    def reset(self):
+        """Forget every statement recorded so far."""
+        with self._lock:
+            self._stats.clear()
+    
+    @staticmethod
+    def _explain(conn: sqlite3.Connection, sql: str, params) -> Optional[str]:
+        """Get the query plan of a statement, or None if it has none."""
+        if not _EXPLAINABLE.match(sql):
+            return None
+        try:
+            # A plain cursor, so the EXPLAIN itself is not recorded
+            cursor = sqlite3.Cursor(conn)
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return '\n'.join(row[3] for row in cursor.fetchall())
+        except sqlite3.Error:
+            return None
+    
+    def _log_slow(self, sql: str, elapsed_ms: float, rows: int, plan: Optional[str]):
+        logger = self._get_logger()
+        if logger is None:
+            return
+        message = f"{elapsed_ms:.1f} ms, {rows} row(s): {sql}"
+        if plan:
+            message += "\n    " + plan.replace("\n", "\n    ")
+        logger.warning(message)
+    
+    def _get_logger(self) -> Optional[logging.Logger]:
+        """Set up the slow-query log the first time it is needed."""
+        with self._lock:
+            if self._logger is None:
+                logger = logging.getLogger("rkm.slow_queries")
+                logger.propagate = False
+                try:
+                    os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                    handler = RotatingFileHandler(
+                        self.log_path, maxBytes=QUERY_LOG_MAX_BYTES,
+                        backupCount=QUERY_LOG_BACKUP_COUNT, encoding='utf-8'
+                    )
+                except OSError as e:
+                    print(f"⚠️ Slow-query log unavailable: {e}")
+                    handler = logging.NullHandler()
+                handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                logger.addHandler(handler)
+                self._logger = logger
+            return self._logger
+
+
+# Shared by every instrumented connection in the application
+query_monitor = QueryMonitor()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement's latency and row count.
+
+    A query's time includes fetching its rows; it is reported once the
+    rows run out or the cursor moves on to another statement.
+    """
+    
+    _pending: Optional[list] = None     # [sql, params, elapsed_ms, rows, plan]
+    
+    def execute(self, sql: str, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        self._started(sql, parameters, start, self.rowcount)
+        return self
+    
+    def executemany(self, sql: str, seq_of_parameters):
+        self._finish()
+        if not isinstance(seq_of_parameters, (list, tuple)):
+            seq_of_parameters = list(seq_of_parameters)
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        first = seq_of_parameters[0] if seq_of_parameters else ()
+        self._started(sql, first, start, self.rowcount)
+        return self
+    
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, 0 if row is None else 1, row is None)
+        return row
+    
+    def fetchmany(self, size: Optional[int] = None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(start, len(rows), len(rows) < size)
+        return rows
+    
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+    
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0, True)
+            raise
+        self._fetched(start, 1, False)
+        return row
+    
+    def close(self):
+        self._finish()
+        super().close()
+    
+    def __del__(self):
+        # Outside the connection's lock here, so no query plan is taken;
+        # a statement already slow when last fetched brought its own
+        try:
+            self._finish(explain=False)
+        except Exception:
+            pass
+    
+    def _started(self, sql: str, params, start: float, rowcount: int):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._pending = [sql, params, elapsed_ms, 0, None]
+        if self.description is None:
+            # Not a query: nothing to fetch, report it now
+            self._pending[3] = max(rowcount, 0)
+            self._finish()
+        else:
+            self._explain_if_slow()
+    
+    def _fetched(self, start: float, rows: int, done: bool):
+        if self._pending is None:
+            return
+        self._pending[2] += (time.perf_counter() - start) * 1000
+        self._pending[3] += rows
+        if done:
+            self._finish()
+        else:
+            self._explain_if_slow()
+    
+    def _explain_if_slow(self):
+        """Take the query plan as soon as an unfinished query turns slow.
+
+        Still on the thread using the connection here; a query read with a
+        single ``fetchone`` is only finished once the cursor is collected,
+        too late to ask the connection.
+        """
+        pending = self._pending
+        if pending[4] is None and pending[2] >= query_monitor.slow_threshold_ms:
+            pending[4] = query_monitor._explain(self.connection, pending[0], pending[1]) or ""
+    
+    def _finish(self, explain: bool = True):
+        pending, self._pending = self._pending, None
+        if pending:
+            sql, params, elapsed_ms, rows, plan = pending
+            query_monitor.record(self.connection if explain else None, sql, params,
+                                 elapsed_ms, rows, plan)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose statements all go through InstrumentedCursor.
+
+    Pass as ``factory`` to ``sqlite3.connect``.
+    """
+    
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+    
+    def execute(self, sql: str, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql: str, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -0,0 +1,298 @@
+"""Consistency checks for a replay database, run in resumable steps, and their repair.
+
+A check works through three phases: the database code in db_info, SQLite's
+page-level ``quick_check`` one table at a time, and then the replays in id
+order, a chunk at a time. Every step is short. The IntegrityCheck it
+advances holds all that is needed to carry on, so a check can stop between
+any two steps and resume later. Problems are collected as dicts, and the
+fixable ones are applied together by ``repair`` in one transaction.
+"""
+import os
+import sqlite3
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.request import pathname2url
+
+from core.constants import (
+    DB_BUSY_TIMEOUT_MS, INTEGRITY_CHUNK_ROWS, INTEGRITY_REPORT_EXAMPLES, UDC_WIDTH
+)
+from core.identifiers import database_code_from_path, random_hex
+from core.instrumentation import InstrumentedConnection
+from core.migrations import rebuild_summary_tables, sync_replay_tags_many
+from utils.helpers import split_tags
+
+# Phases, in run order
+DB_INFO = 'db_info'
+QUICK_CHECK = 'quick_check'
+REPLAYS = 'replays'
+DONE = 'done'
+
+# Problem kinds and how the report names them
+PROBLEM_LABELS = {
+    'corruption': "Damaged tables or indexes",
+    'db_info': "Database code missing or wrong",
+    'missing_ufc': "Replays without a UFC",
+    'duplicate_ufc': "UFCs that differ from another only in case",
+    'tag_string': "Tag strings with blank or repeated tags",
+    'tag_links': "Tag index out of step with tag strings",
+    'renamed_filename': "Renamed file names that belong to another replay",
+}
+
+# Called as allocate(count) to get that many unused UFCs
+UfcAllocator = Callable[[int], List[str]]
+
+
+class IntegrityCheck:
+    """How far a check has got and what it has found; pass it back in to resume."""
+    
+    def __init__(self):
+        self.phase = DB_INFO
+        self.tables: List[str] = []         # still to quick_check
+        self.after_id = 0                   # last replay id examined
+        self.steps_done = 0
+        self.steps_total = 1                # known once db_info has run
+        self.problems: List[Dict] = []
+    
+    @property
+    def done(self) -> bool:
+        return self.phase == DONE
+    
+    @property
+    def fixable(self) -> List[Dict]:
+        return [problem for problem in self.problems if problem['fixable']]
+    
+    def summary(self) -> Dict[str, int]:
+        """Count the problems found per kind."""
+        counts: Dict[str, int] = {}
+        for problem in self.problems:
+            counts[problem['kind']] = counts.get(problem['kind'], 0) + 1
+        return counts
+
+
+def _problem(kind: str, detail: str, fixable: bool,
+             replay_id: Optional[int] = None, ufc: Optional[str] = None) -> Dict:
+    return {'kind': kind, 'detail': detail, 'fixable': fixable,
+            'replay_id': replay_id, 'ufc': ufc}
+
+
+def open_reader(db_path: str) -> sqlite3.Connection:
+    """Open a private read-only connection for checks that read the whole file."""
+    return sqlite3.connect(
+        f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro", uri=True,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000, factory=InstrumentedConnection
+    )
+
+
+def step(c: sqlite3.Cursor, check: IntegrityCheck, db_path: str):
+    """Advance ``check`` by one step."""
+    if check.phase == DB_INFO:
+        check.problems.extend(check_db_info(c, db_path))
+        c.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")
+        check.tables = [row[0] for row in c.fetchall()]
+        c.execute("SELECT COUNT(*) FROM replays")
+        chunks = -(-c.fetchone()[0] // INTEGRITY_CHUNK_ROWS)
+        check.steps_total = 1 + len(check.tables) + max(chunks, 1)
+        check.phase = QUICK_CHECK if check.tables else REPLAYS
+    
+    elif check.phase == QUICK_CHECK:
+        check.problems.extend(quick_check(c, check.tables.pop(0)))
+        if not check.tables:
+            check.phase = REPLAYS
+    
+    elif check.phase == REPLAYS:
+        problems, last_id = check_replays(c, check.after_id, INTEGRITY_CHUNK_ROWS)
+        check.problems.extend(problems)
+        if last_id is None:
+            check.phase = DONE
+        else:
+            check.after_id = last_id
+    
+    check.steps_done += 1
+    if check.done:
+        check.steps_total = check.steps_done
+    else:
+        # Rows added since the count was taken can stretch the last phase
+        check.steps_total = max(check.steps_total, check.steps_done + 1)
+
+
+def check_db_info(c: sqlite3.Cursor, db_path: str) -> List[Dict]:
+    """Check that exactly one database code is stored and that it matches the file name."""
+    c.execute("SELECT unique_db_code FROM db_info")
+    codes = [row[0] for row in c.fetchall()]
+    file_code = database_code_from_path(db_path)
+    
+    if not codes:
+        return [_problem('db_info', "No database code is stored", True)]
+    if len(codes) > 1:
+        return [_problem('db_info', f"{len(codes)} database codes are stored", True)]
+    if not (codes[0] or "").strip():
+        return [_problem('db_info', "The stored database code is blank", True)]
+    # Older databases store the code with its "UDC-" prefix
+    if file_code and codes[0].upper() not in (file_code, f"UDC-{file_code}"):
+        return [_problem(
+            'db_info', f"Stored code {codes[0]} does not match the file name (UDC-{file_code})", True
+        )]
+    return []
+
+
+def quick_check(c: sqlite3.Cursor, table: str) -> List[Dict]:
+    """Run SQLite's page and index checks over one table.
+
+    Damage cannot be repaired in place; the report points to a backup.
+    """
+    c.execute(f'PRAGMA quick_check("{table}")')
+    messages = [row[0] for row in c.fetchall()]
+    if messages == ['ok']:
+        return []
+    return [_problem('corruption', f"{table}: {message}", False) for message in messages]
+
+
+def tags_are_clean(tag_str: Optional[str]) -> bool:
+    """Whether a tag string is its own split_tags, joined by "," or ", "."""
+    if not tag_str:
+        return True
+    tags = split_tags(tag_str)
+    return tag_str in (', '.join(tags), ','.join(tags))
+
+
+def check_replays(c: sqlite3.Cursor, after_id: int,
+                  limit: int) -> Tuple[List[Dict], Optional[int]]:
+    """Check the next ``limit`` replays (live and recycled) after ``after_id``.
+
+    Returns the problems found and the last id examined, or None once
+    there are no replays left.
+    """
+    c.execute('''
+        SELECT r.id, r.ufc, r.tags, r.renamed_filename,
+               (SELECT group_concat(t.name, char(31))
+                FROM replay_tags rt JOIN tags t ON t.id = rt.tag_id
+                WHERE rt.replay_id = r.id),
+               r.ufc != upper(r.ufc)
+                   AND EXISTS (SELECT 1 FROM replays d WHERE d.ufc = upper(r.ufc))
+        FROM replays r
+        WHERE r.id > ?
+        ORDER BY r.id
+        LIMIT ?
+    ''', (after_id, limit))
+    rows = c.fetchall()
+    if not rows:
+        return [], None
+    
+    problems = []
+    for replay_id, ufc, tag_str, renamed, linked, case_duplicate in rows:
+        if not (ufc or "").strip():
+            problems.append(_problem('missing_ufc', f"Replay #{replay_id} has no UFC", True,
+                                     replay_id, ufc))
+        elif case_duplicate:
+            problems.append(_problem('duplicate_ufc', f"{ufc} duplicates {ufc.upper()}", True,
+                                     replay_id, ufc))
+        
+        if not tags_are_clean(tag_str):
+            problems.append(_problem('tag_string', f"{ufc}: tags \"{tag_str}\"", True,
+                                     replay_id, ufc))
+        expected = {tag.lower() for tag in split_tags(tag_str)}
+        actual = {name.lower() for name in (linked or "").split('\x1f') if name}
+        if expected != actual:
+            problems.append(_problem('tag_links', f"{ufc}: tag index does not match \"{tag_str or ''}\"",
+                                     True, replay_id, ufc))
+        
+        if renamed and ufc and '_UDC-' in renamed \
+                and f"_{ufc}_UDC-".lower() not in renamed.lower():
+            # Names in the app's own pattern carry the replay's UFC; one
+            # carrying another UFC (e.g. from before a merge re-keyed it)
+            # cannot be traced back to a file automatically
+            problems.append(_problem('renamed_filename', f"{ufc}: {renamed} names another replay",
+                                     False, replay_id, ufc))
+    
+    return problems, rows[-1][0]
+
+
+def repair(c: sqlite3.Cursor, problems: List[Dict], db_path: str,
+           allocate: UfcAllocator) -> Dict[str, int]:
+    """Fix the fixable ``problems`` inside the caller's transaction.
+
+    Each fix is worked out again from the row as it is now, so problems
+    that were resolved in the meantime are left alone. Returns the number
+    of fixes applied per kind.
+    """
+    ids: Dict[str, List[int]] = {}
+    for problem in problems:
+        if problem['fixable']:
+            ids.setdefault(problem['kind'], []).append(problem['replay_id'])
+    
+    fixed: Dict[str, int] = {}
+    now = int(time.time())
+    
+    if 'db_info' in ids and check_db_info(c, db_path):
+        c.execute("SELECT unique_db_code FROM db_info WHERE trim(unique_db_code) != ''")
+        stored = [row[0] for row in c.fetchall()]
+        code = database_code_from_path(db_path) or (stored[0] if stored else random_hex(UDC_WIDTH))
+        c.execute("DELETE FROM db_info")
+        c.execute("INSERT INTO db_info (unique_db_code) VALUES (?)", (code,))
+        fixed['db_info'] = 1
+    
+    for kind, condition in (
+        ('missing_ufc', "trim(COALESCE(ufc, '')) = ''"),
+        ('duplicate_ufc', "ufc != upper(ufc) AND upper(ufc) IN (SELECT ufc FROM replays)"),
+    ):
+        rows = _select_ids(c, "id", ids.get(kind, []), condition)
+        if rows:
+            codes = allocate(len(rows))
+            c.executemany(
+                "UPDATE replays SET ufc = ?, updated_at = ? WHERE id = ?",
+                [(code, now, row[0]) for code, row in zip(codes, rows)]
+            )
+            fixed[kind] = len(rows)
+    
+    rows = [row for row in _select_ids(c, "id, tags", ids.get('tag_string', []))
+            if not tags_are_clean(row[1])]
+    if rows:
+        c.executemany(
+            "UPDATE replays SET tags = ?, updated_at = ? WHERE id = ?",
+            [(', '.join(split_tags(tag_str)), now, replay_id) for replay_id, tag_str in rows]
+        )
+        fixed['tag_string'] = len(rows)
+    
+    # Relinking every touched replay also covers the rewritten tag strings
+    relink = ids.get('tag_links', []) + [row[0] for row in rows]
+    if relink:
+        sync_replay_tags_many(c, _select_ids(c, "id, tags", relink))
+        if ids.get('tag_links'):
+            fixed['tag_links'] = len(ids['tag_links'])
+    
+    if fixed:
+        # Counts kept by triggers may have drifted along with the rest
+        rebuild_summary_tables(c)
+    return fixed
+
+
+def _select_ids(c: sqlite3.Cursor, columns: str, replay_ids: List[int],
+                condition: str = "1") -> List[tuple]:
+    rows = []
+    for start in range(0, len(replay_ids), 500):
+        chunk = replay_ids[start:start + 500]
+        placeholders = ', '.join('?' for _ in chunk)
+        c.execute(f"SELECT {columns} FROM replays WHERE id IN ({placeholders}) AND {condition}",
+                  chunk)
+        rows.extend(c.fetchall())
+    return rows
+
+
+def format_integrity_report(check: IntegrityCheck) -> str:
+    """Describe what a finished check found in a few lines for the user."""
+    if not check.problems:
+        return "No problems found."
+    
+    lines = []
+    for kind, count in check.summary().items():
+        lines.append(f"{PROBLEM_LABELS[kind]}: {count}")
+        details = [p['detail'] for p in check.problems if p['kind'] == kind]
+        lines.extend(f"    {detail}" for detail in details[:INTEGRITY_REPORT_EXAMPLES])
+        if count > INTEGRITY_REPORT_EXAMPLES:
+            lines.append(f"    ... and {count - INTEGRITY_REPORT_EXAMPLES} more")
+    return '\n'.join(lines)
+
+
+def format_repair_report(fixed: Dict[str, int]) -> str:
+    """Describe what a repair changed in a few lines for the user."""
+    return '\n'.join(f"{PROBLEM_LABELS[kind]}: {count} fixed" for kind, count in fixed.items())
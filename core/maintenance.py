@@ -0,0 +1,373 @@
+"""Database upkeep that runs only while the user is idle.
+
+Each task gets a time budget. The run is preempted as soon as the user is
+active again: a task's own statements are interrupted on the spot, and
+work done through the shared connection stops at its next batch boundary.
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PyQt6.QtCore import QEvent, QObject, QThread, QTimer, pyqtSignal
+
+from core.backup import BACKUP_TIMESTAMP_FORMAT
+from core.backup_store import BackupStore
+from core.compression import register_functions
+from core.constants import (
+    AUTO_BACKUP_INTERVAL_HOURS, DB_BUSY_TIMEOUT_MS, MAINTENANCE_ANALYSIS_LIMIT,
+    MAINTENANCE_CHECK_INTERVAL, MAINTENANCE_COMPRESS_BATCH, MAINTENANCE_IDLE_SECONDS,
+    MAINTENANCE_PURGE_BATCH, MAINTENANCE_TASK_BUDGET_SECONDS, MAINTENANCE_VACUUM_BUDGET_SECONDS,
+    MAINTENANCE_VACUUM_PAGES, RECYCLE_BIN_AUTO_DELETE_DAYS
+)
+from core.database import ReplayDatabase
+from core.instrumentation import InstrumentedConnection
+from core.integrity import IntegrityCheck
+from core.migrations import install_search_triggers
+
+
+class MaintenancePreempted(Exception):
+    """Raised inside a task when the user becomes active or its budget runs out."""
+
+
+class MaintenanceContext:
+    """What a task may use: the shared database, a private connection and a deadline.
+
+    The private connection is opened on first use. Statements on it are
+    interrupted when the deadline passes or the run is preempted.
+    """
+    
+    def __init__(self, database: ReplayDatabase, stop_event: threading.Event):
+        self.database = database
+        self.db_path = database.db_path
+        self.stop_event = stop_event
+        self.deadline = 0.0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._watchdog: Optional[threading.Timer] = None
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(
+                self.db_path, timeout=DB_BUSY_TIMEOUT_MS / 1000,
+                isolation_level=None, check_same_thread=False,
+                factory=InstrumentedConnection
+            )
+            register_functions(self._conn)
+            install_search_triggers(self._conn.cursor())
+        return self._conn
+    
+    def start_task(self, budget_seconds: float):
+        """Begin a task's budget; its statements are cut off when it runs out."""
+        self.deadline = time.monotonic() + budget_seconds
+        self._watchdog = threading.Timer(budget_seconds, self.interrupt)
+        self._watchdog.daemon = True
+        self._watchdog.start()
+    
+    def end_task(self):
+        if self._watchdog:
+            self._watchdog.cancel()
+            self._watchdog = None
+    
+    def expired(self) -> bool:
+        """Whether the user is back or the task's budget has run out."""
+        return self.stop_event.is_set() or time.monotonic() >= self.deadline
+    
+    def check(self):
+        """Raise MaintenancePreempted if the task has to stop now."""
+        if self.expired():
+            raise MaintenancePreempted()
+    
+    def interrupt(self):
+        """Abort whatever the private connection is running."""
+        conn = self._conn
+        if conn is not None:
+            try:
+                conn.interrupt()
+            except sqlite3.ProgrammingError:
+                pass    # closed in the meantime; nothing left to stop
+    
+    def close(self):
+        self.end_task()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# ==================== Tasks ====================
+
+def flush_working_copy(ctx: MaintenanceContext):
+    """Write an in-memory working copy back to its file."""
+    ctx.database.flush(progress=lambda done, total: ctx.check())
+
+
+def checkpoint_wal(ctx: MaintenanceContext):
+    """Copy the write-ahead log back into the database and truncate it."""
+    ctx.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+
+def purge_recycle_bin(ctx: MaintenanceContext):
+    """Permanently delete expired recycle-bin entries in short batches."""
+    while True:
+        ctx.check()
+        deleted = ctx.database.auto_cleanup_recycle_bin(
+            RECYCLE_BIN_AUTO_DELETE_DAYS, limit=MAINTENANCE_PURGE_BATCH
+        )
+        if deleted < MAINTENANCE_PURGE_BATCH:
+            return
+
+
+def compress_descriptions(ctx: MaintenanceContext):
+    """Compress long descriptions stored before compression was turned on."""
+    if not ctx.database.compress_descriptions:
+        return
+    after_id = 0
+    while after_id is not None:
+        ctx.check()
+        after_id = ctx.database.compress_stored_descriptions(after_id, MAINTENANCE_COMPRESS_BATCH)
+
+
+def analyze(ctx: MaintenanceContext):
+    """Refresh the planner's statistics with a bounded, approximate ANALYZE."""
+    if ctx.database.in_memory:
+        return  # The file is overwritten by the next flush
+    ctx.conn.execute(f"PRAGMA analysis_limit = {MAINTENANCE_ANALYSIS_LIMIT}")
+    ctx.conn.execute("ANALYZE")
+
+
+def vacuum(ctx: MaintenanceContext):
+    """Return free pages to the file system.
+
+    Databases created before incremental auto-vacuum are converted with one
+    full VACUUM first; it is interrupted like any other statement if it
+    cannot finish within the budget.
+    """
+    if ctx.database.in_memory:
+        return  # The file is overwritten by the next flush
+    
+    conn = ctx.conn
+    if not conn.execute("PRAGMA freelist_count").fetchone()[0]:
+        return
+    
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        return
+    
+    while conn.execute("PRAGMA freelist_count").fetchone()[0]:
+        ctx.check()
+        conn.execute(f"PRAGMA incremental_vacuum({MAINTENANCE_VACUUM_PAGES})").fetchall()
+
+
+def auto_backup(ctx: MaintenanceContext):
+    """Snapshot the database into the backup store if the last one is old enough."""
+    ctx.database.flush(progress=lambda done, total: ctx.check())
+    store = BackupStore()
+    snapshots = store.list_snapshots(ctx.db_path)
+    if snapshots:
+        taken_at = datetime.strptime(snapshots[0]['taken_at'], BACKUP_TIMESTAMP_FORMAT)
+        if datetime.now() - taken_at < timedelta(hours=AUTO_BACKUP_INTERVAL_HOURS):
+            return
+    
+    # Raising from the progress callback aborts the copy between steps
+    store.snapshot(ctx.db_path, progress=lambda done, total: ctx.check())
+    store.prune(ctx.db_path)
+
+
+# Integrity checks cut short by the user, by absolute database path
+_unfinished_checks: Dict[str, IntegrityCheck] = {}
+
+
+def check_integrity(ctx: MaintenanceContext):
+    """Carry the integrity check on from where the last idle period left it."""
+    db_path = os.path.abspath(ctx.db_path)
+    check = ctx.database.check_integrity(_unfinished_checks.pop(db_path, None),
+                                         should_stop=ctx.expired)
+    if not check.done:
+        _unfinished_checks[db_path] = check
+        raise MaintenancePreempted()    # Not a finished run; resume when next idle
+    
+    if check.problems:
+        print(f"⚠️ Integrity check found {len(check.problems)} problem(s) in "
+              f"{os.path.basename(db_path)}; use Check Database Integrity to review them")
+
+
+# (name, function, minimum seconds between runs, budget seconds), in run order
+MAINTENANCE_TASKS: List[Tuple[str, Callable[[MaintenanceContext], None], float, float]] = [
+    ('flush_working_copy', flush_working_copy, 60, MAINTENANCE_TASK_BUDGET_SECONDS),
+    ('checkpoint', checkpoint_wal, 10 * 60, MAINTENANCE_TASK_BUDGET_SECONDS),
+    ('purge_recycle_bin', purge_recycle_bin, 60 * 60, MAINTENANCE_TASK_BUDGET_SECONDS),
+    ('compress_descriptions', compress_descriptions, 60 * 60, MAINTENANCE_TASK_BUDGET_SECONDS),
+    ('analyze', analyze, 24 * 60 * 60, MAINTENANCE_TASK_BUDGET_SECONDS),
+    ('vacuum', vacuum, 24 * 60 * 60, MAINTENANCE_VACUUM_BUDGET_SECONDS),
+    ('auto_backup', auto_backup, 60 * 60, MAINTENANCE_VACUUM_BUDGET_SECONDS),
+    ('check_integrity', check_integrity, 7 * 24 * 60 * 60, MAINTENANCE_TASK_BUDGET_SECONDS),
+]
+
+
+class MaintenanceRun(QThread):
+    """Runs the due tasks one after another until done or preempted."""
+    
+    task_finished = pyqtSignal(str)             # task name
+    task_failed = pyqtSignal(str, str)          # task name, error
+    
+    def __init__(self, database: ReplayDatabase, tasks: List[tuple], parent=None):
+        super().__init__(parent)
+        self._stop_event = threading.Event()
+        # A handle of its own on the shared connection, so the window can
+        # close its handle while a preempted run is still winding down
+        self._database = ReplayDatabase(
+            database.db_path, in_memory=database.in_memory,
+            compress_descriptions=database.compress_descriptions
+        )
+        self._ctx = MaintenanceContext(self._database, self._stop_event)
+        self._tasks = tasks
+    
+    def preempt(self):
+        """Stop as soon as possible; safe to call from the GUI thread."""
+        self._stop_event.set()
+        self._ctx.interrupt()
+    
+    def run(self):
+        try:
+            for name, func, _, budget in self._tasks:
+                if self._stop_event.is_set():
+                    return
+                self._ctx.start_task(budget)
+                try:
+                    func(self._ctx)
+                    self._ctx.database.record_maintenance(name)
+                except MaintenancePreempted:
+                    continue
+                except sqlite3.OperationalError as e:
+                    # An interrupted statement is a preemption, not a failure
+                    if 'interrupt' not in str(e):
+                        self.task_failed.emit(name, str(e))
+                    continue
+                except Exception as e:
+                    self.task_failed.emit(name, str(e))
+                    continue
+                finally:
+                    self._ctx.end_task()
+                self.task_finished.emit(name)
+        finally:
+            self._ctx.close()
+            self._database.close()
+
+
+class MaintenanceScheduler(QObject):
+    """Watches for user input and runs maintenance after a stretch of idleness.
+
+    Install with ``QApplication.installEventFilter``; any keyboard or mouse
+    input preempts a run in progress.
+    """
+    
+    INPUT_EVENTS = {
+        QEvent.Type.KeyPress, QEvent.Type.MouseButtonPress, QEvent.Type.MouseMove,
+        QEvent.Type.Wheel, QEvent.Type.TouchBegin
+    }
+    
+    task_failed = pyqtSignal(str, str)          # task name, error
+    
+    def __init__(self, parent=None, idle_seconds: float = MAINTENANCE_IDLE_SECONDS):
+        super().__init__(parent)
+        self.idle_seconds = idle_seconds
+        self.database: Optional[ReplayDatabase] = None
+        self.auto_backup = False
+        # Extra condition for starting a run, e.g. "no writes are queued"
+        self.can_run: Callable[[], bool] = lambda: True
+        
+        self._last_input = time.monotonic()
+        self._last_run: Dict[Tuple[str, str], float] = {}
+        self._run: Optional[MaintenanceRun] = None
+        self._stopped_callbacks: List[Callable[[], None]] = []
+        
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._check)
+        self._timer.start(MAINTENANCE_CHECK_INTERVAL)
+    
+    def set_database(self, database: Optional[ReplayDatabase]):
+        """Switch databases; a run on the old one stops at its next check."""
+        self.preempt()
+        self.database = database
+    
+    def eventFilter(self, obj, event) -> bool:
+        if event.type() in self.INPUT_EVENTS:
+            self._last_input = time.monotonic()
+            if self._run is not None:
+                self.preempt()
+        return False
+    
+    def preempt(self):
+        """Ask a run in progress to stop, without waiting for it.
+
+        Work through the shared connection only stops at its next batch
+        boundary; until the run has finished, no new one is started.
+        """
+        if self._run is not None:
+            self._run.preempt()
+    
+    def when_stopped(self, callback: Callable[[], None]):
+        """Call ``callback`` once no run is in progress, preempting one that is.
+
+        A run holds a handle on its database until it has wound down, so
+        anything that replaces a database file has to wait for this. Runs
+        ``callback`` straight away if nothing is running.
+        """
+        if self._run is None:
+            callback()
+            return
+        self._stopped_callbacks.append(callback)
+        self.preempt()
+    
+    def stop(self):
+        """Stop checking and wait for a run in progress to end (on shutdown)."""
+        self._timer.stop()
+        if self._run is not None:
+            self._run.preempt()
+            self._run.wait()
+            self._run = None
+    
+    def due_tasks(self) -> List[tuple]:
+        """Get the tasks whose interval has passed for the current database."""
+        if not self.database:
+            return []
+        now = time.monotonic()
+        db_path = os.path.abspath(self.database.db_path)
+        return [
+            task for task in MAINTENANCE_TASKS
+            if (task[0] != 'auto_backup' or self.auto_backup)
+            and now - self._last_run.get((db_path, task[0]), float('-inf')) >= task[2]
+        ]
+    
+    def _check(self):
+        if self._run is not None or not self.database:
+            return
+        if time.monotonic() - self._last_input < self.idle_seconds or not self.can_run():
+            return
+        
+        tasks = self.due_tasks()
+        if not tasks:
+            return
+        
+        db_path = os.path.abspath(self.database.db_path)
+        run = MaintenanceRun(self.database, tasks, self)
+        # A failed task waits out its interval too rather than retrying at once
+        run.task_finished.connect(lambda name: self._mark_run(db_path, name))
+        run.task_failed.connect(lambda name, _: self._mark_run(db_path, name))
+        run.task_failed.connect(self.task_failed.emit)
+        run.finished.connect(lambda: self._on_run_finished(run))
+        self._run = run
+        run.start()
+    
+    def _mark_run(self, db_path: str, name: str):
+        self._last_run[(db_path, name)] = time.monotonic()
+    
+    def _on_run_finished(self, run: MaintenanceRun):
+        if self._run is run:
+            self._run = None
+            callbacks, self._stopped_callbacks = self._stopped_callbacks, []
+            for callback in callbacks:
+                callback()
@@ -0,0 +1,237 @@
+"""Set-based diff and merge of one replay database into another.
+
+The source database is ATTACHed to the target's connection and compared by
+UFC entirely in SQL. Every source replay gets one row in a temporary plan
+table saying what happens to it, and the plan is applied with a handful of
+INSERT ... SELECT / UPDATE statements, so merging tens of thousands of rows
+never loops over them in Python.
+"""
+import sqlite3
+from typing import Callable, Dict, List, Optional
+
+from core.constants import DESCRIPTION_SORT_KEY_CHARS
+from core.migrations import sync_replay_tags_many
+
+# Conflict resolution policies and their descriptions for the UI
+MERGE_POLICIES = {
+    'newest': "Newest edit wins",
+    'keep_both': "Keep both (the incoming copy gets a new UFC)",
+    'skip': "Skip conflicting replays",
+}
+
+# Plan actions
+ADD = 'add'                 # UFC unknown here; inserted as is
+REKEY = 'rekey'             # inserted under a freshly allocated UFC
+UPDATE = 'update'           # conflict won by the incoming copy
+KEEP = 'keep'               # conflict won by the local copy
+SKIP = 'skip'               # conflict left alone by policy
+IDENTICAL = 'identical'     # same content on both sides
+DELETED = 'deleted'         # UFC is in the local recycle bin
+CONFLICT = 'conflict'       # same UFC, different content (before a policy is applied)
+
+# Columns copied from an incoming replay
+MERGE_COLUMNS = ('video_link', 'file_name', 'timestamp', 'extended_desc', 'recorded',
+                 'renamed_filename', 'added_at', 'updated_at', 'tags')
+
+# Columns whose differences make two replays with one UFC a conflict
+CONTENT_COLUMNS = ('video_link', 'file_name', 'timestamp', 'extended_desc', 'recorded',
+                   'renamed_filename', 'tags')
+
+# Called as allocate(count) to get that many unused UFCs
+UfcAllocator = Callable[[int], List[str]]
+
+# What a re-keyed copy stores in merged_from for source row ``s``: its UFC,
+# or its row id for a source row that has no UFC
+ORIGIN_SQL = "COALESCE(NULLIF(s.ufc, ''), '#' || s.id)"
+
+
+def source_columns(c: sqlite3.Cursor, schema: str) -> Dict[str, str]:
+    """Map each merge column to an expression over ``{schema}.replays AS s``.
+
+    Columns an older source lacks read as NULL, except that a source from
+    before epoch dates has its ``date_added`` text converted, and a missing
+    modification time falls back to the time the replay was added.
+    ``deleted_at`` is included so recycled source rows can be left out.
+    """
+    c.execute(f"PRAGMA {schema}.table_info(replays)")
+    present = {row[1] for row in c.fetchall()}
+    if not present:
+        raise ValueError("The selected database has no replays table")
+    
+    expressions = {
+        col: f"s.{col}" if col in present else "NULL"
+        for col in MERGE_COLUMNS + ('deleted_at',)
+    }
+    if 'added_at' not in present and 'date_added' in present:
+        expressions['added_at'] = display_date_sql("s.date_added")
+    if 'updated_at' not in present:
+        expressions['updated_at'] = expressions['added_at']
+    return expressions
+
+
+def display_date_sql(column: str) -> str:
+    """SQL for parse_display_date(column): local "MM-DD-YYYY HH:MM:SS" text to epoch seconds.
+
+    Text in any other shape gives NULL, as it does in migration 3.
+    """
+    text = f"trim({column})"
+    iso = (f"substr({text}, 7, 4) || '-' || substr({text}, 1, 2) || '-' || "
+           f"substr({text}, 4, 2) || ' ' || substr({text}, 12)")
+    return (f"CASE WHEN {text} GLOB '[0-9][0-9]-[0-9][0-9]-[0-9][0-9][0-9][0-9] "
+            f"[0-9][0-9]:[0-9][0-9]:[0-9][0-9]' "
+            f"THEN CAST(strftime('%s', {iso}, 'utc') AS INTEGER) END")
+
+
+def build_plan(c: sqlite3.Cursor, schema: str, columns: Dict[str, str]):
+    """Classify every live source replay into ``temp.merge_plan``.
+
+    Rows become ADD, IDENTICAL, CONFLICT or DELETED; source rows without a
+    UFC are REKEY. A row that an earlier merge already copied here under a
+    new UFC, unchanged since, is IDENTICAL too, so merging the same database
+    again adds nothing.
+    """
+    # Already copied here by an earlier merge, and unchanged since
+    copied = (f"EXISTS (SELECT 1 FROM main.replays k WHERE k.merged_from = {ORIGIN_SQL} "
+              f"AND k.deleted_at IS NULL AND {_same_content(columns, 'k')})")
+    c.execute("DROP TABLE IF EXISTS temp.merge_plan")
+    c.execute('''
+        CREATE TEMP TABLE merge_plan (
+            src_id INTEGER PRIMARY KEY,
+            action TEXT NOT NULL,
+            ufc TEXT
+        )
+    ''')
+    c.execute(f'''
+        INSERT INTO temp.merge_plan (src_id, action, ufc)
+        SELECT s.id,
+               CASE
+                   WHEN s.ufc IS NULL OR s.ufc = '' THEN
+                       CASE WHEN {copied} THEN '{IDENTICAL}' ELSE '{REKEY}' END
+                   WHEN t.id IS NULL THEN '{ADD}'
+                   WHEN t.deleted_at IS NOT NULL THEN '{DELETED}'
+                   WHEN {_same_content(columns, 't')} THEN '{IDENTICAL}'
+                   WHEN {copied} THEN '{IDENTICAL}'
+                   ELSE '{CONFLICT}'
+               END,
+               s.ufc
+        FROM {schema}.replays s
+        LEFT JOIN main.replays t ON t.ufc = s.ufc
+        WHERE {columns['deleted_at']} IS NULL
+    ''')
+    c.execute("CREATE INDEX temp.idx_merge_plan_action ON merge_plan(action)")
+
+
+def _same_content(columns: Dict[str, str], alias: str) -> str:
+    """SQL that is true when source row ``s`` and local row ``alias`` have the same content."""
+    # Descriptions compare by text, whether either side stores them compressed
+    return ' AND '.join(
+        f"desc_text({columns[col]}) IS desc_text({alias}.{col})" if col == 'extended_desc'
+        else f"{columns[col]} IS {alias}.{col}"
+        for col in CONTENT_COLUMNS
+    )
+
+
+def resolve_conflicts(c: sqlite3.Cursor, schema: str, columns: Dict[str, str], policy: str):
+    """Turn CONFLICT rows in the plan into concrete actions under ``policy``."""
+    if policy not in MERGE_POLICIES:
+        raise ValueError(f"Unknown merge policy: {policy}")
+    
+    if policy == 'newest':
+        # Ties keep the local copy; a missing time never beats a known one
+        c.execute(f'''
+            UPDATE temp.merge_plan
+            SET action = CASE
+                WHEN (SELECT COALESCE({columns['updated_at']}, 0) FROM {schema}.replays s
+                      WHERE s.id = merge_plan.src_id)
+                   > (SELECT COALESCE(t.updated_at, 0) FROM main.replays t
+                      WHERE t.ufc = merge_plan.ufc)
+                THEN '{UPDATE}' ELSE '{KEEP}'
+            END
+            WHERE action = '{CONFLICT}'
+        ''')
+    elif policy == 'keep_both':
+        c.execute(f"UPDATE temp.merge_plan SET action = '{REKEY}' WHERE action = '{CONFLICT}'")
+    else:
+        c.execute(f"UPDATE temp.merge_plan SET action = '{SKIP}' WHERE action = '{CONFLICT}'")
+
+
+def apply_plan(c: sqlite3.Cursor, schema: str, columns: Dict[str, str],
+               allocate: UfcAllocator):
+    """Insert and update replays in the main database as the plan says."""
+    # The description's sort key is worked out here, not copied
+    names = ', '.join(MERGE_COLUMNS + ('desc_key',))
+    values = ', '.join([columns[col] for col in MERGE_COLUMNS]
+                       + [f"desc_prefix({columns['extended_desc']}, {DESCRIPTION_SORT_KEY_CHARS})"])
+    # Re-keyed copies remember which source row they came from
+    insert = f'''
+        INSERT INTO main.replays ({names}, ufc, merged_from)
+        SELECT {values}, p.ufc,
+               CASE WHEN p.action = '{REKEY}' THEN {ORIGIN_SQL} END
+        FROM temp.merge_plan p
+        JOIN {schema}.replays s ON s.id = p.src_id
+        WHERE p.action = ?
+    '''
+    
+    c.execute(insert, (ADD,))
+    
+    # Allocated only now, so new codes are checked against the rows just added
+    c.execute(f"SELECT src_id FROM temp.merge_plan WHERE action = '{REKEY}'")
+    src_ids = [row[0] for row in c.fetchall()]
+    if src_ids:
+        c.executemany(
+            "UPDATE temp.merge_plan SET ufc = ? WHERE src_id = ?",
+            zip(allocate(len(src_ids)), src_ids)
+        )
+        c.execute(insert, (REKEY,))
+    
+    c.execute(f'''
+        UPDATE main.replays
+        SET ({names}) = (
+            SELECT {values}
+            FROM temp.merge_plan p
+            JOIN {schema}.replays s ON s.id = p.src_id
+            WHERE p.ufc = replays.ufc
+        )
+        WHERE ufc IN (SELECT ufc FROM temp.merge_plan WHERE action = '{UPDATE}')
+    ''')
+    
+    c.execute(f'''
+        SELECT id, tags FROM main.replays
+        WHERE ufc IN (
+            SELECT ufc FROM temp.merge_plan WHERE action IN ('{ADD}', '{REKEY}', '{UPDATE}')
+        )
+    ''')
+    sync_replay_tags_many(c, c.fetchall())
+
+
+def plan_summary(c: sqlite3.Cursor) -> Dict[str, int]:
+    """Count the plan's rows per action."""
+    c.execute("SELECT action, COUNT(*) FROM temp.merge_plan GROUP BY action")
+    return dict(c.fetchall())
+
+
+def conflicting_ufcs(c: sqlite3.Cursor, limit: Optional[int] = None) -> List[str]:
+    """Get the UFCs the plan marked as conflicts, in order."""
+    limit_sql = "LIMIT ?" if limit else ""
+    c.execute(f'''
+        SELECT ufc FROM temp.merge_plan
+        WHERE action = '{CONFLICT}'
+        ORDER BY ufc
+        {limit_sql}
+    ''', (limit,) if limit else ())
+    return [row[0] for row in c.fetchall()]
+
+
+def format_merge_report(summary: Dict[str, int]) -> str:
+    """Describe a merge summary in a few lines for the user."""
+    lines = [
+        ("Added", summary.get(ADD, 0)),
+        ("Added with a new UFC", summary.get(REKEY, 0)),
+        ("Updated from the other database", summary.get(UPDATE, 0)),
+        ("Kept (local copy is newer)", summary.get(KEEP, 0)),
+        ("Conflicts skipped", summary.get(SKIP, 0)),
+        ("Conflicts", summary.get(CONFLICT, 0)),
+        ("Already identical", summary.get(IDENTICAL, 0)),
+        ("Skipped (in the local recycle bin)", summary.get(DELETED, 0)),
+    ]
+    return '\n'.join(f"{label}: {count}" for label, count in lines if count)
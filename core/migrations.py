@@ -0,0 +1,608 @@
+"""Versioned schema migrations keyed on PRAGMA user_version.
+
+Each migration upgrades the schema by exactly one version. ``migrate`` runs
+every pending step inside the caller's transaction and then stamps the new
+version, so an up-to-date database costs a single pragma read to open.
+"""
+import sqlite3
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from core.constants import (
+    CHANGE_LOG_PRUNE_EVERY, CHANGE_LOG_RETENTION, DESCRIPTION_SORT_KEY_CHARS
+)
+from core.identifiers import new_ufc, ufc_width_for
+from utils.helpers import split_tags, parse_display_date
+
+# Called as progress(step, total_steps, description) before each step
+ProgressCallback = Callable[[int, int, str], None]
+
+# (version, description, function) in ascending version order
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Cursor], None]]] = []
+
+
+def migration(version: int, description: str):
+    """Register a function that upgrades the schema to ``version``."""
+    def register(func):
+        if MIGRATIONS and MIGRATIONS[-1][0] >= version:
+            raise ValueError(f"Migration {version} registered out of order")
+        MIGRATIONS.append((version, description, func))
+        return func
+    return register
+
+
+def latest_version() -> int:
+    """Get the schema version produced by running every migration."""
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Read the schema version stored in the database header."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, progress: Optional[ProgressCallback] = None) -> int:
+    """Apply all pending migrations; the caller must hold a write transaction."""
+    current = get_schema_version(conn)
+    pending = [m for m in MIGRATIONS if m[0] > current]
+    if not pending:
+        return current
+    
+    c = conn.cursor()
+    for step, (version, description, func) in enumerate(pending, start=1):
+        if progress:
+            progress(step, len(pending), description)
+        func(c)
+    
+    new_version = pending[-1][0]
+    c.execute(f"PRAGMA user_version = {new_version}")
+    return new_version
+
+
+def sync_replay_tags(c: sqlite3.Cursor, replay_id: int, tag_str: Optional[str]):
+    """Rebuild a replay's rows in replay_tags from its tag string."""
+    sync_replay_tags_many(c, [(replay_id, tag_str)])
+
+
+def sync_replay_tags_many(c: sqlite3.Cursor, rows: Iterable[Tuple[int, Optional[str]]]):
+    """Rebuild replay_tags for many (replay_id, tag_string) pairs at once."""
+    rows = list(rows)
+    if not rows:
+        return
+    
+    c.executemany("DELETE FROM replay_tags WHERE replay_id = ?", [(row[0],) for row in rows])
+    
+    links = [(replay_id, tag) for replay_id, tag_str in rows for tag in split_tags(tag_str)]
+    if not links:
+        return
+    
+    c.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", [(tag,) for _, tag in links])
+    c.executemany('''
+        INSERT OR IGNORE INTO replay_tags (replay_id, tag_id)
+        SELECT ?, id FROM tags WHERE name = ?
+    ''', links)
+
+
+def rebuild_summary_tables(c: sqlite3.Cursor):
+    """Recount tag_stats, replay_stats and daily_counts from scratch."""
+    c.execute("DELETE FROM tag_stats")
+    c.execute('''
+        INSERT INTO tag_stats (tag_id, replay_count)
+        SELECT rt.tag_id, COUNT(*)
+        FROM replay_tags rt JOIN replays r ON r.id = rt.replay_id
+        WHERE r.deleted_at IS NULL
+        GROUP BY rt.tag_id
+    ''')
+    
+    c.execute("DELETE FROM replay_stats")
+    c.execute('''
+        INSERT INTO replay_stats (id, live_count, recorded_count, deleted_count)
+        SELECT 1,
+               COALESCE(SUM(deleted_at IS NULL), 0),
+               COALESCE(SUM(deleted_at IS NULL AND COALESCE(recorded, 0) != 0), 0),
+               COALESCE(SUM(deleted_at IS NOT NULL), 0)
+        FROM replays
+    ''')
+    
+    c.execute("DELETE FROM daily_counts")
+    c.execute('''
+        INSERT INTO daily_counts (day, replay_count)
+        SELECT date(added_at, 'unixepoch'), COUNT(*)
+        FROM replays
+        WHERE deleted_at IS NULL AND added_at IS NOT NULL
+        GROUP BY 1
+    ''')
+
+
+def install_search_triggers(c: sqlite3.Cursor):
+    """Keep the search index up to date with this connection's writes to replays.
+
+    The triggers are TEMP, so they live in the connection rather than the
+    file: they need desc_text, which only the app's connections have, and
+    other tools must still be able to write the file. Rows those tools change
+    are missed by the index until it is rebuilt. Does nothing without an
+    index, or while the file still carries the triggers of migration 10.
+    """
+    c.execute("SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = 'replays_fts'")
+    has_index = c.fetchone() is not None
+    c.execute("SELECT 1 FROM main.sqlite_master WHERE type = 'trigger' AND name = 'replays_fts_ai'")
+    if not has_index or c.fetchone():
+        return
+    
+    # A contentless index forgets a row only when given the exact values it indexed
+    c.execute('''
+        CREATE TEMP TRIGGER IF NOT EXISTS replays_fts_ai AFTER INSERT ON main.replays BEGIN
+            INSERT INTO replays_fts (rowid, file_name, extended_desc, tags)
+            VALUES (new.id, new.file_name, desc_text(new.extended_desc), new.tags);
+        END
+    ''')
+    c.execute('''
+        CREATE TEMP TRIGGER IF NOT EXISTS replays_fts_ad AFTER DELETE ON main.replays BEGIN
+            INSERT INTO replays_fts (replays_fts, rowid, file_name, extended_desc, tags)
+            VALUES ('delete', old.id, old.file_name, desc_text(old.extended_desc), old.tags);
+        END
+    ''')
+    c.execute('''
+        CREATE TEMP TRIGGER IF NOT EXISTS replays_fts_au
+        AFTER UPDATE OF file_name, extended_desc, tags ON main.replays BEGIN
+            INSERT INTO replays_fts (replays_fts, rowid, file_name, extended_desc, tags)
+            VALUES ('delete', old.id, old.file_name, desc_text(old.extended_desc), old.tags);
+            INSERT INTO replays_fts (rowid, file_name, extended_desc, tags)
+            VALUES (new.id, new.file_name, desc_text(new.extended_desc), new.tags);
+        END
+    ''')
+
+
+def _columns(c: sqlite3.Cursor, table: str) -> List[str]:
+    c.execute(f"PRAGMA table_info({table})")
+    return [col[1] for col in c.fetchall()]
+
+
+# ==================== Migrations ====================
+
+@migration(1, "Create base tables")
+def _base_tables(c: sqlite3.Cursor):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS replays (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            video_link TEXT,
+            file_name TEXT,
+            timestamp TEXT,
+            ufc TEXT UNIQUE,
+            extended_desc TEXT,
+            recorded INTEGER,
+            renamed_filename TEXT,
+            date_added TEXT,
+            tags TEXT
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS recycle_bin (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            video_link TEXT,
+            file_name TEXT,
+            timestamp TEXT,
+            ufc TEXT UNIQUE,
+            extended_desc TEXT,
+            recorded INTEGER,
+            renamed_filename TEXT,
+            date_added TEXT,
+            deleted_date TEXT,
+            tags TEXT
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS db_info (
+            unique_db_code TEXT UNIQUE
+        )
+    ''')
+    
+    # Databases from before tagging existed
+    for table in ('replays', 'recycle_bin'):
+        if 'tags' not in _columns(c, table):
+            c.execute(f"ALTER TABLE {table} ADD COLUMN tags TEXT")
+
+
+@migration(2, "Normalize tags")
+def _normalized_tags(c: sqlite3.Cursor):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS tags (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE COLLATE NOCASE
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS replay_tags (
+            replay_id INTEGER NOT NULL REFERENCES replays(id) ON DELETE CASCADE,
+            tag_id INTEGER NOT NULL REFERENCES tags(id) ON DELETE CASCADE,
+            PRIMARY KEY (replay_id, tag_id)
+        ) WITHOUT ROWID
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_replay_tags_tag ON replay_tags(tag_id, replay_id)")
+    
+    c.execute("SELECT id, tags FROM replays WHERE tags IS NOT NULL AND tags != ''")
+    sync_replay_tags_many(c, c.fetchall())
+
+
+@migration(3, "Convert dates to epoch seconds")
+def _epoch_dates(c: sqlite3.Cursor):
+    if 'added_at' not in _columns(c, 'replays'):
+        c.execute("ALTER TABLE replays ADD COLUMN added_at INTEGER")
+    recycle_columns = _columns(c, 'recycle_bin')
+    if 'added_at' not in recycle_columns:
+        c.execute("ALTER TABLE recycle_bin ADD COLUMN added_at INTEGER")
+    if 'deleted_at' not in recycle_columns:
+        c.execute("ALTER TABLE recycle_bin ADD COLUMN deleted_at INTEGER")
+    
+    c.execute("SELECT id, date_added FROM replays WHERE added_at IS NULL")
+    c.executemany(
+        "UPDATE replays SET added_at = ? WHERE id = ?",
+        [(parse_display_date(text), row_id) for row_id, text in c.fetchall()]
+    )
+    
+    # Older versions swapped deleted_date and tags when recycling; undo that
+    c.execute("SELECT id, date_added, deleted_date, tags FROM recycle_bin WHERE deleted_at IS NULL")
+    updates = []
+    for row_id, added_text, deleted_text, tags in c.fetchall():
+        deleted_at = parse_display_date(deleted_text)
+        if deleted_at is None and parse_display_date(tags) is not None:
+            deleted_at, tags = parse_display_date(tags), deleted_text
+        updates.append((parse_display_date(added_text), deleted_at, tags, row_id))
+    c.executemany(
+        "UPDATE recycle_bin SET added_at = ?, deleted_at = ?, tags = ? WHERE id = ?",
+        updates
+    )
+    
+    c.execute("CREATE INDEX IF NOT EXISTS idx_replays_added_at ON replays(added_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_recycle_bin_deleted_at ON recycle_bin(deleted_at)")
+
+
+@migration(4, "Build full-text search index")
+def _search_index(c: sqlite3.Cursor):
+    try:
+        c.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS replays_fts USING fts5(
+                file_name, extended_desc, tags,
+                content='replays', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        # SQLite built without FTS5; search falls back to LIKE
+        print(f"⚠️ Full-text search unavailable: {e}")
+        return
+    
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS replays_fts_ai AFTER INSERT ON replays BEGIN
+            INSERT INTO replays_fts (rowid, file_name, extended_desc, tags)
+            VALUES (new.id, new.file_name, new.extended_desc, new.tags);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS replays_fts_ad AFTER DELETE ON replays BEGIN
+            INSERT INTO replays_fts (replays_fts, rowid, file_name, extended_desc, tags)
+            VALUES ('delete', old.id, old.file_name, old.extended_desc, old.tags);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS replays_fts_au
+        AFTER UPDATE OF file_name, extended_desc, tags ON replays BEGIN
+            INSERT INTO replays_fts (replays_fts, rowid, file_name, extended_desc, tags)
+            VALUES ('delete', old.id, old.file_name, old.extended_desc, old.tags);
+            INSERT INTO replays_fts (rowid, file_name, extended_desc, tags)
+            VALUES (new.id, new.file_name, new.extended_desc, new.tags);
+        END
+    ''')
+    c.execute("INSERT INTO replays_fts(replays_fts) VALUES ('rebuild')")
+
+
+@migration(5, "Add change log")
+def _change_log(c: sqlite3.Cursor):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            op TEXT NOT NULL,
+            tbl TEXT NOT NULL,
+            ufc TEXT,
+            row_id INTEGER
+        )
+    ''')
+    
+    for table in ('replays', 'recycle_bin'):
+        c.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_log_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO change_log (op, tbl, ufc, row_id)
+                VALUES ('insert', '{table}', new.ufc, new.id);
+            END
+        ''')
+        c.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_log_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO change_log (op, tbl, ufc, row_id)
+                VALUES ('delete', '{table}', old.ufc, old.id);
+            END
+        ''')
+        c.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_log_au AFTER UPDATE ON {table} BEGIN
+                INSERT INTO change_log (op, tbl, ufc, row_id)
+                SELECT 'delete', '{table}', old.ufc, old.id WHERE old.ufc IS NOT new.ufc;
+                INSERT INTO change_log (op, tbl, ufc, row_id)
+                VALUES ('update', '{table}', new.ufc, new.id);
+            END
+        ''')
+    
+    # Keep the log bounded: every CHANGE_LOG_PRUNE_EVERY entries, drop the oldest
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS change_log_prune AFTER INSERT ON change_log
+        WHEN new.seq % {CHANGE_LOG_PRUNE_EVERY} = 0 BEGIN
+            DELETE FROM change_log WHERE seq <= new.seq - {CHANGE_LOG_RETENTION};
+        END
+    ''')
+
+
+@migration(6, "Track modification times")
+def _modification_times(c: sqlite3.Cursor):
+    for table in ('replays', 'recycle_bin'):
+        if 'updated_at' not in _columns(c, table):
+            c.execute(f"ALTER TABLE {table} ADD COLUMN updated_at INTEGER")
+        c.execute(f"UPDATE {table} SET updated_at = added_at WHERE updated_at IS NULL")
+
+
+@migration(7, "Move recycle bin into replays")
+def _soft_delete(c: sqlite3.Cursor):
+    if 'deleted_at' not in _columns(c, 'replays'):
+        c.execute("ALTER TABLE replays ADD COLUMN deleted_at INTEGER")
+    
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recycle_bin'")
+    if c.fetchone():
+        # A UFC deleted and later re-added lives in both tables; the recycled
+        # copy moves over under a fresh code rather than being lost
+        c.execute('''
+            SELECT b.id FROM recycle_bin b
+            WHERE b.ufc IS NULL OR b.ufc IN (SELECT ufc FROM replays)
+        ''')
+        clashing = [row[0] for row in c.fetchall()]
+        if clashing:
+            c.execute("SELECT (SELECT COUNT(*) FROM replays) + (SELECT COUNT(*) FROM recycle_bin)")
+            width = ufc_width_for(c.fetchone()[0])
+            c.execute("SELECT ufc FROM replays UNION SELECT ufc FROM recycle_bin")
+            taken = {row[0] for row in c.fetchall()}
+            updates = []
+            for row_id in clashing:
+                code = new_ufc(width)
+                while code in taken:
+                    code = new_ufc(width)
+                taken.add(code)
+                updates.append((code, row_id))
+            c.executemany("UPDATE recycle_bin SET ufc = ? WHERE id = ?", updates)
+        
+        c.execute('''
+            INSERT INTO replays (video_link, file_name, timestamp, ufc, extended_desc,
+                                 recorded, renamed_filename, added_at, updated_at, tags,
+                                 deleted_at)
+            SELECT video_link, file_name, timestamp, ufc, extended_desc,
+                   recorded, renamed_filename, added_at, updated_at, tags,
+                   COALESCE(deleted_at, CAST(strftime('%s', 'now') AS INTEGER))
+            FROM recycle_bin
+            ORDER BY id
+        ''')
+        c.execute('''
+            SELECT id, tags FROM replays
+            WHERE deleted_at IS NOT NULL AND tags IS NOT NULL AND tags != ''
+        ''')
+        sync_replay_tags_many(c, c.fetchall())
+        
+        # Its indexes and change-log triggers go with it
+        c.execute("DROP TABLE recycle_bin")
+    
+    # Listing and paging read only live rows; the recycle bin only deleted ones
+    c.execute("CREATE INDEX IF NOT EXISTS idx_replays_live ON replays(id) WHERE deleted_at IS NULL")
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_replays_deleted_at
+        ON replays(deleted_at) WHERE deleted_at IS NOT NULL
+    ''')
+
+
+@migration(8, "Add summary tables")
+def _summary_tables(c: sqlite3.Cursor):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS tag_stats (
+            tag_id INTEGER PRIMARY KEY REFERENCES tags(id) ON DELETE CASCADE,
+            replay_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS replay_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            live_count INTEGER NOT NULL DEFAULT 0,
+            recorded_count INTEGER NOT NULL DEFAULT 0,
+            deleted_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS daily_counts (
+            day TEXT PRIMARY KEY,
+            replay_count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+    
+    # Tag links only count while their replay is live. A hard delete unlinks
+    # the tags first, while the replay row is still there to be checked.
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS replay_tags_stats_ai AFTER INSERT ON replay_tags
+        WHEN EXISTS (SELECT 1 FROM replays WHERE id = new.replay_id AND deleted_at IS NULL)
+        BEGIN
+            INSERT INTO tag_stats (tag_id, replay_count) VALUES (new.tag_id, 1)
+            ON CONFLICT (tag_id) DO UPDATE SET replay_count = replay_count + 1;
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS replay_tags_stats_ad AFTER DELETE ON replay_tags
+        WHEN EXISTS (SELECT 1 FROM replays WHERE id = old.replay_id AND deleted_at IS NULL)
+        BEGIN
+            UPDATE tag_stats SET replay_count = replay_count - 1 WHERE tag_id = old.tag_id;
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS replays_stats_bd BEFORE DELETE ON replays BEGIN
+            DELETE FROM replay_tags WHERE replay_id = old.id;
+        END
+    ''')
+    
+    # Recycling or restoring a replay moves all of its tags at once
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS replays_tag_stats_recycle
+        AFTER UPDATE OF deleted_at ON replays
+        WHEN old.deleted_at IS NULL AND new.deleted_at IS NOT NULL
+        BEGIN
+            UPDATE tag_stats SET replay_count = replay_count - 1
+            WHERE tag_id IN (SELECT tag_id FROM replay_tags WHERE replay_id = new.id);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS replays_tag_stats_restore
+        AFTER UPDATE OF deleted_at ON replays
+        WHEN old.deleted_at IS NOT NULL AND new.deleted_at IS NULL
+        BEGIN
+            INSERT INTO tag_stats (tag_id, replay_count)
+            SELECT tag_id, 1 FROM replay_tags WHERE replay_id = new.id
+            ON CONFLICT (tag_id) DO UPDATE SET replay_count = replay_count + 1;
+        END
+    ''')
+    
+    # Totals and per-day counts: take out the old row's share, add the new one's
+    remove_old = '''
+            UPDATE replay_stats SET
+                live_count = live_count - (old.deleted_at IS NULL),
+                recorded_count = recorded_count - (old.deleted_at IS NULL AND COALESCE(old.recorded, 0) != 0),
+                deleted_count = deleted_count - (old.deleted_at IS NOT NULL);
+            UPDATE daily_counts SET replay_count = replay_count - 1
+            WHERE day = date(old.added_at, 'unixepoch') AND old.deleted_at IS NULL;
+    '''
+    add_new = '''
+            UPDATE replay_stats SET
+                live_count = live_count + (new.deleted_at IS NULL),
+                recorded_count = recorded_count + (new.deleted_at IS NULL AND COALESCE(new.recorded, 0) != 0),
+                deleted_count = deleted_count + (new.deleted_at IS NOT NULL);
+            INSERT INTO daily_counts (day, replay_count)
+            SELECT date(new.added_at, 'unixepoch'), 1
+            WHERE new.deleted_at IS NULL AND new.added_at IS NOT NULL
+            ON CONFLICT (day) DO UPDATE SET replay_count = replay_count + 1;
+    '''
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS replays_stats_ai AFTER INSERT ON replays BEGIN {add_new} END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS replays_stats_ad AFTER DELETE ON replays BEGIN {remove_old} END")
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS replays_stats_au
+        AFTER UPDATE OF recorded, deleted_at, added_at ON replays
+        BEGIN {remove_old} {add_new} END
+    ''')
+    
+    rebuild_summary_tables(c)
+
+
+@migration(9, "Add sort and filter indexes")
+def _sort_indexes(c: sqlite3.Cursor):
+    # (column, id) over live rows: each page of a sorted, filtered listing
+    # is one range scan, with id breaking ties for keyset pagination
+    for column in ('file_name', 'timestamp', 'added_at', 'recorded'):
+        c.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_replays_sort_{column}
+            ON replays({column}, id) WHERE deleted_at IS NULL
+        ''')
+
+
+@migration(10, "Index descriptions apart from their storage")
+def _contentless_search_index(c: sqlite3.Cursor):
+    # Descriptions may now be stored compressed, so the index can no longer
+    # read them straight from replays. It becomes contentless and is fed
+    # the decompressed text by its triggers.
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'replays_fts'")
+    if not c.fetchone():
+        return  # No FTS5; searches fall back to LIKE over desc_text()
+    
+    for trigger in ('replays_fts_ai', 'replays_fts_ad', 'replays_fts_au'):
+        c.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    c.execute("DROP TABLE replays_fts")
+    c.execute('''
+        CREATE VIRTUAL TABLE replays_fts USING fts5(
+            file_name, extended_desc, tags,
+            content='',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    
+    # A contentless index forgets a row only when given the exact values it indexed
+    c.execute('''
+        CREATE TRIGGER replays_fts_ai AFTER INSERT ON replays BEGIN
+            INSERT INTO replays_fts (rowid, file_name, extended_desc, tags)
+            VALUES (new.id, new.file_name, desc_text(new.extended_desc), new.tags);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER replays_fts_ad AFTER DELETE ON replays BEGIN
+            INSERT INTO replays_fts (replays_fts, rowid, file_name, extended_desc, tags)
+            VALUES ('delete', old.id, old.file_name, desc_text(old.extended_desc), old.tags);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER replays_fts_au
+        AFTER UPDATE OF file_name, extended_desc, tags ON replays BEGIN
+            INSERT INTO replays_fts (replays_fts, rowid, file_name, extended_desc, tags)
+            VALUES ('delete', old.id, old.file_name, desc_text(old.extended_desc), old.tags);
+            INSERT INTO replays_fts (rowid, file_name, extended_desc, tags)
+            VALUES (new.id, new.file_name, desc_text(new.extended_desc), new.tags);
+        END
+    ''')
+    c.execute('''
+        INSERT INTO replays_fts (rowid, file_name, extended_desc, tags)
+        SELECT id, file_name, desc_text(extended_desc), tags FROM replays
+    ''')
+
+
+@migration(11, "Record maintenance runs")
+def _maintenance_log(c: sqlite3.Cursor):
+    # When each idle-time task last finished, e.g. for "last ANALYZE" in
+    # the database info panel; kept in the file so it survives restarts
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS maintenance_log (
+            task TEXT PRIMARY KEY,
+            ran_at INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+
+
+@migration(12, "Remember where re-keyed merge copies came from")
+def _merged_from(c: sqlite3.Cursor):
+    # A copy a merge inserted under a new UFC keeps the UFC it had in the
+    # other database, so merging that database again recognises it
+    if 'merged_from' not in _columns(c, 'replays'):
+        c.execute("ALTER TABLE replays ADD COLUMN merged_from TEXT")
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_replays_merged_from
+        ON replays(merged_from) WHERE merged_from IS NOT NULL
+    ''')
+
+
+@migration(13, "Keep app-only functions out of the file's triggers")
+def _temp_search_triggers(c: sqlite3.Cursor):
+    # The search triggers of migration 10 call desc_text, so any connection
+    # without it (the sqlite3 shell, other tools) failed to write replays.
+    # The app now installs them per connection as TEMP triggers instead.
+    for trigger in ('replays_fts_ai', 'replays_fts_ad', 'replays_fts_au'):
+        c.execute(f"DROP TRIGGER IF EXISTS main.{trigger}")
+    install_search_triggers(c)
+
+
+@migration(14, "Index the remaining sort columns")
+def _more_sort_indexes(c: sqlite3.Cursor):
+    # Descriptions may be compressed, so sorting on their text decompressed
+    # every row; they now sort by a stored prefix the app keeps up to date
+    if 'desc_key' not in _columns(c, 'replays'):
+        c.execute("ALTER TABLE replays ADD COLUMN desc_key TEXT")
+    c.execute(f"UPDATE replays SET desc_key = desc_prefix(extended_desc, {DESCRIPTION_SORT_KEY_CHARS})")
+    
+    # The UNIQUE index on ufc also covers recycled rows, so it cannot serve
+    # a filtered listing as one range scan
+    for column in ('ufc', 'video_link', 'tags', 'desc_key'):
+        c.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_replays_sort_{column}
+            ON replays({column}, id) WHERE deleted_at IS NULL
+        ''')
@@ -15,7 +15,10 @@ class Preferences:
         'dark_mode': False,
         'active_db_path': None,
         'character_name_override': None,
-        'rename_character': None  # NEW: Character to use for file renaming
+        'rename_character': None,  # NEW: Character to use for file renaming
+        'auto_backup': False,
+        'in_memory_working_copy': False,
+        'compress_descriptions': False
     }
     
     def __init__(self, prefs_file: str):
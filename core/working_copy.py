@@ -0,0 +1,157 @@
+"""Crash journal for databases held entirely in memory.
+
+A working copy only reaches its file when it is flushed. In between, every
+committed transaction appends one line to a journal next to the database
+with the final state of the replays it touched, taken from change_log.
+After a crash the journal is replayed onto the file's contents, so at most
+the transaction in flight is lost.
+"""
+import base64
+import json
+import os
+import sqlite3
+from typing import Optional
+
+from core.constants import WORKING_COPY_JOURNAL_MAX_ROWS
+from core.migrations import sync_replay_tags_many
+
+JOURNAL_SUFFIX = ".wcj"
+
+
+def _encode(value):
+    if isinstance(value, bytes):
+        return {'$b': base64.b64encode(value).decode('ascii')}
+    raise TypeError(f"Cannot journal {type(value).__name__} values")
+
+
+def _decode(obj: dict):
+    return base64.b64decode(obj['$b']) if set(obj) == {'$b'} else obj
+
+
+class ChangeJournal:
+    """Append-only journal of committed replay changes for one database."""
+    
+    def __init__(self, db_path: str):
+        self.path = db_path + JOURNAL_SUFFIX
+    
+    @property
+    def size(self) -> int:
+        """Bytes written since the last clear."""
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+    
+    def capture(self, conn: sqlite3.Connection, since_seq: Optional[int],
+                changes_before: int) -> Optional[str]:
+        """Build the journal line for the replays changed after ``since_seq``.
+
+        Called inside the open transaction; the line is only written by
+        ``append`` once that transaction has committed, so a failed commit
+        never reaches the journal. Returns an empty string when nothing was
+        written, and None when the change log cannot describe the
+        transaction (it did not exist yet, was pruned mid-way, or only other
+        tables were written); the caller must then flush the whole database
+        instead.
+        """
+        if since_seq is None:
+            return None
+        
+        c = conn.cursor()
+        c.execute("SELECT MIN(seq), COUNT(*) FROM change_log WHERE seq > ?", (since_seq,))
+        first, count = c.fetchone()
+        if not count:
+            return '' if conn.total_changes == changes_before else None
+        if first > since_seq + 1:
+            return None
+        
+        c.execute('''
+            SELECT DISTINCT row_id FROM change_log
+            WHERE seq > ? AND tbl = 'replays' AND row_id IS NOT NULL
+        ''', (since_seq,))
+        ids = [row[0] for row in c.fetchall()]
+        if len(ids) > WORKING_COPY_JOURNAL_MAX_ROWS:
+            # A bulk change is cheaper to flush than to journal
+            return None
+        
+        c.execute(f"SELECT * FROM replays WHERE id IN ({', '.join('?' * len(ids))})", ids)
+        names = [col[0] for col in c.description]
+        rows = [dict(zip(names, row)) for row in c.fetchall()]
+        return json.dumps({'ids': ids, 'rows': rows}, default=_encode) + '\n'
+    
+    def append(self, line: str) -> bool:
+        """Write a line from ``capture`` for a committed transaction.
+
+        Returns False if the journal could not be written; the caller must
+        then flush the whole database instead.
+        """
+        if not line:
+            return True
+        # Line-buffered like synchronous = NORMAL: survives an application
+        # crash, not necessarily a power cut
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+        except OSError as e:
+            print(f"⚠️ Failed to write working-copy journal {self.path}: {e}")
+            return False
+        return True
+    
+    def replay(self, conn: sqlite3.Connection) -> int:
+        """Apply the journal to a database freshly loaded from its file.
+
+        Returns the number of transactions replayed. A torn last line (the
+        crash hit mid-write) is ignored.
+        """
+        if not self.size:
+            return 0
+        
+        with open(self.path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        
+        c = conn.cursor()
+        c.execute("PRAGMA table_info(replays)")
+        present = {row[1] for row in c.fetchall()}
+        
+        applied = 0
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            for line in lines:
+                try:
+                    entry = json.loads(line, object_hook=_decode)
+                except json.JSONDecodeError:
+                    break
+                
+                ids = entry['ids']
+                if ids:
+                    c.execute(f"DELETE FROM replays WHERE id IN ({', '.join('?' * len(ids))})", ids)
+                for row in entry['rows']:
+                    cols = [col for col in row if col in present]
+                    c.execute(
+                        f"INSERT INTO replays ({', '.join(cols)}) "
+                        f"VALUES ({', '.join('?' * len(cols))})",
+                        [row[col] for col in cols]
+                    )
+                sync_replay_tags_many(c, [(row['id'], row.get('tags')) for row in entry['rows']])
+                applied += 1
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+        c.execute("COMMIT")
+        return applied
+    
+    def clear(self):
+        """Forget everything journaled; called once a flush has reached the file."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+    
+    @staticmethod
+    def max_seq(conn: sqlite3.Connection) -> Optional[int]:
+        """Latest change_log sequence number, or None before the log exists."""
+        try:
+            return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+        except sqlite3.OperationalError:
+            return None
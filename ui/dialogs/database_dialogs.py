@@ -0,0 +1,291 @@
+"""Dialogs that work across replay databases."""
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QLabel,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
+)
+from PyQt6.QtCore import QCoreApplication, Qt, pyqtSignal
+from typing import Optional
+
+from core import health
+from core.constants import ACTIVE_DB_FOLDER
+from core.db_worker import BackgroundTask
+from core.federated_search import find_databases, search_databases
+from utils.helpers import format_timestamp
+
+
+class FederatedSearchDialog(QDialog):
+    """Search every database in the active folder at once."""
+    
+    # Emitted with (database path, file name) when a result is opened
+    open_result_requested = pyqtSignal(str, str)
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Search All Databases")
+        self.resize(1000, 600)
+        
+        self.results: list[dict] = []
+        self._task: Optional[BackgroundTask] = None
+        self.init_ui()
+    
+    def init_ui(self):
+        """Initialize UI components."""
+        layout = QVBoxLayout(self)
+        
+        info_label = QLabel(
+            "<b>Search All Databases</b><br>"
+            "Searches file names, tags and descriptions in every database "
+            "in the active folder. Double-click a result to open it."
+        )
+        info_label.setWordWrap(True)
+        layout.addWidget(info_label)
+        
+        # Search row
+        search_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search by name, tags, or description (word prefixes)...")
+        self.search_input.returnPressed.connect(self._start_search)
+        search_layout.addWidget(self.search_input)
+        
+        self.search_btn = QPushButton("Search")
+        self.search_btn.clicked.connect(self._start_search)
+        search_layout.addWidget(self.search_btn)
+        layout.addLayout(search_layout)
+        
+        # Results table
+        self.table = QTableWidget()
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels([
+            "UDC", "File Name", "UFC", "Timestamp", "Tags", "Date Added"
+        ])
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.cellDoubleClicked.connect(self._open_result)
+        
+        header = self.table.horizontalHeader()
+        if header:
+            header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.table.setColumnWidth(0, 110)
+        self.table.setColumnWidth(1, 300)
+        self.table.setColumnWidth(2, 100)
+        self.table.setColumnWidth(3, 80)
+        self.table.setColumnWidth(4, 200)
+        self.table.setColumnWidth(5, 140)
+        layout.addWidget(self.table)
+        
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+        
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.reject)
+        layout.addWidget(close_btn)
+    
+    def _start_search(self):
+        """Run the search on a background thread."""
+        text = self.search_input.text().strip()
+        if not text or (self._task and self._task.isRunning()):
+            return
+        
+        db_paths = find_databases(ACTIVE_DB_FOLDER)
+        if not db_paths:
+            self.status_label.setText("No databases found.")
+            return
+        
+        self.search_btn.setEnabled(False)
+        self.status_label.setText(f"Searching {len(db_paths)} database(s)...")
+        
+        self._task = BackgroundTask(search_databases, db_paths, text, parent=self)
+        self._task.progress_changed.connect(
+            lambda done, total: self.status_label.setText(f"Searched {done} of {total} database(s)...")
+        )
+        self._task.succeeded.connect(self._show_results)
+        self._task.failed.connect(self._show_error)
+        self._task.start()
+    
+    def _show_results(self, results: list):
+        """Fill the table with search results."""
+        self.search_btn.setEnabled(True)
+        self.results = results
+        
+        self.table.setRowCount(len(results))
+        for row, result in enumerate(results):
+            for col, key in enumerate(('udc', 'file_name', 'ufc', 'timestamp', 'tags', 'date_added')):
+                item = QTableWidgetItem(result.get(key, ''))
+                item.setToolTip(result.get(key, ''))
+                self.table.setItem(row, col, item)
+        
+        sources = len({r['db_path'] for r in results})
+        self.status_label.setText(f"Found {len(results)} match(es) in {sources} database(s).")
+    
+    def _show_error(self, error: str):
+        """Report a failed search."""
+        self.search_btn.setEnabled(True)
+        self.status_label.setText(f"Search failed: {error}")
+    
+    def _open_result(self, row: int, column: int):
+        """Ask the main window to open the database holding a result."""
+        if 0 <= row < len(self.results):
+            result = self.results[row]
+            self.open_result_requested.emit(result['db_path'], result['file_name'])
+            self.accept()
+    
+    def done(self, result: int):
+        """Close without waiting for a running search; its results are dropped."""
+        if self._task and self._task.isRunning():
+            self._task.detach(self.parent() or QCoreApplication.instance())
+            self._task = None
+        super().done(result)
+
+
+class DatabaseInfoDialog(QDialog):
+    """Sizes, fragmentation and upkeep history of the active database."""
+    
+    # (label, maintenance task) rows of the upkeep summary
+    MAINTENANCE_ROWS = (
+        ("Last ANALYZE", 'analyze'),
+        ("Last vacuum", 'vacuum'),
+        ("Last integrity check", 'check_integrity'),
+    )
+    
+    def __init__(self, database, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Database Info")
+        self.resize(800, 700)
+        
+        self.database = database
+        self._task: Optional[BackgroundTask] = None
+        self.init_ui()
+        self.load_info()
+    
+    def init_ui(self):
+        """Initialize UI components."""
+        layout = QVBoxLayout(self)
+        
+        self.summary_label = QLabel("Reading database...")
+        self.summary_label.setWordWrap(True)
+        self.summary_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        layout.addWidget(self.summary_label)
+        
+        # Upkeep the figures call for
+        self.advice_label = QLabel("")
+        self.advice_label.setWordWrap(True)
+        layout.addWidget(self.advice_label)
+        
+        layout.addWidget(QLabel("<b>Tables</b>"))
+        self.tables_table = self._make_table(["Table", "Rows", "Size"], [300, 120, 120])
+        layout.addWidget(self.tables_table)
+        
+        layout.addWidget(QLabel("<b>Indexes</b>"))
+        self.indexes_table = self._make_table(["Index", "Table", "Size"], [300, 200, 120])
+        layout.addWidget(self.indexes_table)
+        
+        button_layout = QHBoxLayout()
+        
+        self.refresh_btn = QPushButton("Refresh")
+        self.refresh_btn.clicked.connect(self.load_info)
+        button_layout.addWidget(self.refresh_btn)
+        
+        button_layout.addStretch()
+        
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.close)
+        button_layout.addWidget(close_btn)
+        
+        layout.addLayout(button_layout)
+    
+    @staticmethod
+    def _make_table(headers: list[str], widths: list[int]) -> QTableWidget:
+        table = QTableWidget()
+        table.setColumnCount(len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        header = table.horizontalHeader()
+        if header:
+            header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        for col, width in enumerate(widths):
+            table.setColumnWidth(col, width)
+        return table
+    
+    def load_info(self):
+        """Gather the figures on a background thread."""
+        if self._task and self._task.isRunning():
+            return
+        self.refresh_btn.setEnabled(False)
+        
+        self._task = BackgroundTask(self._gather, parent=self)
+        self._task.succeeded.connect(self._show_info)
+        self._task.failed.connect(self._show_error)
+        self._task.start()
+    
+    def _gather(self, progress=None) -> dict:
+        info = self.database.get_database_info()
+        info['last_backup'] = health.last_backup(self.database.db_path)
+        return info
+    
+    def _show_info(self, info: dict):
+        """Fill the summary and tables from gathered figures."""
+        self.refresh_btn.setEnabled(True)
+        
+        def when(epoch: Optional[int]) -> str:
+            return format_timestamp(epoch) if epoch else "never"
+        
+        rows = [
+            ("File", self.database.db_path),
+            ("File size", health.format_size(info['file_size'])),
+            ("Write-ahead log", health.format_size(info['wal_size'])),
+            ("Pages", f"{info['page_count']:,} of {health.format_size(info['page_size'])}"),
+            ("Free pages", f"{info['freelist_count']:,} ({info['free_ratio']:.1%} of the file)"),
+            ("Journal mode", f"{info['journal_mode']}"
+                             + (" (in-memory working copy)" if info['in_memory'] else "")),
+            ("Auto-vacuum", info['auto_vacuum']),
+            ("Schema version", str(info['schema_version'])),
+            ("Last backup", when(info['last_backup'])),
+        ]
+        for label, task in self.MAINTENANCE_ROWS:
+            ran_at = info['maintenance'].get(task)
+            if ran_at is None and task == 'analyze' and info['analyzed']:
+                rows.append((label, "before runs were recorded"))
+            else:
+                rows.append((label, when(ran_at)))
+        self.summary_label.setText(
+            "<b>Database Info</b><br>"
+            + "<br>".join(f"{label}: {value}" for label, value in rows)
+        )
+        
+        hints = health.advice(info)
+        if not info['has_dbstat']:
+            hints.append("Table and index sizes are unavailable (SQLite was built without dbstat)")
+        self.advice_label.setText(
+            "<br>".join(f"⚠️ {hint}" for hint in hints) if hints else "✅ Nothing needs attention."
+        )
+        
+        self._fill(self.tables_table, [
+            (table['name'], "" if table['rows'] is None else f"{table['rows']:,}",
+             health.format_size(table['size']))
+            for table in info['tables']
+        ])
+        self._fill(self.indexes_table, [
+            (index['name'], index['table'], health.format_size(index['size']))
+            for index in info['indexes']
+        ])
+    
+    @staticmethod
+    def _fill(table: QTableWidget, rows: list[tuple]):
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for col, value in enumerate(values):
+                table.setItem(row, col, QTableWidgetItem(value))
+    
+    def _show_error(self, error: str):
+        """Report figures that could not be read."""
+        self.refresh_btn.setEnabled(True)
+        self.summary_label.setText(f"Failed to read database info: {error}")
+    
+    def done(self, result: int):
+        """Close without waiting for a running refresh; its figures are dropped."""
+        if self._task and self._task.isRunning():
+            self._task.detach(self.parent() or QCoreApplication.instance())
+            self._task = None
+        super().done(result)
@@ -17,6 +17,7 @@ class EditReplayDialog(QDialog):
         self.replay_data = replay_data
         self.database = database
         self.ufc = replay_data.get('ufc', '')
+        self.changes: dict = {}
         
         self.init_ui()
     
@@ -82,7 +83,7 @@ class EditReplayDialog(QDialog):
         layout.addWidget(button_box)
     
     def save_changes(self):
-        """Save changes to the database."""
+        """Validate the edits and close the dialog."""
         file_name = self.file_name_edit.text().strip()
         
         if not file_name:
@@ -93,22 +94,16 @@ class EditReplayDialog(QDialog):
             )
             return
         
-        try:
-            # Update replay in database
-            self.database.update_replay(
-                self.ufc,
-                file_name=file_name,
-                timestamp=self.timestamp_edit.text().strip(),
-                video_link=self.video_link_edit.text().strip(),
-                tags=self.tags_edit.text().strip(),
-                extended_desc=self.description_edit.toPlainText().strip()
-            )
-            
-            self.accept()
-            
-        except Exception as e:
-            QMessageBox.critical(
-                self,
-                "Database Error",
-                f"Failed to save changes:\n{str(e)}"
-            )
\ No newline at end of file
+        # The caller writes these through the background database writer
+        self.changes = {
+            'file_name': file_name,
+            'timestamp': self.timestamp_edit.text().strip(),
+            'video_link': self.video_link_edit.text().strip(),
+            'tags': self.tags_edit.text().strip(),
+            'extended_desc': self.description_edit.toPlainText().strip()
+        }
+        self.accept()
+    
+    def get_changes(self) -> dict:
+        """Get the edited fields, keyed by database column."""
+        return self.changes
@@ -12,13 +12,15 @@ class TagFilterDialog(QDialog):
     """Dialog for filtering replays by tags."""
     
     def __init__(self, all_tags: list, current_tags: Optional[list] = None, 
-                 use_and: bool = False, parent: Optional[QWidget] = None):
+                 use_and: bool = False, parent: Optional[QWidget] = None,
+                 tag_counts: Optional[dict] = None):
         super().__init__(parent)
         self.setWindowTitle("Filter by Tags")
         self.resize(450, 550)
         
         self.selected_tags = current_tags or []
         self.use_and_logic = use_and
+        self.tag_counts = tag_counts or {}
         
         self.init_ui(all_tags)
     
@@ -44,7 +46,8 @@ class TagFilterDialog(QDialog):
             
             for tag in all_tags:
                 item = QListWidgetItem(list_widget)
-                checkbox = QCheckBox(tag)
+                count = self.tag_counts.get(tag)
+                checkbox = QCheckBox(f"{tag} ({count})" if count is not None else tag)
                 checkbox.setChecked(tag in self.selected_tags)
                 list_widget.setItemWidget(item, checkbox)
                 self.tag_checkboxes[tag] = checkbox
@@ -110,12 +113,14 @@ class TagFilterDialog(QDialog):
 class RecordedFilterDialog(QDialog):
     """Dialog for filtering by recorded status."""
     
-    def __init__(self, current_filter: Optional[bool] = None, parent: Optional[QWidget] = None):
+    def __init__(self, current_filter: Optional[bool] = None, parent: Optional[QWidget] = None,
+                 stats: Optional[dict] = None):
         super().__init__(parent)
         self.setWindowTitle("Filter by Recorded Status")
         self.resize(350, 200)
         
         self.recorded_filter = current_filter
+        self.stats = stats
         self.init_ui()
     
     def init_ui(self):
@@ -130,9 +135,9 @@ class RecordedFilterDialog(QDialog):
         
         self.button_group = QButtonGroup(self)
         
-        self.radio_all = QRadioButton("Show All Replays")
-        self.radio_recorded = QRadioButton("Show Only Recorded")
-        self.radio_not_recorded = QRadioButton("Show Only Not Recorded")
+        self.radio_all = QRadioButton(self._with_count("Show All Replays", 'total'))
+        self.radio_recorded = QRadioButton(self._with_count("Show Only Recorded", 'recorded'))
+        self.radio_not_recorded = QRadioButton(self._with_count("Show Only Not Recorded", 'unrecorded'))
         
         self.button_group.addButton(self.radio_all, 0)
         self.button_group.addButton(self.radio_recorded, 1)
@@ -160,6 +165,10 @@ class RecordedFilterDialog(QDialog):
         button_box.rejected.connect(self.reject)
         layout.addWidget(button_box)
     
+    def _with_count(self, label: str, key: str) -> str:
+        """Append a replay count to a label when stats are available."""
+        return f"{label} ({self.stats[key]})" if self.stats else label
+    
     def get_recorded_filter(self) -> Optional[bool]:
         """Get the selected recorded filter."""
         if self.radio_all.isChecked():
@@ -44,6 +44,30 @@ class ControlsDialog(QDialog):
         btn_restore.clicked.connect(lambda: self.database_action.emit('restore'))
         db_layout.addWidget(btn_restore)
         
+        btn_info = QPushButton("Database Info")
+        btn_info.clicked.connect(lambda: self.database_action.emit('info'))
+        db_layout.addWidget(btn_info)
+        
+        btn_merge = QPushButton("Merge Database")
+        btn_merge.clicked.connect(lambda: self.database_action.emit('merge'))
+        db_layout.addWidget(btn_merge)
+        
+        btn_search_all = QPushButton("Search All Databases")
+        btn_search_all.clicked.connect(lambda: self.database_action.emit('search_all'))
+        db_layout.addWidget(btn_search_all)
+        
+        btn_auto_backup = QPushButton("Toggle Automatic Backup")
+        btn_auto_backup.clicked.connect(lambda: self.database_action.emit('auto_backup'))
+        db_layout.addWidget(btn_auto_backup)
+        
+        btn_compress = QPushButton("Toggle Description Compression")
+        btn_compress.clicked.connect(lambda: self.database_action.emit('compress'))
+        db_layout.addWidget(btn_compress)
+        
+        btn_integrity = QPushButton("Check Database Integrity")
+        btn_integrity.clicked.connect(lambda: self.database_action.emit('integrity'))
+        db_layout.addWidget(btn_integrity)
+        
         layout.addWidget(db_group)
         
         # Filter Section
@@ -119,6 +143,10 @@ class ControlsDialog(QDialog):
         btn_refresh.clicked.connect(lambda: self.utility_action.emit('refresh'))
         utility_layout.addWidget(btn_refresh)
         
+        btn_query_stats = QPushButton("Query Statistics")
+        btn_query_stats.clicked.connect(lambda: self.utility_action.emit('query_stats'))
+        utility_layout.addWidget(btn_query_stats)
+        
         btn_about = QPushButton("About")
         btn_about.clicked.connect(lambda: self.utility_action.emit('about'))
         utility_layout.addWidget(btn_about)
@@ -1,4 +1,4 @@
-"""Utility dialogs for Find/Replace and Recycle Bin management."""
+"""Utility dialogs for Find/Replace, Recycle Bin management and query statistics."""
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QLineEdit,
     QComboBox, QDialogButtonBox, QLabel, QPushButton, QTableWidget,
@@ -17,6 +17,7 @@ class FindReplaceDialog(QDialog):
         self.resize(600, 300)
         
         self.database = database
+        self.replacement: Optional[tuple] = None
         self.init_ui()
     
     def init_ui(self):
@@ -124,14 +125,14 @@ class FindReplaceDialog(QDialog):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
-            self._perform_replace(column_name, find_text, replace_text)
-            QMessageBox.information(
-                self,
-                "Success",
-                f"Replaced text in {count} entry/entries."
-            )
+            # The caller performs the replace through the background database writer
+            self.replacement = (column_name, find_text, replace_text, count)
             self.accept()
     
+    def get_replacement(self) -> Optional[tuple]:
+        """Get the confirmed (column, find, replace, match count), if any."""
+        return self.replacement
+    
     def _get_column_name(self) -> str:
         """Get database column name from combo box selection."""
         mapping = {
@@ -145,46 +146,24 @@ class FindReplaceDialog(QDialog):
     
     def _count_matches(self, column_name: str, find_text: str) -> int:
         """Count how many entries contain the find text."""
-        import sqlite3
-        
         try:
-            with sqlite3.connect(self.database.db_path) as conn:
-                c = conn.cursor()
-                c.execute(
-                    f"SELECT COUNT(*) FROM replays WHERE {column_name} LIKE ?",
-                    (f"%{find_text}%",)
-                )
-                return c.fetchone()[0]
+            return self.database.count_matches(column_name, find_text)
         except Exception as e:
             print(f"Error counting matches: {e}")
             return 0
-    
-    def _perform_replace(self, column_name: str, find_text: str, replace_text: str):
-        """Perform the replace operation."""
-        import sqlite3
-        
-        try:
-            with sqlite3.connect(self.database.db_path) as conn:
-                c = conn.cursor()
-                c.execute(
-                    f"UPDATE replays SET {column_name} = REPLACE({column_name}, ?, ?) WHERE {column_name} LIKE ?",
-                    (find_text, replace_text, f"%{find_text}%")
-                )
-                conn.commit()
-        except Exception as e:
-            print(f"Error performing replace: {e}")
-            raise
 
 
 class RecycleBinDialog(QDialog):
     """Dialog for viewing and managing recycle bin entries."""
     
-    def __init__(self, database, parent=None):
+    def __init__(self, database, db_writer, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Recycle Bin")
         self.resize(900, 600)
         
         self.database = database
+        # Changes go through the window's write queue, like every other write
+        self.db_writer = db_writer
         self.init_ui()
         self.load_recycled_items()
     
@@ -248,22 +227,15 @@ class RecycleBinDialog(QDialog):
     
     def load_recycled_items(self):
         """Load recycled items from database."""
-        import sqlite3
+        columns = ('file_name', 'ufc', 'deleted_date', 'video_link', 'tags', 'description')
         
         try:
-            with sqlite3.connect(self.database.db_path) as conn:
-                c = conn.cursor()
-                c.execute("""
-                    SELECT file_name, ufc, deleted_date, video_link, tags, extended_desc
-                    FROM recycle_bin
-                    ORDER BY deleted_date DESC
-                """)
-                rows = c.fetchall()
+            rows = self.database.get_recycled_replays()
             
             self.table.setRowCount(len(rows))
             
             for i, row in enumerate(rows):
-                for j, value in enumerate(row):
+                for j, value in enumerate(row[col] for col in columns):
                     item = QTableWidgetItem(str(value) if value else "")
                     item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
                     self.table.setItem(i, j, item)
@@ -272,7 +244,7 @@ class RecycleBinDialog(QDialog):
             count = len(rows)
             info_text = f"<b>Recycle Bin</b><br>{count} deleted replay(s)"
             self.findChild(QLabel).setText(info_text)
-            
+        
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load recycle bin:\n{str(e)}")
     
@@ -299,8 +271,6 @@ class RecycleBinDialog(QDialog):
         
         if reply == QMessageBox.StandardButton.Yes:
             self._restore_items(ufc_list)
-            self.load_recycled_items()
-            QMessageBox.information(self, "Success", f"Restored {len(ufc_list)} item(s).")
     
     def _delete_permanently(self):
         """Permanently delete selected items."""
@@ -325,18 +295,11 @@ class RecycleBinDialog(QDialog):
         
         if reply == QMessageBox.StandardButton.Yes:
             self._delete_items(ufc_list)
-            self.load_recycled_items()
-            QMessageBox.information(self, "Success", f"Permanently deleted {len(ufc_list)} item(s).")
     
     def _empty_recycle_bin(self):
         """Empty the entire recycle bin."""
-        import sqlite3
-        
         try:
-            with sqlite3.connect(self.database.db_path) as conn:
-                c = conn.cursor()
-                c.execute("SELECT COUNT(*) FROM recycle_bin")
-                count = c.fetchone()[0]
+            count = self.database.count_recycled()
             
             if count == 0:
                 QMessageBox.information(self, "Empty", "Recycle bin is already empty.")
@@ -350,65 +313,136 @@ class RecycleBinDialog(QDialog):
             )
             
             if reply == QMessageBox.StandardButton.Yes:
-                with sqlite3.connect(self.database.db_path) as conn:
-                    c = conn.cursor()
-                    c.execute("DELETE FROM recycle_bin")
-                    conn.commit()
-                
-                self.load_recycled_items()
-                QMessageBox.information(self, "Success", "Recycle bin emptied.")
+                self.db_writer.submit(
+                    "empty recycle bin", 'empty_recycle_bin',
+                    on_done=lambda _: self._on_written("Recycle bin emptied.")
+                )
         
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to empty recycle bin:\n{str(e)}")
     
     def _restore_items(self, ufc_list: list):
         """Restore items from recycle bin to main table."""
-        import sqlite3
-        
-        try:
-            with sqlite3.connect(self.database.db_path) as conn:
-                c = conn.cursor()
-                
-                for ufc in ufc_list:
-                    # Get data from recycle bin
-                    c.execute("""
-                        SELECT video_link, file_name, timestamp, ufc, extended_desc,
-                               recorded, renamed_filename, date_added, tags
-                        FROM recycle_bin WHERE ufc = ?
-                    """, (ufc,))
-                    
-                    data = c.fetchone()
-                    if not data:
-                        continue
-                    
-                    # Insert back into replays
-                    c.execute("""
-                        INSERT INTO replays (video_link, file_name, timestamp, ufc,
-                                            extended_desc, recorded, renamed_filename,
-                                            date_added, tags)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, data)
-                    
-                    # Delete from recycle bin
-                    c.execute("DELETE FROM recycle_bin WHERE ufc = ?", (ufc,))
-                
-                conn.commit()
-        
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to restore items:\n{str(e)}")
+        self.db_writer.submit(
+            "restore replays", 'restore_replays', ufc_list,
+            on_done=lambda _: self._on_written(f"Restored {len(ufc_list)} item(s).")
+        )
     
     def _delete_items(self, ufc_list: list):
         """Permanently delete items from recycle bin."""
-        import sqlite3
+        self.db_writer.submit(
+            "delete replays permanently", 'delete_from_recycle_bin', ufc_list,
+            on_done=lambda _: self._on_written(f"Permanently deleted {len(ufc_list)} item(s).")
+        )
+    
+    def _on_written(self, message: str):
+        """Reload the list once a queued change has been written, and confirm it."""
+        self.load_recycled_items()
+        QMessageBox.information(self, "Success", message)
+
+
+class QueryStatsDialog(QDialog):
+    """Dialog summarizing how long each database statement has taken."""
+    
+    COLUMNS = ("Statement", "Calls", "Total ms", "Avg ms", "p50 ms", "p95 ms", "Max ms", "Rows")
+    
+    def __init__(self, monitor, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Query Statistics")
+        self.resize(1000, 600)
         
-        try:
-            with sqlite3.connect(self.database.db_path) as conn:
-                c = conn.cursor()
-                
-                for ufc in ufc_list:
-                    c.execute("DELETE FROM recycle_bin WHERE ufc = ?", (ufc,))
-                
-                conn.commit()
+        self.monitor = monitor
+        self.stats: list = []
+        self.init_ui()
+        self.load_stats()
+    
+    def init_ui(self):
+        """Initialize UI components."""
+        layout = QVBoxLayout(self)
         
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to delete items:\n{str(e)}")
\ No newline at end of file
+        info_label = QLabel(
+            "<b>Query Statistics</b><br>"
+            f"Timings since startup, slowest total first. Statements over "
+            f"{self.monitor.slow_threshold_ms:g} ms are logged with their query plan to:<br>"
+            f"{self.monitor.log_path}"
+        )
+        info_label.setWordWrap(True)
+        info_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        layout.addWidget(info_label)
+        
+        self.table = QTableWidget()
+        self.table.setColumnCount(len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(list(self.COLUMNS))
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.itemSelectionChanged.connect(self._show_plan)
+        
+        header = self.table.horizontalHeader()
+        if header:
+            header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.table.setColumnWidth(0, 450)
+        for col in range(1, len(self.COLUMNS)):
+            self.table.setColumnWidth(col, 70)
+        
+        layout.addWidget(self.table)
+        
+        # Plan of the selected statement, when it has been slow
+        self.plan_label = QLabel("")
+        self.plan_label.setWordWrap(True)
+        self.plan_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        layout.addWidget(self.plan_label)
+        
+        button_layout = QHBoxLayout()
+        
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.clicked.connect(self.load_stats)
+        button_layout.addWidget(refresh_btn)
+        
+        reset_btn = QPushButton("Reset")
+        reset_btn.clicked.connect(self._reset)
+        button_layout.addWidget(reset_btn)
+        
+        button_layout.addStretch()
+        
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        button_layout.addWidget(close_btn)
+        
+        layout.addLayout(button_layout)
+    
+    def load_stats(self):
+        """Fill the table from the monitor's current totals."""
+        self.stats = self.monitor.snapshot()
+        self.table.setRowCount(len(self.stats))
+        
+        for row, stat in enumerate(self.stats):
+            values = [
+                stat['sql'], str(stat['calls']),
+                f"{stat['total_ms']:.1f}", f"{stat['avg_ms']:.2f}",
+                f"{stat['p50_ms']:g}", f"{stat['p95_ms']:g}",
+                f"{stat['max_ms']:.1f}", str(stat['rows'])
+            ]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col == 0:
+                    item.setToolTip(stat['sql'])
+                else:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.table.setItem(row, col, item)
+        
+        self.plan_label.setText("")
+    
+    def _show_plan(self):
+        """Show the captured query plan for the selected statement."""
+        rows = self.table.selectionModel().selectedRows() if self.table.selectionModel() else []
+        if not rows or rows[0].row() >= len(self.stats):
+            self.plan_label.setText("")
+            return
+        plan = self.stats[rows[0].row()]['plan']
+        self.plan_label.setText(f"Query plan:\n{plan}" if plan else "No slow executions recorded.")
+    
+    def _reset(self):
+        """Clear all recorded timings."""
+        self.monitor.reset()
+        self.load_stats()
@@ -1,7 +1,6 @@
 """Main application window - with character-based file renaming."""
 import sys
 import os
-import sqlite3
 import re
 import shutil
 from datetime import datetime
@@ -13,14 +12,16 @@ if project_root not in sys.path:
 
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QMessageBox,
-    QFileDialog, QInputDialog, QApplication
+    QFileDialog, QInputDialog, QApplication, QProgressDialog
 )
-from PyQt6.QtCore import Qt, QSize, QTimer
+from PyQt6.QtCore import Qt, QSize
 from PyQt6.QtGui import QPixmap
 import random
-from typing import Optional
+from typing import Any, Callable, Optional
 
 from core.database import ReplayDatabase
+from core.db_worker import DatabaseWriter
+from core.maintenance import MaintenanceScheduler
 from core.preferences import Preferences
 from core.constants import *
 from utils.portrait_manager import PortraitManager
@@ -58,7 +59,23 @@ class MainWindow(QWidget):
         self.database: Optional[ReplayDatabase] = None
         db_path = self.preferences.get('active_db_path')
         if db_path and os.path.exists(db_path):
-            self.database = ReplayDatabase(db_path)
+            self.database = self._open_database(db_path)
+        
+        # All writes run on this thread so the window never waits on disk I/O
+        self.db_writer = DatabaseWriter(self.database, self)
+        self.db_writer.command_failed.connect(self._on_write_failed)
+        self.db_writer.queue_drained.connect(self.refresh_replays)
+        self.db_writer.start()
+        
+        # Checkpoints, purges, ANALYZE, vacuum, backups and integrity checks wait for idle time
+        self.maintenance = MaintenanceScheduler(self)
+        self.maintenance.set_database(self.database)
+        self.maintenance.auto_backup = self.preferences.get('auto_backup', False)
+        self.maintenance.can_run = lambda: self.db_writer.wait_until_idle(0)
+        self.maintenance.task_failed.connect(
+            lambda name, error: print(f"⚠️ Maintenance task '{name}' failed: {error}")
+        )
+        QApplication.instance().installEventFilter(self.maintenance)
         
         # Setup UI FIRST
         self.init_ui()
@@ -76,9 +93,6 @@ class MainWindow(QWidget):
         # Load initial data
         self.load_replays()
         self.update_portraits()
-        
-        # Setup timers
-        self.setup_timers()
     
     def show_controls_dialog(self):
         """Show controls popup dialog."""
@@ -177,6 +191,7 @@ class MainWindow(QWidget):
         self.table.setMinimumHeight(400)
         self.table.recorded_toggled.connect(self.on_recorded_toggled)
         self.table.row_double_clicked.connect(self.on_row_double_clicked)
+        self.table.set_database(self.database)
         main_layout.addWidget(self.table, stretch=1)
         
         # Update active DB label
@@ -184,11 +199,17 @@ class MainWindow(QWidget):
             db_name = os.path.basename(self.database.db_path)
             self.left_panel.set_active_db(db_name)
     
-    def setup_timers(self):
-        """Setup application timers."""
-        self.recycle_timer = QTimer(self)
-        self.recycle_timer.timeout.connect(self.cleanup_recycle_bin)
-        self.recycle_timer.start(RECYCLE_BIN_CHECK_INTERVAL)
+    def closeEvent(self, event):
+        """Finish pending writes and release the database when the window closes."""
+        from core.db_worker import BackgroundTask
+        
+        self.maintenance.stop()
+        self.db_writer.stop()
+        # Jobs left running by closed dialogs still use the database
+        for task in self.findChildren(BackgroundTask):
+            task.wait()
+        self._set_database(None)
+        super().closeEvent(event)
     
     # ==================== Table/Replay Methods ====================
     
@@ -197,22 +218,38 @@ class MainWindow(QWidget):
         if not self.database:
             return
         
-        replays = self.database.get_all_replays()
-        self.table.load_replays(replays)
+        self.table.reload()
     
-    def on_recorded_toggled(self, ufc: str, recorded: bool):
-        """Handle recorded checkbox toggle."""
+    def refresh_replays(self):
+        """Update the table with only the rows changed since it was loaded."""
         if not self.database:
             return
         
         try:
-            self.database.update_replay(ufc, recorded=1 if recorded else 0)
+            self.table.refresh_changes()
         except Exception as e:
-            QMessageBox.critical(
-                self,
-                "Database Error",
-                f"Failed to update recorded status:\n{str(e)}"
-            )
+            print(f"Incremental refresh failed, reloading: {e}")
+            self.load_replays()
+    
+    def on_recorded_toggled(self, ufc: str, recorded: bool):
+        """Handle recorded checkbox toggle."""
+        if not self.database:
+            return
+        
+        # Keyed so rapid toggles of one row collapse into a single write
+        self.db_writer.submit(
+            "update recorded status", 'update_replay', ufc,
+            recorded=1 if recorded else 0, key=('recorded', ufc)
+        )
+    
+    def _on_write_failed(self, command_id: int, label: str, error: str):
+        """Report a failed background write and resync the table."""
+        QMessageBox.critical(
+            self,
+            "Database Error",
+            f"Failed to {label}:\n{error}"
+        )
+        self.load_replays()
     
     def on_row_double_clicked(self, row: int, replay_data: dict):
         """Handle double-click on table row to edit."""
@@ -222,23 +259,17 @@ class MainWindow(QWidget):
         dialog = EditReplayDialog(replay_data, self.database, self)
         
         if dialog.exec():
-            self.load_replays()
-            QMessageBox.information(
-                self,
-                "Success",
-                "Replay updated successfully!"
+            ufc = replay_data.get('ufc', '')
+            self.db_writer.submit(
+                "save changes", 'update_replay', ufc, key=('edit', ufc),
+                on_done=lambda _: QMessageBox.information(
+                    self,
+                    "Success",
+                    "Replay updated successfully!"
+                ),
+                **dialog.get_changes()
             )
     
-    def cleanup_recycle_bin(self):
-        """Cleanup old entries from recycle bin."""
-        if not self.database:
-            return
-        
-        try:
-            self.database.auto_cleanup_recycle_bin(days=30)
-        except Exception as e:
-            print(f"Failed to cleanup recycle bin: {e}")
-    
     # ==================== Database Operations ====================
     
     def on_add_replay(self, data: dict):
@@ -265,30 +296,20 @@ class MainWindow(QWidget):
                 return
         
         # Generate the systematic filename
-        import uuid
-        
         # Sanitize character name
         safe_char = re.sub(r'[\\/:\*\?\"<>\|]', '_', filename_character)
         safe_char = safe_char.lower().replace(" ", "-")
         safe_char = re.sub(r'-+', '-', safe_char).strip('-')
         
         # Generate UFC code ONCE - will be used for both filename and database
-        ufc = f"UFC-{str(uuid.uuid4())[:4].upper()}"
+        try:
+            ufc = self.database.allocate_ufcs(1)[0]
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to allocate a UFC:\n{str(e)}")
+            return
         
         # Get database code
-        try:
-            with sqlite3.connect(self.database.db_path) as conn:
-                c = conn.cursor()
-                c.execute("SELECT unique_db_code FROM db_info LIMIT 1")
-                row = c.fetchone()
-                if row:
-                    db_code = row[0]
-                else:
-                    db_code = str(uuid.uuid4())[:8].upper()
-                    c.execute("INSERT INTO db_info (unique_db_code) VALUES (?)", (db_code,))
-                    conn.commit()
-        except:
-            db_code = "UNKNOWN"
+        db_code = self._get_database_code()
         
         # Generate timestamp
         timestamp = datetime.now().strftime("%m-%d-%Y_%H-%M-%S")
@@ -296,27 +317,25 @@ class MainWindow(QWidget):
         # Create systematic filename
         file_name = f"{safe_char}_{ufc}_UDC-{db_code}_{timestamp}"
         
-        try:
-            # Pass the UFC code to database so it uses the same one
-            self.database.add_replay(
-                file_name=file_name,
-                timestamp=data.get('timestamp', ''),
-                video_link=data.get('video_link', ''),
-                description=data.get('description', ''),
-                tags=data.get('tags', ''),
-                ufc=ufc  # Pass the UFC code we generated
-            )
-            
+        def on_added(_):
             self.left_panel.clear_inputs()
-            self.load_replays()
             QMessageBox.information(
                 self, 
                 "Success", 
                 f"Replay added successfully!\n\nFile Name: {file_name}\nUFC: {ufc}"
             )
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to add replay:\n{str(e)}")
+        
+        # Pass the UFC code to database so it uses the same one
+        self.db_writer.submit(
+            "add replay", 'add_replay',
+            file_name=file_name,
+            timestamp=data.get('timestamp', ''),
+            video_link=data.get('video_link', ''),
+            description=data.get('description', ''),
+            tags=data.get('tags', ''),
+            ufc=ufc,  # Pass the UFC code we generated
+            on_done=on_added
+        )
     
     # ==================== Database Actions ====================
     
@@ -330,6 +349,64 @@ class MainWindow(QWidget):
             self._backup_database()
         elif action == 'restore':
             self._restore_database()
+        elif action == 'info':
+            self._show_database_info()
+        elif action == 'merge':
+            self._merge_database()
+        elif action == 'search_all':
+            self._show_federated_search()
+        elif action == 'auto_backup':
+            self._toggle_auto_backup()
+        elif action == 'compress':
+            self._toggle_compression()
+        elif action == 'integrity':
+            self._check_integrity()
+    
+    def _open_database(self, db_path: str) -> Optional[ReplayDatabase]:
+        """Open a database, showing progress while its schema is upgraded."""
+        progress_dialog = None
+        
+        def on_progress(step: int, total: int, description: str):
+            nonlocal progress_dialog
+            if progress_dialog is None:
+                progress_dialog = QProgressDialog("Upgrading database...", None, 0, total, self)
+                progress_dialog.setWindowTitle("Database Upgrade")
+                progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+                progress_dialog.setMinimumDuration(0)
+            progress_dialog.setLabelText(f"{description}...")
+            progress_dialog.setValue(step - 1)
+            QApplication.processEvents()
+        
+        try:
+            return ReplayDatabase(
+                db_path, progress=on_progress,
+                in_memory=self.preferences.get('in_memory_working_copy', False),
+                compress_descriptions=self.preferences.get('compress_descriptions', False)
+            )
+        except Exception as e:
+            QMessageBox.critical(
+                self,
+                "Database Error",
+                f"Failed to open database:\n{db_path}\n\n{str(e)}"
+            )
+            return None
+        finally:
+            if progress_dialog is not None:
+                progress_dialog.close()
+    
+    def _set_database(self, database: Optional[ReplayDatabase]):
+        """Replace the active database, releasing the previous connection."""
+        self.maintenance.set_database(database)
+        if self.database and self.database is not database:
+            if self.db_writer.isRunning():
+                # Queued behind the writes still pending against it
+                self.db_writer.submit("close database", 'close')
+            else:
+                self.database.close()
+        self.db_writer.set_database(database)
+        self.database = database
+        if hasattr(self, 'table'):
+            self.table.set_database(database)
     
     def _show_database_dialog(self):
         """Show dialog to select database."""
@@ -356,7 +433,10 @@ class MainWindow(QWidget):
         
         if ok and db_name:
             db_path = os.path.join(ACTIVE_DB_FOLDER, db_name)
-            self.database = ReplayDatabase(db_path)
+            database = self._open_database(db_path)
+            if not database:
+                return
+            self._set_database(database)
             self.preferences.set('active_db_path', db_path)
             if hasattr(self, 'left_panel'):
                 self.left_panel.set_active_db(db_name)
@@ -364,12 +444,15 @@ class MainWindow(QWidget):
     
     def _create_new_database(self):
         """Create a new database."""
-        import uuid
-        udc = str(uuid.uuid4())[:8].upper()
+        from core.identifiers import allocate_database_code
+        udc = allocate_database_code([ACTIVE_DB_FOLDER, BACKUP_DB_FOLDER])
         db_name = f"replays_UDC-{udc}.db"
         db_path = os.path.join(ACTIVE_DB_FOLDER, db_name)
         
-        self.database = ReplayDatabase(db_path)
+        database = self._open_database(db_path)
+        if not database:
+            return
+        self._set_database(database)
         self.preferences.set('active_db_path', db_path)
         self.left_panel.set_active_db(db_name)
         self.load_replays()
@@ -382,20 +465,81 @@ class MainWindow(QWidget):
             QMessageBox.warning(self, "No Database", "No active database to backup.")
             return
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        base_name = os.path.splitext(os.path.basename(self.database.db_path))[0]
-        backup_name = f"{base_name}_{timestamp}.db"
-        backup_path = os.path.join(BACKUP_DB_FOLDER, backup_name)
+        if getattr(self, '_backup_task', None) and self._backup_task.isRunning():
+            QMessageBox.information(self, "Backup Running", "A backup is already in progress.")
+            return
         
-        try:
-            os.makedirs(BACKUP_DB_FOLDER, exist_ok=True)
-            shutil.copy2(self.database.db_path, backup_path)
-            QMessageBox.information(self, "Backup Created", f"Database backed up to:\n{backup_path}")
-        except Exception as e:
-            QMessageBox.critical(self, "Backup Failed", f"Failed to backup database:\n{str(e)}")
+        from core.backup_store import BackupStore
+        from core.db_worker import BackgroundTask
+        
+        database = self.database
+        db_path = database.db_path
+        store = BackupStore()
+        
+        # Modeless, so the window stays usable while pages are copied
+        progress_dialog = QProgressDialog("Backing up database...", None, 0, 0, self)
+        progress_dialog.setWindowTitle("Backup")
+        progress_dialog.setMinimumDuration(500)
+        
+        def on_progress(done: int, total: int):
+            progress_dialog.setMaximum(total)
+            progress_dialog.setValue(done)
+        
+        def run_backup(progress):
+            database.flush()  # A working copy's latest changes are only in memory
+            manifest_path = store.snapshot(db_path, progress)
+            return manifest_path, store.prune(db_path)
+        
+        def on_success(result: tuple):
+            manifest_path, removed = result
+            progress_dialog.close()
+            message = f"Database snapshot saved to:\n{manifest_path}"
+            if removed:
+                message += f"\n\nRemoved {removed} old snapshot(s)."
+            QMessageBox.information(self, "Backup Created", message)
+        
+        def on_failure(error: str):
+            progress_dialog.close()
+            QMessageBox.critical(self, "Backup Failed", f"Failed to backup database:\n{error}")
+        
+        self._backup_task = BackgroundTask(run_backup, parent=self)
+        self._backup_task.progress_changed.connect(on_progress)
+        self._backup_task.succeeded.connect(on_success)
+        self._backup_task.failed.connect(on_failure)
+        self._backup_task.start()
     
     def _restore_database(self):
-        """Restore database from backup."""
+        """Restore database from a stored snapshot or a backup file."""
+        from core.backup import BACKUP_TIMESTAMP_FORMAT
+        from core.backup_store import BackupStore
+        from utils.helpers import DISPLAY_DATE_FORMAT
+        
+        store = BackupStore()
+        snapshots = store.list_snapshots()
+        browse_label = "Browse for a backup file..."
+        labels = [
+            f"{m['source']}  —  "
+            f"{datetime.strptime(m['taken_at'], BACKUP_TIMESTAMP_FORMAT).strftime(DISPLAY_DATE_FORMAT)}"
+            for m in snapshots
+        ]
+        
+        choice, ok = QInputDialog.getItem(
+            self, "Restore Database", "Choose a snapshot to restore:",
+            labels + [browse_label], 0, False
+        )
+        if not ok:
+            return
+        
+        if choice == browse_label:
+            self._restore_database_file()
+            return
+        
+        manifest = snapshots[labels.index(choice)]
+        dest_path = os.path.join(ACTIVE_DB_FOLDER, manifest['source'])
+        self._replace_database_file(dest_path, lambda: store.restore(manifest['path'], dest_path))
+    
+    def _restore_database_file(self):
+        """Restore database from a full-copy backup file."""
         path, _ = QFileDialog.getOpenFileName(
             self, "Select Database to Restore",
             BACKUP_DB_FOLDER,
@@ -405,18 +549,242 @@ class MainWindow(QWidget):
         if not path:
             return
         
-        db_name = os.path.basename(path)
-        dest_path = os.path.join(ACTIVE_DB_FOLDER, db_name)
+        dest_path = os.path.join(ACTIVE_DB_FOLDER, os.path.basename(path))
+        self._replace_database_file(dest_path, lambda: shutil.copy2(path, dest_path))
+    
+    def _replace_database_file(self, dest_path: str, write: Callable[[], Any]):
+        """Overwrite a database file with ``write()`` and make it the active database."""
+        if self.database and os.path.abspath(self.database.db_path) == os.path.abspath(dest_path):
+            self._set_database(None)
+        
+        def replace():
+            try:
+                write()
+            except Exception as e:
+                QMessageBox.critical(self, "Restore Failed", f"Failed to restore database:\n{str(e)}")
+                return
+            self._activate_restored_database(dest_path)
+        
+        # An active database's connection closes behind the writes still
+        # queued against it, and a maintenance run's once the run has wound
+        # down; only then may its file be replaced
+        self.maintenance.when_stopped(lambda: self.db_writer.when_idle(replace))
+    
+    def _activate_restored_database(self, db_path: str):
+        """Open a just-restored database and make it active."""
+        database = self._open_database(db_path)
+        if not database:
+            return
+        db_name = os.path.basename(db_path)
+        self._set_database(database)
+        self.preferences.set('active_db_path', db_path)
+        self.left_panel.set_active_db(db_name)
+        self.load_replays()
+        QMessageBox.information(self, "Database Restored", f"Database restored: {db_name}")
+    
+    def _merge_database(self):
+        """Merge another database's replays into the current one."""
+        if not self.database:
+            QMessageBox.warning(self, "No Database", "Please select a database first.")
+            return
+        
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Select Database to Merge In",
+            ACTIVE_DB_FOLDER,
+            "Database Files (*.db)"
+        )
+        if not path:
+            return
+        
+        # Compare against the database as it will be once queued writes land
+        self.db_writer.when_idle(lambda: self._merge_database_from(path))
+    
+    def _merge_database_from(self, path: str):
+        """Show what merging ``path`` would change and merge it if confirmed."""
+        from core.merge import MERGE_POLICIES, ADD, CONFLICT, REKEY, format_merge_report
         
+        if not self.database:
+            return
         try:
-            shutil.copy2(path, dest_path)
-            self.database = ReplayDatabase(dest_path)
-            self.preferences.set('active_db_path', dest_path)
-            self.left_panel.set_active_db(db_name)
-            self.load_replays()
-            QMessageBox.information(self, "Database Restored", f"Database restored: {db_name}")
+            diff = self.database.diff_with(path)
         except Exception as e:
-            QMessageBox.critical(self, "Restore Failed", f"Failed to restore database:\n{str(e)}")
+            QMessageBox.critical(self, "Merge Failed", f"Failed to compare databases:\n{str(e)}")
+            return
+        
+        summary = diff['summary']
+        if not any(summary.get(action) for action in (ADD, REKEY, CONFLICT)):
+            QMessageBox.information(
+                self, "Nothing to Merge",
+                f"{os.path.basename(path)} has no replays that are missing or different here."
+            )
+            return
+        
+        report = format_merge_report(summary)
+        policy = 'newest'
+        if summary.get(CONFLICT):
+            labels = list(MERGE_POLICIES.values())
+            label, ok = QInputDialog.getItem(
+                self, "Merge Database",
+                f"{report}\n\nHow should conflicting replays be resolved?",
+                labels, 0, False
+            )
+            if not ok:
+                return
+            policy = list(MERGE_POLICIES)[labels.index(label)]
+        else:
+            reply = QMessageBox.question(
+                self, "Merge Database",
+                f"{report}\n\nMerge these replays into the current database?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            )
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+        
+        self.db_writer.submit(
+            "merge databases", 'merge_from', path, policy,
+            on_done=lambda result: QMessageBox.information(
+                self, "Merge Complete", format_merge_report(result) or "Nothing changed."
+            )
+        )
+    
+    def _toggle_auto_backup(self):
+        """Turn idle-time snapshots of the active database on or off."""
+        enabled = not self.preferences.get('auto_backup', False)
+        self.preferences.set('auto_backup', enabled)
+        self.maintenance.auto_backup = enabled
+        
+        QMessageBox.information(
+            self,
+            "Automatic Backup",
+            f"Automatic backups are now {'on' if enabled else 'off'}.\n\n"
+            f"When on, a snapshot is taken while the app is idle, at most every "
+            f"{AUTO_BACKUP_INTERVAL_HOURS} hours."
+        )
+    
+    def _toggle_compression(self):
+        """Turn compression of long descriptions on or off."""
+        enabled = not self.preferences.get('compress_descriptions', False)
+        self.preferences.set('compress_descriptions', enabled)
+        if self.database:
+            self.database.compress_descriptions = enabled
+        
+        QMessageBox.information(
+            self,
+            "Description Compression",
+            f"Description compression is now {'on' if enabled else 'off'}.\n\n"
+            f"When on, descriptions of {DESCRIPTION_COMPRESS_MIN_CHARS} characters or more "
+            f"are stored compressed; existing ones are compressed while the app is idle. "
+            f"Compressed descriptions stay searchable either way."
+        )
+    
+    def _check_integrity(self):
+        """Check the active database for inconsistencies and offer to repair them."""
+        if not self.database:
+            QMessageBox.warning(self, "No Database", "Please select a database first.")
+            return
+        
+        if getattr(self, '_integrity_task', None) and self._integrity_task.isRunning():
+            QMessageBox.information(self, "Check Running", "An integrity check is already in progress.")
+            return
+        
+        # Check the database as it will be once queued writes land
+        self.db_writer.when_idle(self._start_integrity_check)
+    
+    def _start_integrity_check(self):
+        """Run the integrity check on a background thread and report what it finds."""
+        from core.db_worker import BackgroundTask
+        from core.integrity import format_integrity_report, format_repair_report
+        
+        if not self.database:
+            return
+        
+        # Modeless, so the window stays usable during a long check
+        progress_dialog = QProgressDialog("Checking database...", None, 0, 0, self)
+        progress_dialog.setWindowTitle("Integrity Check")
+        progress_dialog.setMinimumDuration(500)
+        
+        def on_progress(done: int, total: int):
+            progress_dialog.setMaximum(total)
+            progress_dialog.setValue(done)
+        
+        def on_success(check):
+            progress_dialog.close()
+            report = format_integrity_report(check)
+            fixable = check.fixable
+            if not check.problems:
+                QMessageBox.information(self, "Integrity Check", report)
+                return
+            if not fixable:
+                QMessageBox.warning(
+                    self, "Integrity Check",
+                    f"{report}\n\nThese problems cannot be repaired automatically. "
+                    f"Damaged tables are best recovered by restoring a backup."
+                )
+                return
+            
+            reply = QMessageBox.question(
+                self, "Integrity Check",
+                f"{report}\n\nRepair the {len(fixable)} problem(s) that can be fixed?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            )
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+            
+            self.db_writer.submit(
+                "repair database", 'repair_integrity', fixable,
+                on_done=lambda fixed: QMessageBox.information(
+                    self, "Repair Complete", format_repair_report(fixed) or "Nothing needed fixing."
+                )
+            )
+        
+        def on_failure(error: str):
+            progress_dialog.close()
+            QMessageBox.critical(self, "Integrity Check Failed", f"Failed to check database:\n{error}")
+        
+        self._integrity_task = BackgroundTask(self.database.check_integrity, parent=self)
+        self._integrity_task.progress_changed.connect(on_progress)
+        self._integrity_task.succeeded.connect(on_success)
+        self._integrity_task.failed.connect(on_failure)
+        self._integrity_task.start()
+    
+    def _show_database_info(self):
+        """Show sizes, fragmentation and upkeep history of the active database."""
+        from ui.dialogs.database_dialogs import DatabaseInfoDialog
+        
+        if not self.database:
+            QMessageBox.warning(self, "No Database", "Please select a database first.")
+            return
+        
+        def show():
+            if self.database:
+                DatabaseInfoDialog(self.database, self).exec()
+        
+        # Let queued writes land so the row counts match the table
+        self.db_writer.when_idle(show)
+    
+    def _show_federated_search(self):
+        """Search every database in the active folder."""
+        from ui.dialogs.database_dialogs import FederatedSearchDialog
+        
+        def show():
+            dialog = FederatedSearchDialog(self)
+            dialog.open_result_requested.connect(self._open_search_result)
+            dialog.exec()
+        
+        # Queued writes should be visible to the other connections
+        self.db_writer.when_idle(show)
+    
+    def _open_search_result(self, db_path: str, file_name: str):
+        """Switch to the database holding a search result and filter to the replay."""
+        if not self.database or os.path.abspath(self.database.db_path) != os.path.abspath(db_path):
+            database = self._open_database(db_path)
+            if not database:
+                return
+            self._set_database(database)
+            self.preferences.set('active_db_path', db_path)
+            self.left_panel.set_active_db(os.path.basename(db_path))
+            self.load_replays()
+        self.search_bar.set_text(file_name)
     
     # ==================== Filter Actions ====================
     
@@ -427,51 +795,56 @@ class MainWindow(QWidget):
         elif action == 'recorded':
             self._show_recorded_filter_dialog()
         elif action == 'clear':
-            self.search_bar.clear()
-            self.table.apply_filters()
+            self.current_tag_filter = []
+            self.recorded_filter = None
+            if self.search_bar.get_text():
+                self.search_bar.clear()  # Re-queries through on_search_changed
+            else:
+                self._apply_filters()
     
     def _show_tag_filter_dialog(self):
         """Show tag filter dialog."""
         if not self.database:
             return
         
-        all_tags = self.database.get_all_tags()
+        tag_counts = self.database.get_tag_counts()
         
         dialog = TagFilterDialog(
-            all_tags=all_tags,
+            all_tags=list(tag_counts),
             current_tags=getattr(self, 'current_tag_filter', []),
             use_and=getattr(self, 'use_and_logic', False),
-            parent=self
+            parent=self,
+            tag_counts=tag_counts
         )
         
         if dialog.exec():
             self.current_tag_filter = dialog.get_selected_tags()
             self.use_and_logic = dialog.get_use_and_logic()
-            
-            if hasattr(self.table, 'proxy_model'):
-                self.table.proxy_model.use_and_logic = self.use_and_logic
-            
-            self.table.apply_filters(
-                search_text=self.search_bar.get_text(),
-                tags=self.current_tag_filter
-            )
+            self._apply_filters()
     
     def _show_recorded_filter_dialog(self):
         """Show recorded filter dialog."""
         current_filter = getattr(self, 'recorded_filter', None)
         
-        dialog = RecordedFilterDialog(current_filter, self)
+        stats = self.database.get_replay_stats() if self.database else None
+        dialog = RecordedFilterDialog(current_filter, self, stats=stats)
         
         if dialog.exec():
             self.recorded_filter = dialog.get_recorded_filter()
-            self.table.apply_filters(
-                search_text=self.search_bar.get_text(),
-                recorded=self.recorded_filter
-            )
+            self._apply_filters()
     
     def on_search_changed(self, search_text: str):
         """Handle search text changes."""
-        self.table.apply_filters(search_text=search_text)
+        self._apply_filters()
+    
+    def _apply_filters(self):
+        """Re-query the table with the search text and every active filter."""
+        self.table.apply_filters(
+            search_text=self.search_bar.get_text(),
+            tags=getattr(self, 'current_tag_filter', []),
+            recorded=getattr(self, 'recorded_filter', None),
+            match_all=getattr(self, 'use_and_logic', False)
+        )
     
     # ==================== Utility Actions ====================
     
@@ -491,6 +864,8 @@ class MainWindow(QWidget):
             self._export_to_csv()
         elif action == 'refresh':
             self.load_replays()
+        elif action == 'query_stats':
+            self._show_query_stats()
         elif action == 'about':
             self._show_about_dialog()
         elif action == 'set_rename_character':
@@ -499,7 +874,20 @@ class MainWindow(QWidget):
             self.rename_selected_files()
     
     def _export_to_csv(self):
-        """Export selected rows to CSV."""
+        """Export selected rows (or every row when nothing is selected) to CSV."""
+        if not self.database:
+            QMessageBox.warning(self, "No Database", "Please select a database first.")
+            return
+        
+        selected_ufcs = set()
+        selection_model = self.table.selectionModel()
+        if selection_model:
+            for proxy_index in selection_model.selectedRows():
+                source_index = self.table.proxy_model.mapToSource(proxy_index)
+                ufc_item = self.table._model.item(source_index.row(), 2)
+                if ufc_item:
+                    selected_ufcs.add(ufc_item.text())
+        
         path, _ = QFileDialog.getSaveFileName(
             self, "Export to CSV",
             "", "CSV Files (*.csv)"
@@ -508,7 +896,13 @@ class MainWindow(QWidget):
         if not path:
             return
         
-        QMessageBox.information(self, "Export", "CSV export functionality coming soon!")
+        from utils.exporters import export_replays_csv
+        
+        try:
+            count = export_replays_csv(path, self.database.iter_replays(), selected_ufcs or None)
+            QMessageBox.information(self, "Export", f"Exported {count} replay(s) to:\n{path}")
+        except Exception as e:
+            QMessageBox.critical(self, "Export Failed", f"Failed to export replays:\n{str(e)}")
     
     def _show_about_dialog(self):
         """Show about dialog."""
@@ -529,6 +923,14 @@ class MainWindow(QWidget):
         """
         QMessageBox.about(self, "About", about_text)
     
+    def _show_query_stats(self):
+        """Show per-statement database timings."""
+        from core.instrumentation import query_monitor
+        from ui.dialogs.utility_dialogs import QueryStatsDialog
+        
+        dialog = QueryStatsDialog(query_monitor, self)
+        dialog.exec()
+    
     def _open_replay_folder(self):
         """Open the replay folder in file explorer."""
         import subprocess
@@ -567,8 +969,16 @@ class MainWindow(QWidget):
         from ui.dialogs.utility_dialogs import FindReplaceDialog
         dialog = FindReplaceDialog(self.database, self)
         
-        if dialog.exec():
-            self.load_replays()
+        if dialog.exec() and dialog.get_replacement():
+            column_name, find_text, replace_text, count = dialog.get_replacement()
+            self.db_writer.submit(
+                "replace text", 'replace_text', column_name, find_text, replace_text,
+                on_done=lambda _: QMessageBox.information(
+                    self,
+                    "Success",
+                    f"Replaced text in {count} entry/entries."
+                )
+            )
     
     def _open_selected_links(self):
         """Open video links for selected replays."""
@@ -653,22 +1063,14 @@ class MainWindow(QWidget):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
-            try:
-                for ufc in ufc_list:
-                    self.database.delete_replay(ufc, permanent=False)  # Move to recycle bin
-                
-                self.load_replays()
-                QMessageBox.information(
+            self.db_writer.submit(
+                "delete entries", 'delete_replays', ufc_list,  # Move to recycle bin
+                on_done=lambda _: QMessageBox.information(
                     self,
                     "Success",
                     f"Moved {len(ufc_list)} entry/entries to Recycle Bin."
                 )
-            except Exception as e:
-                QMessageBox.critical(
-                    self,
-                    "Error",
-                    f"Failed to delete entries:\n{str(e)}"
-                )
+            )
     
     def _show_recycle_bin(self):
         """Show recycle bin dialog."""
@@ -677,10 +1079,12 @@ class MainWindow(QWidget):
             return
         
         from ui.dialogs.utility_dialogs import RecycleBinDialog
-        dialog = RecycleBinDialog(self.database, self)
         
-        if dialog.exec():
-            self.load_replays()  # Refresh in case items were restored
+        def show():
+            if self.database and RecycleBinDialog(self.database, self.db_writer, self).exec():
+                self.refresh_replays()  # Refresh in case items were restored
+        
+        self.db_writer.when_idle(show)  # Show deletions that are still queued
     
     # ==================== FILE RENAMING FUNCTIONALITY ====================
     
@@ -746,7 +1150,7 @@ class MainWindow(QWidget):
         db_code = self._get_database_code()
         safe_character = self._sanitize_character_name(rename_character)
         
-        renamed_count = 0
+        renamed_files = {}
         failed_renames = []
         
         for idx, proxy_index in enumerate(selected_rows):
@@ -769,18 +1173,17 @@ class MainWindow(QWidget):
             
             try:
                 shutil.move(original_path, new_path)
-                new_filename = os.path.basename(new_path)
-                self.database.update_replay(ufc, renamed_filename=new_filename)
-                renamed_count += 1
+                renamed_files[ufc] = {'renamed_filename': os.path.basename(new_path)}
             except Exception as e:
                 failed_renames.append((ufc, str(e)))
         
-        message = f"Successfully renamed {renamed_count} file(s) using character: {rename_character}"
+        self.db_writer.submit("record renamed files", 'update_replays', renamed_files)
+        
+        message = f"Successfully renamed {len(renamed_files)} file(s) using character: {rename_character}"
         if failed_renames:
             message += f"\n\nFailed: {len(failed_renames)} file(s)"
         
         QMessageBox.information(self, "Rename Complete", message)
-        self.load_replays()
     
     def _get_database_code(self) -> str:
         """Get the unique database code (UDC)."""
@@ -788,18 +1191,7 @@ class MainWindow(QWidget):
             return "UNKNOWN"
         
         try:
-            with sqlite3.connect(self.database.db_path) as conn:
-                c = conn.cursor()
-                c.execute("SELECT unique_db_code FROM db_info LIMIT 1")
-                row = c.fetchone()
-                if row:
-                    return row[0]
-                else:
-                    import uuid
-                    new_udc = str(uuid.uuid4())[:8].upper()
-                    c.execute("INSERT INTO db_info (unique_db_code) VALUES (?)", (new_udc,))
-                    conn.commit()
-                    return new_udc
+            return self.database.get_database_code()
         except Exception as e:
             print(f"Error getting database code: {e}")
             return "UNKNOWN"
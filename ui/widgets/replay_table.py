@@ -1,14 +1,29 @@
 """Custom replay table widget - FIXED TEXT WRAPPING."""
 from PyQt6.QtWidgets import (
     QTableView, QHeaderView, QAbstractItemView, QStyledItemDelegate,
-    QStyleOptionViewItem, QStyle, QApplication, QWidget
+    QStyleOptionViewItem, QStyle, QApplication, QWidget, QToolTip
 )
 from PyQt6.QtGui import (
     QStandardItemModel, QStandardItem, QPalette, QTextDocument, 
     QAbstractTextDocumentLayout, QPainter
 )
-from PyQt6.QtCore import Qt, QSortFilterProxyModel, QSize, pyqtSignal, QModelIndex
-from typing import Any, Optional
+from PyQt6.QtCore import (
+    Qt, QEvent, QSortFilterProxyModel, QSize, QTimer, pyqtSignal, QModelIndex
+)
+from typing import Any, Iterable, Iterator, Optional
+
+from core.database import ReplayDatabase, ReplayQuery
+
+# Item data role (on the first column) holding the row's ReplayQuery.sort_key
+SORT_KEY_ROLE = Qt.ItemDataRole.UserRole + 1
+# Item data role (on the description column): True if only a preview is loaded
+TRUNCATED_ROLE = Qt.ItemDataRole.UserRole + 2
+
+DESCRIPTION_COLUMN = 5
+
+# ReplayQuery sort key for each table column
+COLUMN_SORT_KEYS = ('file_name', 'timestamp', 'ufc', 'recorded',
+                    'video_link', 'description', 'added_at', 'tags')
 
 
 class ElidedTextDelegate(QStyledItemDelegate):
@@ -28,79 +43,6 @@ class ElidedTextDelegate(QStyledItemDelegate):
         return QSize(option.rect.width(), 40)  # Fixed row height
 
 
-class ReplaySortFilterProxy(QSortFilterProxyModel):
-    """Custom proxy model for filtering and sorting replays with AND/OR tag logic."""
-    
-    def __init__(self):
-        super().__init__()
-        self.search_text = ""
-        self.tag_filters: list[str] = []
-        self.recorded_filter: Optional[bool] = None
-        self.use_and_logic: bool = False
-    
-    def setSearchText(self, text: str):
-        """Set search text filter."""
-        self.search_text = text.lower().strip()
-        self.invalidateFilter()
-    
-    def setTagFilter(self, tags: list[str]):
-        """Set tag filter."""
-        self.tag_filters = [t.lower() for t in tags]
-        self.invalidateFilter()
-    
-    def setRecordedFilter(self, recorded: Optional[bool]):
-        """Set recorded status filter."""
-        self.recorded_filter = recorded
-        self.invalidateFilter()
-    
-    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
-        """Determine if row should be displayed."""
-        model = self.sourceModel()
-        if not isinstance(model, QStandardItemModel):
-            return False
-        
-        # Get data from columns with type-safe checks
-        file_name_item = model.item(source_row, 0)
-        desc_item = model.item(source_row, 5)
-        tags_item = model.item(source_row, 7)
-        recorded_item = model.item(source_row, 3)
-        
-        if not file_name_item or not desc_item:
-            return False
-        
-        file_name = file_name_item.text().lower()
-        description = desc_item.text().lower()
-        tags = tags_item.text().lower() if tags_item else ""
-        recorded = recorded_item.checkState() == Qt.CheckState.Checked if recorded_item else False
-        
-        # Search filter
-        if self.search_text:
-            if not (self.search_text in file_name or 
-                   self.search_text in description or
-                   self.search_text in tags):
-                return False
-        
-        # Tag filter with AND/OR logic
-        if self.tag_filters:
-            tag_list = [t.strip().lower() for t in tags.split(',') if t.strip()]
-            
-            if self.use_and_logic:
-                # AND logic: replay must have ALL selected tags
-                if not all(ft in tag_list for ft in self.tag_filters):
-                    return False
-            else:
-                # OR logic: replay must have at least ONE selected tag
-                if not any(ft in tag_list for ft in self.tag_filters):
-                    return False
-        
-        # Recorded filter
-        if self.recorded_filter is not None:
-            if recorded != self.recorded_filter:
-                return False
-        
-        return True
-
-
 class ReplayTable(QTableView):
     """Custom table view for displaying replays."""
     
@@ -111,6 +53,19 @@ class ReplayTable(QTableView):
         super().__init__(parent)
         # Store model reference properly
         self._model = QStandardItemModel()
+        self.database: Optional[ReplayDatabase] = None
+        # Filters and sort order; the database only returns matching rows
+        self.query = ReplayQuery()
+        
+        # Change-log position the table contents reflect (None until loaded)
+        self._change_seq: Optional[int] = None
+        
+        # Pages still to be appended by an incremental load
+        self._pending_pages: Optional[Iterator[list[dict]]] = None
+        self._page_timer = QTimer(self)
+        self._page_timer.setSingleShot(True)
+        self._page_timer.timeout.connect(self._load_next_page)
+        
         self.setup_model()
         self.setup_ui()
     
@@ -121,9 +76,10 @@ class ReplayTable(QTableView):
             "Video Link", "Description", "Date Added", "Tags"
         ])
         
-        self.proxy_model = ReplaySortFilterProxy()
+        # Filtering and sorting happen in SQL; the proxy only keeps index
+        # mapping the same for callers
+        self.proxy_model = QSortFilterProxyModel()
         self.proxy_model.setSourceModel(self._model)
-        self.proxy_model.setDynamicSortFilter(True)
         
         self.setModel(self.proxy_model)
     
@@ -131,7 +87,7 @@ class ReplayTable(QTableView):
         """Setup UI properties."""
         self.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
-        self.setSortingEnabled(True)
+        self.setSortingEnabled(False)  # Header clicks re-query in a new order
         self.setWordWrap(False)  # DISABLE word wrap
         
         # Header settings with type-safe checks
@@ -144,6 +100,10 @@ class ReplayTable(QTableView):
         if h_header:
             h_header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
             h_header.setStretchLastSection(False)  # Don't stretch last column
+            h_header.setSectionsClickable(True)
+            h_header.setSortIndicatorShown(True)
+            h_header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+            h_header.sortIndicatorChanged.connect(self._on_sort_changed)
         
         # Use elided text delegate for all columns
         self.elided_delegate = ElidedTextDelegate()
@@ -167,67 +127,233 @@ class ReplayTable(QTableView):
         self.doubleClicked.connect(self._on_double_click)
         self.clicked.connect(self._on_click)
     
+    def set_database(self, database: Optional[ReplayDatabase]):
+        """Set the database used to answer searches."""
+        self.cancel_loading()
+        self._change_seq = None
+        self.database = database
+    
+    def reload(self):
+        """Fetch the rows matching the current query from the database."""
+        if not self.database:
+            self.cancel_loading()
+            self._model.removeRows(0, self._model.rowCount())
+            return
+        self.load_replay_pages(self.database.iter_query(self.query, preview=True))
+    
     def load_replays(self, replays: list[dict]):
         """Load replay data into the table."""
+        self.load_replay_pages([replays])
+    
+    def load_replay_pages(self, pages: Iterable[list[dict]]):
+        """Load replays a page at a time, returning to the event loop between pages.
+
+        The first page is shown immediately; the rest are appended as the
+        GUI goes idle, so large databases never block the first paint.
+        """
+        self.cancel_loading()
         self._model.removeRows(0, self._model.rowCount())
         
-        for replay in replays:
-            items = []
-            
-            # File Name
-            item = QStandardItem(replay.get('file_name', ''))
-            item.setEditable(False)
-            item.setToolTip(replay.get('file_name', ''))  # Full text on hover
-            items.append(item)
-            
-            # Timestamp
-            item = QStandardItem(replay.get('timestamp', ''))
-            item.setEditable(False)
-            items.append(item)
-            
-            # UFC
-            item = QStandardItem(replay.get('ufc', ''))
-            item.setEditable(False)
-            items.append(item)
-            
-            # Recorded (checkable)
-            item = QStandardItem()
-            item.setCheckable(True)
-            item.setCheckState(
-                Qt.CheckState.Checked if replay.get('recorded', False) 
-                else Qt.CheckState.Unchecked
+        # Changes logged while pages stream in are replayed by the next refresh
+        self._change_seq = None
+        if self.database:
+            try:
+                self._change_seq = self.database.get_change_seq()
+            except Exception as e:
+                print(f"Failed to read change log: {e}")
+        
+        self._pending_pages = iter(pages)
+        self._load_next_page()
+    
+    def cancel_loading(self):
+        """Stop appending pages from an in-progress load."""
+        self._page_timer.stop()
+        self._pending_pages = None
+    
+    def _load_next_page(self):
+        """Append the next pending page and schedule the one after it."""
+        if self._pending_pages is None:
+            return
+        
+        try:
+            page = next(self._pending_pages, None)
+        except Exception as e:
+            print(f"Failed to load replays: {e}")
+            page = None
+        
+        if page is None:
+            self._pending_pages = None
+            return
+        
+        self.append_replays(page)
+        self._page_timer.start(0)
+    
+    def refresh_changes(self) -> bool:
+        """Apply only the rows changed since the last load or refresh.
+
+        Returns False if the table had to fall back to a full reload.
+        """
+        if not self.database:
+            return False
+        
+        changes = None
+        if self._change_seq is not None and self._pending_pages is None:
+            changes = self.database.changes_since(self._change_seq)
+        
+        if changes is None:
+            self.reload()
+            return False
+        if not changes:
+            return True
+        
+        self._change_seq = changes[-1]['seq']
+        
+        # Only the latest state of each UFC matters
+        changed_ufcs = list(dict.fromkeys(
+            change['ufc'] for change in changes
+            if change['table'] == 'replays' and change['ufc']
+        ))
+        # Rows that no longer match the filters come back missing, like deletions
+        current = {
+            r['ufc']: r for r in self.database.get_replays_by_ufcs(
+                changed_ufcs, self.query, preview=True
             )
-            items.append(item)
-            
-            # Video Link
-            item = QStandardItem(replay.get('video_link', ''))
-            item.setEditable(False)
-            item.setToolTip(replay.get('video_link', ''))  # Full text on hover
-            items.append(item)
-            
-            # Description - truncate if too long
-            desc = replay.get('description', '')
-            item = QStandardItem(desc)
-            item.setEditable(False)
-            item.setToolTip(desc)  # Full text on hover
-            items.append(item)
-            
-            # Date Added
-            item = QStandardItem(replay.get('date_added', ''))
-            item.setEditable(False)
-            items.append(item)
-            
-            # Tags
-            tags = replay.get('tags', '')
-            item = QStandardItem(tags)
-            item.setEditable(False)
-            item.setToolTip(tags)  # Full text on hover
-            items.append(item)
+        }
+        rows = self._find_rows(changed_ufcs)
+        
+        removed_rows = []
+        moved = []
+        for ufc in changed_ufcs:
+            replay = current.get(ufc)
+            row = rows.get(ufc)
             
-            self._model.appendRow(items)
+            if replay is None:
+                if row is not None:
+                    removed_rows.append(row)
+            elif row is not None and self._row_sort_key(row) == self.query.sort_key(replay):
+                # Replace items in place so the row keeps its position and selection
+                for col, item in enumerate(self._make_row(replay, self.query)):
+                    self._model.setItem(row, col, item)
+            else:
+                if row is not None:
+                    removed_rows.append(row)
+                moved.append(replay)
+        
+        # Remove bottom-up so earlier row numbers stay valid
+        for row in sorted(removed_rows, reverse=True):
+            self._model.removeRow(row)
+        
+        for replay in moved:
+            self._model.insertRow(self._insert_position(replay), self._make_row(replay, self.query))
+        return True
+    
+    def _row_sort_key(self, row: int) -> Optional[tuple]:
+        item = self._model.item(row, 0)
+        return item.data(SORT_KEY_ROLE) if item else None
+    
+    def _insert_position(self, replay: dict) -> int:
+        """Binary-search the row at which a replay belongs in the current sort order."""
+        key = self.query.sort_key(replay)
+        low, high = 0, self._model.rowCount()
+        while low < high:
+            mid = (low + high) // 2
+            mid_key = self._row_sort_key(mid)
+            before = mid_key is not None and (
+                mid_key > key if self.query.descending else mid_key < key
+            )
+            if before:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+    
+    def _find_rows(self, ufc_list: list[str]) -> dict[str, int]:
+        """Map UFCs to their source-model rows."""
+        if len(ufc_list) <= 32:
+            rows = {}
+            for ufc in ufc_list:
+                found = self._model.findItems(ufc, Qt.MatchFlag.MatchExactly, 2)
+                if found:
+                    rows[ufc] = found[0].row()
+            return rows
+        
+        # One pass over the column beats a lookup per UFC for large deltas
+        wanted = set(ufc_list)
+        rows = {}
+        for row in range(self._model.rowCount()):
+            item = self._model.item(row, 2)
+            if item and item.text() in wanted:
+                rows[item.text()] = row
+        return rows
+    
+    def append_replays(self, replays: list[dict]):
+        """Append replay rows to the end of the table."""
+        for replay in replays:
+            self._model.appendRow(self._make_row(replay, self.query))
         
         # Don't resize columns to contents - keep fixed widths
     
+    @staticmethod
+    def _make_row(replay: dict, query: ReplayQuery) -> list[QStandardItem]:
+        """Build the items for one table row."""
+        items = []
+        
+        # File Name
+        item = QStandardItem(replay.get('file_name', ''))
+        item.setEditable(False)
+        item.setToolTip(replay.get('file_name', ''))  # Full text on hover
+        item.setData(query.sort_key(replay), SORT_KEY_ROLE)
+        items.append(item)
+        
+        # Timestamp
+        item = QStandardItem(replay.get('timestamp', ''))
+        item.setEditable(False)
+        items.append(item)
+        
+        # UFC
+        item = QStandardItem(replay.get('ufc', ''))
+        item.setEditable(False)
+        items.append(item)
+        
+        # Recorded (checkable)
+        item = QStandardItem()
+        item.setCheckable(True)
+        item.setCheckState(
+            Qt.CheckState.Checked if replay.get('recorded', False) 
+            else Qt.CheckState.Unchecked
+        )
+        items.append(item)
+        
+        # Video Link
+        item = QStandardItem(replay.get('video_link', ''))
+        item.setEditable(False)
+        item.setToolTip(replay.get('video_link', ''))  # Full text on hover
+        items.append(item)
+        
+        # Description - only a preview of long ones; the full text is fetched on hover
+        desc = replay.get('description', '')
+        truncated = replay.get('description_truncated', False)
+        item = QStandardItem(desc + "…" if truncated else desc)
+        item.setEditable(False)
+        item.setData(truncated, TRUNCATED_ROLE)
+        if not truncated:
+            item.setToolTip(desc)  # Full text on hover
+        items.append(item)
+        
+        # Date Added
+        item = QStandardItem(replay.get('date_added', ''))
+        item.setEditable(False)
+        items.append(item)
+        
+        # Tags
+        tags = replay.get('tags', '')
+        item = QStandardItem(tags)
+        item.setEditable(False)
+        item.setToolTip(tags)  # Full text on hover
+        items.append(item)
+        
+        return items
+    
     def _on_double_click(self, index: QModelIndex):
         """Handle double-click on row to edit."""
         source_index = self.proxy_model.mapToSource(index)
@@ -244,13 +370,35 @@ class ReplayTable(QTableView):
             'timestamp': safe_text(row, 1),
             'ufc': safe_text(row, 2),
             'video_link': safe_text(row, 4),
-            'description': safe_text(row, 5),
+            'description': self.full_description(row),
             'date_added': safe_text(row, 6),
             'tags': safe_text(row, 7)
         }
         
         self.row_double_clicked.emit(row, replay_data)
     
+    def full_description(self, row: int) -> str:
+        """Get a source row's whole description, fetching it if only a preview is loaded."""
+        item = self._model.item(row, DESCRIPTION_COLUMN)
+        if not item:
+            return ''
+        ufc_item = self._model.item(row, 2)
+        if item.data(TRUNCATED_ROLE) and ufc_item and self.database:
+            return self.database.get_description(ufc_item.text())
+        return item.text()
+    
+    def viewportEvent(self, event: QEvent) -> bool:
+        """Show the full text of previewed descriptions as their tooltip."""
+        if event.type() == QEvent.Type.ToolTip:
+            index = self.indexAt(event.pos())
+            if index.isValid() and index.column() == DESCRIPTION_COLUMN:
+                row = self.proxy_model.mapToSource(index).row()
+                item = self._model.item(row, DESCRIPTION_COLUMN)
+                if item and item.data(TRUNCATED_ROLE):
+                    QToolTip.showText(event.globalPos(), self.full_description(row), self.viewport())
+                    return True
+        return super().viewportEvent(event)
+    
     def _on_click(self, index: QModelIndex):
         """Handle click on cell."""
         if index.column() != 3:  # Not the Recorded column
@@ -270,11 +418,23 @@ class ReplayTable(QTableView):
             ufc = ufc_item.text()
             self.recorded_toggled.emit(ufc, new_state)
     
-    def apply_filters(self, search_text: str = "", tags: Optional[list[str]] = None, 
-                     recorded: Optional[bool] = None):
-        """Apply filters to the table."""
-        self.proxy_model.setSearchText(search_text)
-        if tags is not None:
-            self.proxy_model.setTagFilter(tags)
-        if recorded is not None:
-            self.proxy_model.setRecordedFilter(recorded)
\ No newline at end of file
+    def apply_filters(self, search_text: str = "", tags: Optional[list[str]] = None,
+                      recorded: Optional[bool] = None, match_all: bool = False):
+        """Show only the replays matching every given filter.
+
+        The filters are compiled into one SQL query, so only matching rows
+        are fetched.
+        """
+        self.query.search_text = search_text
+        self.query.tags = tags or []
+        self.query.recorded = recorded
+        self.query.match_all = match_all
+        self.reload()
+    
+    def _on_sort_changed(self, column: int, order: Qt.SortOrder):
+        """Re-query in the order of the clicked column."""
+        if not 0 <= column < len(COLUMN_SORT_KEYS):
+            return
+        self.query.sort_by = COLUMN_SORT_KEYS[column]
+        self.query.descending = order == Qt.SortOrder.DescendingOrder
+        self.reload()
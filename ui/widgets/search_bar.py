@@ -21,7 +21,7 @@ class SearchBar(QWidget):
         layout.addWidget(label)
         
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("Search by name, tags, or description...")
+        self.search_input.setPlaceholderText("Search by name, tags, or description (word prefixes)...")
         self.search_input.textChanged.connect(self.search_changed.emit)
         layout.addWidget(self.search_input)
     
@@ -31,4 +31,8 @@ class SearchBar(QWidget):
     
     def get_text(self) -> str:
         """Get current search text."""
-        return self.search_input.text()
\ No newline at end of file
+        return self.search_input.text()
+    
+    def set_text(self, text: str):
+        """Replace the search text."""
+        self.search_input.setText(text)
\ No newline at end of file
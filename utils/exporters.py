@@ -0,0 +1,46 @@
+"""Export replay data to external file formats."""
+import csv
+from typing import Dict, Iterable, List, Optional, Set
+
+# (header, replay dict key) for each exported column
+CSV_COLUMNS = [
+    ("File Name", 'file_name'),
+    ("Timestamp", 'timestamp'),
+    ("UFC", 'ufc'),
+    ("Recorded", 'recorded'),
+    ("Video Link", 'video_link'),
+    ("Description", 'description'),
+    ("Date Added", 'date_added'),
+    ("Tags", 'tags'),
+]
+
+
+def _csv_value(replay: Dict, key: str) -> str:
+    """Format one replay field for CSV output."""
+    if key == 'recorded':
+        return "Yes" if replay.get(key) else "No"
+    return replay.get(key, "")
+
+
+def export_replays_csv(path: str, pages: Iterable[List[Dict]],
+                       ufcs: Optional[Set[str]] = None) -> int:
+    """Write replay pages to a CSV file as they arrive and return the row count.
+
+    Only one page is held in memory at a time. When ``ufcs`` is given, only
+    those replays are written.
+    """
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow([header for header, _ in CSV_COLUMNS])
+        
+        for page in pages:
+            rows = [
+                [_csv_value(replay, key) for _, key in CSV_COLUMNS]
+                for replay in page
+                if ufcs is None or replay.get('ufc') in ufcs
+            ]
+            writer.writerows(rows)
+            count += len(rows)
+    
+    return count
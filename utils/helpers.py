@@ -0,0 +1,80 @@
+"""Small shared helpers for tags, dates, search text and caching."""
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Hashable, Iterable, List, Optional
+
+# Format used for dates shown in the UI (and by legacy text date columns)
+DISPLAY_DATE_FORMAT = "%m-%d-%Y %H:%M:%S"
+
+
+def split_tags(tag_str: Optional[str]) -> List[str]:
+    """Split a comma-separated tag string into unique, trimmed tags."""
+    tags = []
+    seen = set()
+    for tag in (tag_str or "").split(','):
+        tag = tag.strip()
+        if tag and tag.lower() not in seen:
+            seen.add(tag.lower())
+            tags.append(tag)
+    return tags
+
+
+def format_timestamp(epoch: Optional[int]) -> str:
+    """Format an epoch-seconds value for display."""
+    if epoch is None:
+        return ""
+    return datetime.fromtimestamp(epoch).strftime(DISPLAY_DATE_FORMAT)
+
+
+def parse_display_date(text: Optional[str]) -> Optional[int]:
+    """Parse a display/legacy date string into epoch seconds."""
+    try:
+        return int(datetime.strptime((text or "").strip(), DISPLAY_DATE_FORMAT).timestamp())
+    except ValueError:
+        return None
+
+
+def fts_prefix_query(text: str) -> str:
+    """Turn free search text into an FTS5 prefix query (all terms must match)."""
+    terms = re.findall(r'\w+', text)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+class LRUCache:
+    """A small thread-safe cache that forgets the least recently used entry."""
+    
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        # Bumped by every invalidate()
+        self.generation = 0
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+    
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        """Cache a value; with ``generation``, only if nothing was invalidated since then."""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, keys: Optional[Iterable[Hashable]] = None):
+        """Drop the given keys, or everything when none are given."""
+        with self._lock:
+            self.generation += 1
+            if keys is None:
+                self._entries.clear()
+                return
+            for key in keys:
+                self._entries.pop(key, None)